@@ -20,7 +20,6 @@ STDOUT_LOG_FILE="${SCRIPT_NAME}.log"      # Filename to save STDOUT and STDERR
 
 CXLCLI=("$(command -v cxl)")        # Path to cxl, use -c option to specify the location of the cxl binary
 NUMACTL=("$(command -v numactl)")   # Path to numactl
-LSCPU=("$(command -v lscpu)")       # Path to lscpu
 AWK=("$(command -v awk)")           # Path to awk
 GREP=("$(command -v grep)")         # Path to grep
 SED=("$(command -v sed)")           # Path to sed
@@ -30,11 +29,17 @@ FIND=("$(command -v find)")         # Path to find
 TEE=("$(command -v tee)")           # Path to tee
 TAIL=("$(command -v tail)")         # Path to tail
 MLC=("$(command -v mlc)")           # Path to Intel MLC
+PYTHON3=("$(command -v python3)")   # Path to python3, used to run utils/mlc_driver.py and parse the results
+TOPOLOGY="${SCRIPT_DIR}/../../lib/topology.py"  # CPU and memory topology library, reads sysfs once and caches the result
+HUGEPAGES="${SCRIPT_DIR}/../../lib/hugepages.py" # Per-node huge page reservation library
 
 # Command line arguments
 socket=                       # -s argument to specify the CPU socket to run MLC, default OPT_DRAM_NUMA_NODE
 OPT_VERBOSITY=0               # default, -v, -vv, -vvv option to increase verbose output
-OPT_LOADED_LATENCY=false      # default, -l to override and perform loaded latency testing
+OPT_LOADED_LATENCY=false      # default, -l to override and capture the full loaded latency curve (all injection delays)
+OPT_MATRIX=false              # default, -M to override and measure the latency and bandwidth matrices of all socket/node pairs
+OPT_RATIO_SEARCH=false        # default, -R to override and search the bandwidth-maximizing DRAM:CXL interleave ratios
+OPT_OUTPUT_PATH=""            # default, -o to override and write to (or resume) the given output directory
 OPT_X=""                      # default, -X to override and use all cpu threads on all cores
 OPT_Z="-Z"                    # default, -Z to override and AVX-512 64-byte load/store instructions
 OPT_CXL_NUMA_NODE=-1          # default, -c to override and use the user specified NUMA Node backed by CXL
@@ -52,7 +57,7 @@ CORES_PER_SOCKET=0            # Number of CPU Cores per Socket
 THREADS_PER_CORE=0            # Number of CPU Threads per Core
 CPU_HYPERTHREADING=false      # CPU Hyperthreading Enabled (Ture) or Disabled (false)
 IncCPU=2                      # If Hyperthreading is Enabled and '-X' is not used, then use only one thread of each core
-nr_hugepages=$(cat /proc/sys/vm/nr_hugepages)    # Number of Huge (2MiB) pages in the system. Latency tests require 2MiB pages for accuracy.
+HUGE_PAGES_PER_NODE=1001     # Huge (2MiB) pages reserved on each NUMA node with memory. Latency tests require 2MiB pages for accuracy.
 
 #################################################################################################
 # Helper Functions
@@ -62,6 +67,7 @@ nr_hugepages=$(cat /proc/sys/vm/nr_hugepages)    # Number of Huge (2MiB) pages i
 trap ctrl_c INT
 function ctrl_c() {
   echo "INFO: Received CTRL+C - aborting"
+  restore_huge_page_count
   display_end_info
   exit 1
 }
@@ -112,7 +118,12 @@ function verify_cmds() {
      echo "Using MLC AVX512: No"
    fi
 
-   for CMD in numactl lscpu lspci grep cut bc awk; do
+   if [ ! -x "${PYTHON3}" ]; then
+     echo "ERROR: python3 command not found! It is required to run utils/mlc_driver.py."
+     err_state=true
+   fi
+
+   for CMD in numactl lspci grep cut bc awk; do
     CMD_PATH=($(command -v ${CMD}))
     if [ ! -x "${CMD_PATH}" ]; then
       echo "ERROR: ${CMD} command not found! Please install the ${CMD} package."
@@ -137,14 +148,32 @@ function display_usage() {
    echo "Optional args:"
    echo " "
    echo "   -c <CXL NUMA Node>"
-   echo "      Required. Specify the NUMA Node backed by CXL for testing"
+   echo "      Specify the NUMA Node backed by CXL for testing"
    echo " "
    echo "   -d <DRAM NUMA Node>"
-   echo "      Required. Specify the NUMA Node backed by DRAM for testing"
+   echo "      Specify the NUMA Node backed by DRAM for testing"
+   echo "      If neither -c nor -d is given, both are picked from the memory topology (lib/topology.py)"
+   echo " "
+   echo "   -l"
+   echo "      Capture the full loaded latency curve of the bandwidth ramps: run every ramp step at"
+   echo "      MLC's default injection delays instead of only zero delay. This takes much longer."
+   echo " "
+   echo "   -M"
+   echo "      Measure the idle latency and peak bandwidth matrices of every CPU socket and NUMA node"
+   echo "      pair, including CXL nodes. Writes matrix.csv, heatmaps, and the HMAT values if reported."
+   echo " "
+   echo "   -o <Output directory>"
+   echo "      Write the results to this directory. If it already exists, the runs recorded in its"
+   echo "      mlc_results.csv are skipped, so an interrupted run can be resumed with the same options."
    echo " "
    echo "   -m <Path to MLC executable>"
    echo "      Specify the path to the MLC executable"
    echo " "
+   echo "   -R"
+   echo "      Search the DRAM:CXL interleave ratio with the highest bandwidth for each interleave"
+   echo "      traffic type (W21, W23, W27) and core count. Requires -c and -d. The optima are"
+   echo "      written to ratio_search.csv."
+   echo " "
    echo "   -s <Socket>"
    echo "      Specify which CPU socket should be used for running mlc"
    echo "      By default, CPU Socket 0 is used to run mlc"
@@ -169,7 +198,7 @@ function display_usage() {
 function process_args() {
 
    # Process the command arguments and options
-   while getopts "h?c:d:m:s:vXZ:" opt; do
+   while getopts "h?c:d:lMm:o:Rs:vXZ:" opt; do
       case "$opt" in
       h|\?)
         display_usage "$0"
@@ -191,9 +220,22 @@ function process_args() {
           exit 1
         fi
         ;;
+      l) # Capture the full loaded latency curve
+        OPT_LOADED_LATENCY=true
+        ;;
+      M) # Measure the latency and bandwidth matrices
+        OPT_MATRIX=true
+        ;;
       m) # Set the location of the mlc binary 
         MLC=$OPTARG
         ;;
+      o) # Set (or resume) the output directory
+        OPT_OUTPUT_PATH=$OPTARG
+        OUTPUT_PATH=$OPTARG
+        ;;
+      R) # Search the best DRAM:CXL interleave ratios
+        OPT_RATIO_SEARCH=true
+        ;;
       s) # Specify which CPU socket to execute MLC on
         socket=$OPTARG
         # Validate input is a numeric value
@@ -236,12 +278,24 @@ function process_args() {
      OPT_VERBOSITY=3
    fi
 
+   # Pick the DRAM and CXL nodes from the memory topology if neither -c nor -d were provided
+   if [[ $OPT_CXL_NUMA_NODE -eq -1 ]] && [[ $OPT_DRAM_NUMA_NODE -eq -1 ]]; then
+     OPT_DRAM_NUMA_NODE=$(${PYTHON3} "${TOPOLOGY}" pick dram ${socket:+-s ${socket}} 2> /dev/null || echo -1)
+     OPT_CXL_NUMA_NODE=$(${PYTHON3} "${TOPOLOGY}" pick cxl ${socket:+-s ${socket}} 2> /dev/null || echo -1)
+     echo "No '-c' or '-d' arguments. Using DRAM node ${OPT_DRAM_NUMA_NODE} and CXL node ${OPT_CXL_NUMA_NODE} from the memory topology"
+   fi
+
    # Ensure the user provided one of -c or -d options
    if [[ $OPT_CXL_NUMA_NODE -eq -1 ]] && [[ $OPT_DRAM_NUMA_NODE -eq -1 ]]; then
      echo "Error! You must provide either the '-c' or '-d' arguments with values"
      exit 1
    fi
 
+   if ${OPT_RATIO_SEARCH} && ( [[ $OPT_CXL_NUMA_NODE -eq -1 ]] || [[ $OPT_DRAM_NUMA_NODE -eq -1 ]] ); then
+     echo "Error! The '-R' option requires both the '-c' and '-d' arguments"
+     exit 1
+   fi
+
    if [ -z "$socket" ]; then
      socket=$OPT_DRAM_NUMA_NODE
    fi
@@ -249,8 +303,14 @@ function process_args() {
 
 # Create output directory
 function init_outputs() {
-   rm -rf "${OUTPUT_PATH}" 2> /dev/null
-   mkdir "${OUTPUT_PATH}"
+   if [[ -n "${OPT_OUTPUT_PATH}" ]] && [[ -d "${OUTPUT_PATH}" ]]; then
+     # Keep the results of a previous run with -o so they can be resumed
+     echo "Resuming the results in ${OUTPUT_PATH}"
+   else
+     rm -rf "${OUTPUT_PATH}" 2> /dev/null
+     mkdir "${OUTPUT_PATH}"
+   fi
+   mkdir -p "${OUTPUT_PATH}/loaded_latency"
 }
 
 # Save STDOUT and STDERR to a log file
@@ -280,7 +340,7 @@ function validate_config() {
   err_state=false # Used for error reporting
 
   # Confirm the system has at least two NUMA nodes. Exit if we find only one(1)
-  NUMA_NODES_IN_SYSTEM=$(lscpu | ${GREP} "NUMA node(s)" | awk -F: '{print $2}' | xargs)
+  NUMA_NODES_IN_SYSTEM=$(${PYTHON3} "${TOPOLOGY}" nodes)
   if [[ "${NUMA_NODES_IN_SYSTEM}" -lt 2 ]]
   then
     echo "[Error] Only one NUMA Node found. A minumum of two(2) NUMA Nodes is required. Exiting!"
@@ -300,8 +360,7 @@ function validate_config() {
 }
 
 function check_cpus() {
-   TOKENS=( $(lscpu | ${GREP} "Core(s) per socket:") )
-   CORES_PER_SOCKET=${TOKENS[3]}
+   CORES_PER_SOCKET=$(${PYTHON3} "${TOPOLOGY}" cores-per-socket)
 
    # Only using the CPUs on this NUMA node
    CPUS=$CORES_PER_SOCKET
@@ -314,7 +373,7 @@ function check_cpus() {
 
 # Verify the user supplied socket number is valid on this system
 function verify_cpu_socket() {
-   SOCKETS_IN_SYSTEM=$( lscpu | ${GREP} "Socket(s):" | ${AWK} '{print $2}' )
+   SOCKETS_IN_SYSTEM=$(${PYTHON3} "${TOPOLOGY}" sockets)
    if [ -z "${SOCKETS_IN_SYSTEM}" ]; then
      echo "ERROR: verify_cpu_socket: Could not identify the number of sockets in this system. Exiting."
      exit 1
@@ -328,7 +387,7 @@ function verify_cpu_socket() {
 # Verify the user supplied a DRAM/CXL NUMA node that is valid on this system
 # TODO: Check if the specified NUMA node is DRAM or CXL. For now, we just make sure the user input is within the range of NUMA nodes for this system
 function verify_numa_node() {
-  NUMA_NODES_IN_SYSTEM=$( lscpu | ${GREP} "NUMA node(s):" | ${AWK} '{print $2}' )
+  NUMA_NODES_IN_SYSTEM=$(${PYTHON3} "${TOPOLOGY}" nodes)
   if [ -z "${NUMA_NODES_IN_SYSTEM}" ]; then
     echo "ERROR: verify_numa_node: Could not identify the number of NUMA nodes in this system. Exiting."
     exit 1
@@ -345,7 +404,7 @@ function verify_numa_node() {
 
 # Verify if CPU Hyperthreading is enabled or disabled
 function check_hyperthreading_enabled() {
-   THREADS_PER_CORE=$( lscpu | ${GREP} "Thread(s) per core" | cut -f2 -d ":")
+   THREADS_PER_CORE=$(${PYTHON3} "${TOPOLOGY}" threads-per-core)
    if [ "${THREADS_PER_CORE}" -gt 1 ]; then
      CPU_HYPERTHREADING=true
    else
@@ -358,19 +417,19 @@ function check_hyperthreading_enabled() {
 
 function get_cpu_socket_count(){
   # Get the number of CPU Sockets within the platform
-  SOCKETS_IN_SYSTEM=$(lscpu | ${GREP} "Socket(s)" | awk -F: '{print $2}' | xargs)
+  SOCKETS_IN_SYSTEM=$(${PYTHON3} "${TOPOLOGY}" sockets)
   echo "INFO: Number of Physcial Sockets: ${SOCKETS_IN_SYSTEM}"
 }
 
 function get_cores_per_socket_count() {
   # Get the number of cores per CPU Socket within the platform
-  CORES_PER_SOCKET=$(lscpu | ${GREP} "Core(s) per socket:" | awk -F: '{print $2}' | xargs)
+  CORES_PER_SOCKET=$(${PYTHON3} "${TOPOLOGY}" cores-per-socket)
   echo "INFO: Number of Cores per Socke: ${CORES_PER_SOCKET}"
 }
 
 # Identify the CPU IDs per socket.
 function get_cpu_range_per_socket(){
-   CPU_RANGE=$( lscpu | ${GREP} "NUMA node${socket} CPU(s)" | cut -f2 -d ":" )
+   CPU_RANGE=$(${PYTHON3} "${TOPOLOGY}" node-cpus ${socket} 2> /dev/null)
    if [ -z "${CPU_RANGE}" ]; then
      echo "ERROR: get_cpu_range_per_socket: Could not identify cpu range for socket ${socket}. Exiting"
      exit 1
@@ -380,18 +439,16 @@ function get_cpu_range_per_socket(){
 
 # Identifies the first CPU ID for the specified socket
 function get_first_cpu_in_socket() {
-   NUMA_CPUS=$( ${NUMACTL} --hardware | ${GREP} "node ${socket} cpus" | cut -f2 -d ":" )
-   if [ -z "${NUMA_CPUS}" ]; then
+   FIRST_CPU_ON_SOCKET=$(${PYTHON3} "${TOPOLOGY}" first-cpu ${socket} 2> /dev/null)
+   if [ -z "${FIRST_CPU_ON_SOCKET}" ]; then
      echo "ERROR: get_first_cpu_in_socket: Could not identify cpus for numa node ${socket}. Exiting"
      exit 1
    fi
-   TOK=( ${NUMA_CPUS} )
-   FIRST_CPU_ON_SOCKET=${TOK[0]}
 }
 
 # Identify the number of CPU Core(s) per socket
 function get_cpu_cores_per_socket() {
-   CPU_CORES_PER_SOCKET=$( lscpu | ${GREP} "Core(s) per socket" | cut -f2 -d ":" )
+   CPU_CORES_PER_SOCKET=$(${PYTHON3} "${TOPOLOGY}" cores-per-socket -s ${socket})
    if [ -z "${CPU_CORES_PER_SOCKET}" ]; then
      echo "ERROR: get_cpu_cores_per_socket: Could not identify cpu cores per socket for socket ${socket}. Exiting"
      exit 1
@@ -403,7 +460,7 @@ function get_cpu_cores_per_socket() {
 
 # Identify the number of CPU Thread(s) per core
 function get_cpu_threads_per_core() {
-   CPU_THREADS_PER_CORE=$( lscpu | ${GREP} "Thread(s) per core" | cut -f2 -d ":" )
+   CPU_THREADS_PER_CORE=$(${PYTHON3} "${TOPOLOGY}" threads-per-core)
    if [ -z "${CPU_THREADS_PER_CORE}" ] ; then
      echo "ERROR: get_cpu_threads_per_core: Could not identify cpu threads for per core on socket ${socket}. Exiting"
      exit 1
@@ -420,7 +477,7 @@ function get_first_vcpu_per_socket() {
 
   for ((s=0; s<=$((SOCKETS_IN_SYSTEM-1)); s++))
   do
-    first_vcpu=$(cat /sys/devices/system/node/node${s}/cpulist | cut -f1 -d"-")
+    first_vcpu=$(${PYTHON3} "${TOPOLOGY}" first-cpu ${s} 2> /dev/null)
     if [ -z "${first_vcpu}" ]; then
       echo "ERROR: Cannot determine the first vCPU on socket ${s}. Exiting."
       #exit 1
@@ -479,45 +536,38 @@ function print_time() {
 
 # MLC Latency tests need at least 1000 x 2MiB pages per NUMA Node
 function create_huge_pages() {
-  # Hugepages need to be allocated using /proc/sys/vm/nr_hugepages 
-  # Without large pages, the latencies are not accurate
+  # Reserve the huge pages on every NUMA node with memory, including the CPU-less CXL nodes,
+  # through /sys/devices/system/node/nodeN/hugepages. /proc/sys/vm/nr_hugepages would let the
+  # kernel place them on any node. Without large pages, the latencies are not accurate.
   echo ""
-  echo "--- Latency Matrix Tests ---"
-  echo "Detected ${nr_hugepages} Huge pages."
+  echo "--- Huge Pages ---"
 
-  # Calculate how many large pages we need
-  local nr_huge_pages_needed=$(( NUMA_NODES_IN_SYSTEM * 1001 ))
+  # A run that was killed before restoring leaves its saved counts behind
+  restore_huge_page_count
 
-  # Intel recommends a minimum of 4000
-  if [[ $nr_huge_pages_needed -lt 4000 ]]
+  # Intel recommends a minimum of 4000 in total
+  echo "The latency tests require a minimum of ${HUGE_PAGES_PER_NODE} huge pages on each NUMA node with memory, and 4000 in total."
+  # The original counts are saved to restore them, also after CTRL+C
+  if ${PYTHON3} "${HUGEPAGES}" reserve -c ${HUGE_PAGES_PER_NODE} --min-total 4000 -s 2M --save "${OUTPUT_PATH}/hugepages.json"
   then
-    nr_huge_pages_needed=4000
+    # Creating huge pages was successful
+    echo "Huge Pages Created Successfully"
+  else
+    # Creating huge pages failed. The original counts are already restored.
+    echo "Creation of Huge Pages Failed!"
+    return 1
   fi
-
-  if [[ $nr_hugepages -lt $nr_huge_pages_needed ]]
-  then
-    echo -n "The latency tests requires a minimum of ${nr_huge_pages_needed} hugepages for accuracy."
-    if echo "${nr_huge_pages_needed}" > /proc/sys/vm/nr_hugepages
-    then
-      # Creating huge pages was successful 
-      echo " Huge Pages Created Successfuly"
-    else
-      # Creating huge pages failed
-      echo " Creation of Huge Pages Failed!"
-
-      # Restore the original nr_hugepages value
-      echo "${nr_hugepages}" > /proc/sys/vm/nr_hugepages
-      return 1
-    fi  
-  fi 
 }
 
-# Restore the original huge page count when we're done testing
+# Restore the original huge page counts when we're done testing
 # so we don't cause any issues and leave a clean system
 function restore_huge_page_count() {
-  # Restore the original nr_hugepages value
+  if [[ ! -f "${OUTPUT_PATH}/hugepages.json" ]]
+  then
+    return
+  fi
   echo -n "Restoring original huge page config..."
-  if echo "${nr_hugepages}" > /proc/sys/vm/nr_hugepages
+  if ${PYTHON3} "${HUGEPAGES}" restore "${OUTPUT_PATH}/hugepages.json"
   then
     # Restoring original values was successful
     echo " Success"
@@ -531,207 +581,74 @@ function restore_huge_page_count() {
 # Metric measuring functions
 #################################################################################################
 
-# Run the latency matrix test where the latency from CPU 'C' to memory node 'M' is tested
+# Measure the idle latency and peak bandwidth matrices from the CPUs of each socket to the
+# memory of every NUMA node with utils/mlc_matrix.py
 function latency_matrix() {
-  # Run the test
-  ${MLC} --latency_matrix ${OPT_X} > "${OUTPUT_PATH}/latency_matrix.txt"
-  # Display the results
-  awk '$1 ~ /^[0-9]+$/ || $1 == "numa"' "${OUTPUT_PATH}/latency_matrix.txt"
-}
-
-# Run idle latency test against a specified NUMA node (DRAM or CXL)
-# idle_latency(NUMANode)
-function idle_latency() {
-   get_first_cpu_in_socket
-
-   echo ""
-   echo "--- Idle Latency Tests ---"
-   echo "Using CPU ${FIRST_CPU_ON_SOCKET}"
-   echo "Using NUMA Node $1"
-   echo -n "Idle sequential latency: "
-   ${MLC} --idle_latency -c"${FIRST_CPU_ON_SOCKET}" -j$1 ${OPT_X} > "$OUTPUT_PATH/idle_latency_seq_numa_node_$1.txt"
-   ${GREP} "Each iteration took" $OUTPUT_PATH/idle_latency_seq_numa_node_$1.txt
-
-   echo -n "Idle random latency: "
-   ${MLC} --idle_latency -c"${FIRST_CPU_ON_SOCKET}" -l256 -j"$1" -r ${OPT_X} > "$OUTPUT_PATH/idle_latency_rand_numa_node_$1.txt"
-   ${GREP} "Each iteration took" $OUTPUT_PATH/idle_latency_rand_numa_node_$1.txt
-   echo "--- End ---"
-}
-
-# Use all available CPUs on the specified socket to run MLC
-# Note: Depending on the number of PMem devices, power budget, BIOS settings, and other factors, this may not 
-#       yield the maximum bandwidth. Use ramp_bandwidth() to check bandwidth using different CPU counts.
-#
-# MLC Traffic Type
-# ----------------
-# Instead of generating 100% reads as in the default case, -W3 will select 3 reads and 1
-# write to memory. The following are the possible options for –Wn where n can take the
-# following values (reads and writes are as observed on the memory controller):
-# W2 =  2 reads and 1 write22
-# W3 =  3 reads and 1 write
-# W5 =  1 read and 1 write
-# W6 =  100% non-temporal write
-# W7 =  2 reads and 1 non-temporal write
-# W8 =  1 read and 1 non-temporal write
-# W9 =  3 reads and 1 non-temporal write
-# W10 = 2 reads and 1 non-temporal write (similar to stream triad)
-#    (same as -W7 but the 2 reads are from 2 different buffers while those 2
-#    reads are from a single buffer on –W7)
-# W11 = 3 reads and 1 write
-#    (same as –W3 but the 2 reads are from 2 different buffers while those 2
-#    reads are from a single buffer on –W3)
-# W12 = 4 reads and 1 write
-
-# Arg0: DRAM or CXL NUMA Node to test
-# TODO: If '-X' was specified, use all CPU threads, otherwise use the first thread on each core in ${CPU_RANGE}
-function bandwidth() {
-   get_first_cpu_in_socket
-   echo ""
-   echo "--- Bandwidth Tests ---"
-   echo "Using CPUs: ${CPU_RANGE}"
-   echo "Using Memory NUMA Node $1"
-   BW_ARRAY=(
-      #CPUs         Traffic type   seq or rand  buffer size   dram           dram node     output filename
-      "${CPU_RANGE} R              seq          $BUF_SZ       dram           $1            bw_node$1_seq_READ.txt"
-      "${CPU_RANGE} R              rand         $BUF_SZ       dram           $1            bw_node$1_rnd_READ.txt"
-      "${CPU_RANGE} W6             seq          $BUF_SZ       dram           $1            bw_node$1_seq_WRITE_NT.txt"
-      "${CPU_RANGE} W6             rand         $BUF_SZ       dram           $1            bw_node$1_rnd_WRITE_NT.txt"
-      "${CPU_RANGE} W7             seq          $BUF_SZ       dram           $1            bw_node$1_seq_2READ_1WRITE_NT.txt"
-      "${CPU_RANGE} W7             rand         $BUF_SZ       dram           $1            bw_node$1_rnd_2READ_1WRITE_NT.txt"
-      "${CPU_RANGE} W5             seq          $BUF_SZ       dram           $1            bw_node$1_seq_1READ_1WRITE.txt"
-      "${CPU_RANGE} W5             rand         $BUF_SZ       dram           $1            bw_node$1_rnd_1READ_1WRITE.txt"
-      "${CPU_RANGE} W2             seq          $BUF_SZ       dram           $1            bw_node$1_seq_2READ_1WRITE.txt"
-      "${CPU_RANGE} W2             rand         $BUF_SZ       dram           $1            bw_node$1_rnd_2READ_1WRITE.txt"
-   )
-  
-   # Run a test for each entry in the BW_ARRAY
-   for LN in "${BW_ARRAY[@]}"; do
-      TOK=( $LN )
-      echo ${TOK[0]} ${TOK[1]} ${TOK[2]} ${TOK[3]} ${TOK[4]} ${TOK[5]} > tmp_bw_testfile
-      echo -n "Memory bandwidth for ${TOK[6]} (MiB/sec): "
-      if [ ${OPT_Z} == 1 ]; then
-        if [ ${TOK[1]} == "W7" ]; then
-          Z="-Z"
-        else
-          Z=""
-        fi
-      fi
-      ${NUMACTL} -N ${socket} ${MLC} --loaded_latency -d0 -otmp_bw_testfile -t${SAMPLE_TIME} -T ${OPT_Z} ${OPT_X} > ${OUTPUT_PATH}/${TOK[6]}
-      cat ${OUTPUT_PATH}/${TOK[6]} | ${SED} -n -e '/==========================/,$p' | tail -n+2 | ${AWK} '{print $3}'
-      sleep 3
-   done
-   echo "--- End ---"
-   rm tmp_bw_testfile
+  local MATRIX_ARGS=(--run --mlc "${MLC}")
+  if [[ -n "${OPT_X}" ]]; then
+    MATRIX_ARGS+=(--all-threads)
+  fi
+  echo ""
+  echo "=== Measuring the idle latency and peak bandwidth matrices ==="
+  ${PYTHON3} "${SCRIPT_DIR}/utils/mlc_matrix.py" "${MATRIX_ARGS[@]}" "${OUTPUT_PATH}"
 }
 
-# Collect bandwidth and latency stats for a single NUMA node using a ramp of CPUs used for the test
-# arg0/$1 = NUMA Node to test
-function bandwidth_ramp() {
-  get_first_cpu_in_socket
-  local MEM_NUMA_NODE=$1
-  if [[ ${OPT_DRAM_NUMA_NODE} -eq ${MEM_NUMA_NODE} ]]
-  then
-    # Testing DRAM
-    ratiostr="100:0"
-  else
-    # Testing CXL
-    ratiostr="0:100"
+# Run the idle latency, peak bandwidth, bandwidth ramp and DRAM + CXL interleave
+# ramp tests with utils/mlc_driver.py. The driver writes the MLC input specs, runs
+# MLC, and collects every result in ${OUTPUT_PATH}/mlc_results.csv with the full
+# test configuration as columns. It also writes the per-ramp CSV files read by
+# gen_plot.py and gen_excel.py. Runs already recorded in the output directory are
+# skipped, so a run can be resumed with -o <output directory>.
+function run_mlc_driver() {
+  local DRIVER_ARGS=(
+    --output "${OUTPUT_PATH}"
+    --mlc "${MLC}"
+    --numactl "${NUMACTL}"
+    --socket "${socket}"
+    --first-cpu "${FIRST_CPU_ON_SOCKET}"
+    --cpu-range "${CPU_RANGE// /}"
+    --cores-per-socket "${CORES_PER_SOCKET}"
+    --sample-time "${SAMPLE_TIME}"
+    --buffer-size "${BUF_SZ}"
+    --legacy-csv
+  )
+  if [[ ${OPT_CXL_NUMA_NODE} -ge 0 ]]; then
+    DRIVER_ARGS+=(--cxl-node "${OPT_CXL_NUMA_NODE}")
+  fi
+  if [[ ${OPT_DRAM_NUMA_NODE} -ge 0 ]]; then
+    DRIVER_ARGS+=(--dram-node "${OPT_DRAM_NUMA_NODE}")
+  fi
+  if [[ -n "${OPT_X}" ]]; then
+    DRIVER_ARGS+=(--all-threads)
+  fi
+  if [[ -z "${OPT_Z}" ]]; then
+    DRIVER_ARGS+=(--no-avx512)
+  fi
+  if ${OPT_RATIO_SEARCH}; then
+    DRIVER_ARGS+=(--ratio-search)
+  fi
+  if ${OPT_LOADED_LATENCY}; then
+    DRIVER_ARGS+=(--full-curve)
+  elif [[ -f mlc_injection.delay ]]; then
+    # Use the injection delays of a user supplied delay file
+    DRIVER_ARGS+=(--delays "$(${AWK} 'NF { printf "%s%s", sep, $1; sep="," }' mlc_injection.delay)")
   fi
 
-  # Output CSV file headings
-  local OutputCSVHeadings="Node,DRAM:CXL Ratio,NUMA Node Tested,Num of Cores,IO Pattern,Access Pattern,Latency(ns),Bandwidth(MB/s)"
-  
-  echo "=== Collecting Memory Node ${MEM_NUMA_NODE} bandwidth using Socket ${socket} ==="
-  for (( c=0; c<=${CORES_PER_SOCKET}-1; c=c+${IncCPU} ))
-  do
-    TO_CPU=`expr ${FIRST_CPU_ON_SOCKET} + ${c}`
-    # Build the input file
-    for rdwr in R
-    do
-      # Random bandwidth option is supported only for R, W2, W5 and W6 traffic types
-      for access in seq rand
-      do
-        echo "${FIRST_CPU_ON_SOCKET}-${TO_CPU} ${rdwr} ${access} ${BUF_SZ} dram ${MEM_NUMA_NODE}" > mlc_loaded_latency.input
-        #numactl --membind=0 mlc/mlc --peak_injection_bandwidth -k1-${c}
-        ${MLC} -i${FIRST_CPU_ON_SOCKET} --loaded_latency -gmlc_injection.delay -omlc_loaded_latency.input ${OPT_X}
-        # Save the results to a CSV file
-        # Print headings to the CSV file on first access
-        if [[ ${c} -eq 0 ]]
-        then
-          echo "${OutputCSVHeadings}" > "${OUTPUT_PATH}/bw_ramp.results.node_${MEM_NUMA_NODE}.${rdwr}.${access}.${ratiostr}.csv"
-        fi
-        # Extract the Latency and Bandwidth results from the log file
-        LatencyResult=$(tail -n 4 "${LOG_FILE}" | ${GREP} '00000' | awk '{print $2}')
-        BandwidthResult=$(tail -n 4 "${LOG_FILE}" | ${GREP} '00000' | awk '{print $3}')
-        echo "DRAM:CXL,\"${ratiostr}\",${MEM_NUMA_NODE},${c},${rdwr},${access},${LatencyResult},${BandwidthResult}" >> "${OUTPUT_PATH}/bw_ramp.results.node_${MEM_NUMA_NODE}.${rdwr}.${access}.${ratiostr}.csv"
-      done
-    done
-  done
+  echo ""
+  echo "=== Running the MLC tests with utils/mlc_driver.py ==="
+  ${PYTHON3} "${SCRIPT_DIR}/utils/mlc_driver.py" "${DRIVER_ARGS[@]}"
 }
 
-# Collect DRAM + CXL Interleaved workloads
-# arg0/$1 = DRAM NUMA Node
-# arg1/$2 = CXL NUMA Node
-function bandwidth_ramp_interleave() {
-  get_first_cpu_in_socket
-  local DRAM_NUMA_NODE=$1
-  local CXL_NUMA_NODE=$2
-  local ratiostr="0:0"
-
-  # Output CSV file headings
-  local OutputCSVHeadings="Node,DRAM:CXL Ratio,Num of Cores,IO Pattern,Access Pattern,Latency(ns),Bandwidth(MB/s)"
-
-  echo "=== Collecting DRAM + CXL interleaved stats using Socket ${socket} with Memory Nodes DRAM:${DRAM_NUMA_NODE}, CXL:${CXL_NUMA_NODE} ==="
-  for (( c=0; c<=${CORES_PER_SOCKET}-1; c=c+${IncCPU} ))
-  do
-    TO_CPU=`expr ${FIRST_CPU_ON_SOCKET} + ${c}`
-    # Build the input file
-    # File format:
-    # CPU RdWr Access Buf_Sz Node0 Node 1 Ratio
-    # 0-2 W21 seq 40000 dram 0 dram 1 25
-    #
-    # W21 : 100% reads (similar to –R)
-    # W23 : 3 reads and 1 write (similar to –W3)
-    # W27 : 2 reads and 1 non-temporal write (similar to –W7)
-    for rdwr in W21 W23 W27 
-    do
-      # Random bandwidth option is supported only for R, W2, W5 and W6 traffic types
-      for access in seq 
-      do
-        for ratio in 10 25 50
-        do 
-          # Ratio 50 is only supported by W21
-          if [[ ("${rdwr}" == "W23" || "${rdwr}" == "W27") && ${ratio} -eq 50 ]]
-          then
-            continue
-          fi
-
-          # Print headings to the CSV file on first access
-          if [[ ${c} -eq 0 ]]
-          then
-            echo "${OutputCSVHeadings}" > "${OUTPUT_PATH}/bw_ramp_interleave.results.node_${DRAM_NUMA_NODE}.node_${CXL_NUMA_NODE}.${rdwr}.${access}.${ratio}.csv"
-          fi
-
-          # Generate the input file for MLC
-          echo "${FIRST_CPU_ON_SOCKET}-${TO_CPU} ${rdwr} ${access} ${BUF_SZ} dram ${DRAM_NUMA_NODE} dram ${CXL_NUMA_NODE} ${ratio}" > mlc_loaded_latency.input
-
-          # Run MLC
-          ${MLC} -i${FIRST_CPU_ON_SOCKET} --loaded_latency -gmlc_injection.delay -omlc_loaded_latency.input
-
-          # Extract the Latency and Bandwidth results
-          LatencyResult=$(tail -n 4 "${LOG_FILE}" | ${GREP} '00000' | awk '{print $2}')
-          BandwidthResult=$(tail -n 4 "${LOG_FILE}" | ${GREP} '00000' | awk '{print $3}')
-          ratiostr="$(( 100 - ratio )):${ratio}"
-          echo "DRAM:CXL,\"${ratiostr}\",${c},${rdwr},${access},${LatencyResult},${BandwidthResult}" >> "${OUTPUT_PATH}/bw_ramp_interleave.results.node_${DRAM_NUMA_NODE}.node_${CXL_NUMA_NODE}.${rdwr}.${access}.${ratio}.csv"
-        done 
-      done
-    done
-  done
+# Parse the saved loaded latency runs into one tidy dataset (curves.csv) and the
+# knee of every curve (knees.csv) in the loaded_latency directory
+function parse_loaded_latency_curves() {
+  echo "=== Parsing the loaded latency curves ==="
+  ${PYTHON3} "${SCRIPT_DIR}/utils/loaded_latency.py" "${OUTPUT_PATH}/loaded_latency"
 }
 
 # Remove all temporary files created for this test
 function cleanup() {
-  rm -f mlc_injection.delay mlc_loaded_latency.input tmp_bw_testfile
+  rm -f mlc_loaded_latency.input tmp_bw_testfile
 }
 
 
@@ -771,54 +688,24 @@ get_first_vcpu_per_socket
 check_hyperthreading_enabled
 validate_config
 
-# Create the MLC Loaded Latency input file if needed
-# The default is to have zero (0) delay between operations. 
-if [[ ! -f mlc_injection.delay ]]
-then
-  echo "Creating 'mlc_injection.delay'"
-  echo 0 > mlc_injection.delay
-fi
-
 # Execute tests
 # TODO: Log the date/time when each test starts
 # TODO: Support a quiet mode that only displays the test and result, and excludes the "Thread id CXX, traffic pattern P, ..."
 create_huge_pages
 
-# latency_matrix
-# Test idle_latency if -c or -d were provided
-if [[ $OPT_CXL_NUMA_NODE -ge 0 ]]; then
-  idle_latency "${OPT_CXL_NUMA_NODE}"
-fi
-
-if [[ $OPT_DRAM_NUMA_NODE -ge 0 ]]; then
-  idle_latency "${OPT_DRAM_NUMA_NODE}"
-fi
-
-# Test bandwidth if -c or -d were provided
-if [[ $OPT_CXL_NUMA_NODE -ge 0 ]]; then
-  bandwidth "${OPT_CXL_NUMA_NODE}"
+# Measure the latency and bandwidth matrices of all socket/node pairs if -M was provided
+if ${OPT_MATRIX}; then
+  latency_matrix
 fi
 
-if [[ $OPT_DRAM_NUMA_NODE -ge 0 ]]; then
-  bandwidth "${OPT_DRAM_NUMA_NODE}"
-fi
-
-# Test bandwidth ramp up if -c or -d were provided
-if [[ $OPT_CXL_NUMA_NODE -ge 0 ]]; then
-  bandwidth_ramp "${OPT_CXL_NUMA_NODE}"
-fi
-
-if [[ $OPT_DRAM_NUMA_NODE -ge 0 ]]; then
-  bandwidth_ramp "${OPT_DRAM_NUMA_NODE}"
-fi
-
-# If the user provided a DRAM and CXL node, test interleaving
-if [[ $OPT_CXL_NUMA_NODE -ge 0 ]] && [[ $OPT_DRAM_NUMA_NODE -ge 0 ]]; then
-  bandwidth_ramp_interleave "${OPT_DRAM_NUMA_NODE}" "${OPT_CXL_NUMA_NODE}"
-fi
+# Run the idle latency, bandwidth, bandwidth ramp and interleave tests of the -c and -d nodes
+get_first_cpu_in_socket
+run_mlc_driver
 
 restore_huge_page_count
 
+parse_loaded_latency_curves
+
 # TODO: Generate charts using the CSV files
 
 # TODO: Zip the output directory
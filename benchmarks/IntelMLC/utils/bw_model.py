@@ -0,0 +1,252 @@
+#!/usr/bin/python3
+
+# Fit a bandwidth-latency model per memory node to the MLC results and predict
+# the configurations that were not measured.
+#
+# Each node is modeled as a queue: the latency at a bandwidth B is
+#   L(B) = L0 + k * U / (1 - U),  U = B / Bmax
+# where L0 is the unloaded latency and Bmax the bandwidth at which the latency
+# diverges. The parameters are fitted to every (bandwidth, latency) point of the
+# single-node ramps of the node, including the full loaded latency curves (-l).
+#
+# At zero injection delay MLC is a closed system: each core keeps a fixed number
+# of bytes in flight (q, fitted from the ramps), so n cores reach the bandwidth
+# where B = n * q / L(B). With a fraction f of the buffer on the CXL node, the
+# DRAM and CXL nodes serve (1 - f) * B and f * B, and the latency is the blend
+#   L(B) = (1 - f) * L_dram((1 - f) * B) + f * L_cxl(f * B)
+# Solving B = n * q / L(B) predicts the bandwidth and latency of any DRAM:CXL
+# ratio and core count from the two single-node fits. Interleave traffic is
+# predicted from the single-node traffic with the same read/write mix
+# (TRAFFIC_MODELS); the ramps measure reads only, so only W21 is predicted.
+#
+# Where a configuration was measured, the relative prediction error is
+# reported. The interleaved measurements are not used by the fit, so their
+# error shows how far the model can be trusted to replace measurements.
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import brentq, curve_fit
+
+import mlc_driver
+
+# Single-node traffic type whose fit predicts each interleave traffic type
+TRAFFIC_MODELS = {
+    'R': 'R',
+    'W21': 'R',
+}
+
+MODEL_COLUMNS = ['hostname', 'node', 'traffic', 'access', 'points', 'idle_latency_ns', 'k_ns', 'max_bandwidth_mbs',
+                 'bytes_in_flight', 'rmse_ns']
+
+PREDICTION_COLUMNS = ['hostname', 'dram_node', 'cxl_node', 'traffic', 'access', 'cores', 'dram_ratio', 'cxl_ratio',
+                      'predicted_bandwidth_mbs', 'predicted_latency_ns', 'measured_bandwidth_mbs', 'measured_latency_ns',
+                      'bandwidth_error', 'latency_error']
+
+
+# Latency in ns of a node at a bandwidth in MB/s
+def queue_latency(bandwidth, idle_latency, k, max_bandwidth):
+    utilization = np.minimum(bandwidth / max_bandwidth, 1 - 1e-9)
+    return idle_latency + k * utilization / (1 - utilization)
+
+
+# Number of CPUs of a ramp step: the ramps run on the first cpu to first + cores
+def ramp_cpus(cores):
+    return cores + 1
+
+
+# Fit the queue model to the points of one node. 'points' are the rows of its
+# single-node ramps; the zero delay rows also give the bytes in flight per CPU.
+# Returns the model dict, or None if the points cannot be fitted.
+def fit_node(points):
+    points = points.dropna(subset=['bandwidth_mbs', 'latency_ns'])
+    if len(points) < 3:
+        return None
+    bandwidth = points['bandwidth_mbs'].to_numpy(dtype=float)
+    latency = points['latency_ns'].to_numpy(dtype=float)
+    p0 = [latency.min(), latency.min() / 10, bandwidth.max() * 1.2]
+    bounds = ([0, 0, bandwidth.max() * 1.0001], [np.inf, np.inf, np.inf])
+    try:
+        (idle_latency, k, max_bandwidth), _ = curve_fit(queue_latency, bandwidth, latency, p0=p0, bounds=bounds,
+                                                        maxfev=20000)
+    except (RuntimeError, ValueError) as e:
+        print(f'Warning: could not fit {len(points)} points: {e}')
+        return None
+    residuals = latency - queue_latency(bandwidth, idle_latency, k, max_bandwidth)
+
+    zero_delay = points[points['inject_delay'] == 0]
+    in_flight = (zero_delay['bandwidth_mbs'].astype(float) * zero_delay['latency_ns'].astype(float)
+                 / (1000 * ramp_cpus(zero_delay['cores'].astype(float))))
+    return {
+        'points': len(points),
+        'idle_latency_ns': idle_latency,
+        'k_ns': k,
+        'max_bandwidth_mbs': max_bandwidth,
+        'bytes_in_flight': float(in_flight.median()) if len(in_flight) else None,
+        'rmse_ns': float(np.sqrt(np.mean(residuals ** 2))),
+    }
+
+
+# Blended latency of the nodes at a total bandwidth: [(model, fraction)]
+def blended_latency(shares, bandwidth):
+    return sum(f * queue_latency(f * bandwidth, m['idle_latency_ns'], m['k_ns'], m['max_bandwidth_mbs'])
+               for m, f in shares if f > 0)
+
+
+# Predict the zero delay (bandwidth, latency) of 'cores' with the nodes' shares
+# of the buffer: [(model, fraction)]
+def predict(shares, cores):
+    shares = [(m, f) for m, f in shares if f > 0]
+    in_flight = sum(f * m['bytes_in_flight'] for m, f in shares)
+    limit = min(m['max_bandwidth_mbs'] / f for m, f in shares)
+
+    def excess(bandwidth):
+        return bandwidth - ramp_cpus(cores) * in_flight * 1000 / blended_latency(shares, bandwidth)
+
+    bandwidth = brentq(excess, 0, limit * (1 - 1e-9))
+    return bandwidth, blended_latency(shares, bandwidth)
+
+
+# Node tested by a single-node ramp row
+def ramp_node(row):
+    return row['dram_node'] if row['dram_ratio'] == 100 else row['cxl_node']
+
+
+# Fit every (host, node, traffic, access) of the single-node ramps
+def fit_models(df):
+    ramps = df[(df['test'] == 'bw_ramp') & df['latency_ns'].notna()].copy()
+    ramps['node'] = ramps.apply(ramp_node, axis=1)
+    models = {}
+    for (host, node, traffic, access), points in ramps.groupby(['hostname', 'node', 'traffic', 'access']):
+        model = fit_node(points)
+        if model is not None and model['bytes_in_flight']:
+            models[(host, int(node), traffic, access)] = model
+    return models
+
+
+# Zero delay measurements by (host, DRAM node, CXL node, model traffic, access,
+# cores, CXL %). A single-node ramp has only one of the nodes.
+def measurements(df):
+    measured = {}
+    rows = df[(df['inject_delay'] == 0) & df['test'].isin(['bw_ramp', 'bw_ramp_interleave', 'ratio_search'])]
+    for row in rows.itertuples(index=False):
+        if row.traffic not in TRAFFIC_MODELS:
+            continue
+        dram_node = None if pd.isna(row.dram_node) else int(row.dram_node)
+        cxl_node = None if pd.isna(row.cxl_node) else int(row.cxl_node)
+        key = (row.hostname, dram_node, cxl_node, TRAFFIC_MODELS[row.traffic], row.access, int(row.cores),
+               int(row.cxl_ratio))
+        measured[key] = (float(row.bandwidth_mbs), None if pd.isna(row.latency_ns) else float(row.latency_ns))
+    return measured
+
+
+def relative_error(predicted, measured):
+    return (predicted - measured) / measured if measured else None
+
+
+# (host, DRAM node, CXL node) pairs to predict: every DRAM node with a ramp x
+# every CXL node with a ramp of the same host, so the pairs that were never
+# interleaved are predicted too, and the pairs of the interleaved runs. Optionally
+# limited to 'dram_nodes' and 'cxl_nodes'.
+def node_pairs(df, dram_nodes=None, cxl_nodes=None):
+    ramps = df[df['test'] == 'bw_ramp']
+    pairs = set()
+    for host, host_ramps in ramps.groupby('hostname'):
+        drams = host_ramps[host_ramps['dram_ratio'] == 100]['dram_node'].dropna().astype(int).unique()
+        cxls = host_ramps[host_ramps['cxl_ratio'] == 100]['cxl_node'].dropna().astype(int).unique()
+        pairs.update((host, int(dram_node), int(cxl_node)) for dram_node in drams for cxl_node in cxls)
+    interleaved = df[df['dram_node'].notna() & df['cxl_node'].notna()][['hostname', 'dram_node', 'cxl_node']]
+    pairs.update((host, int(dram_node), int(cxl_node)) for host, dram_node, cxl_node in interleaved.itertuples(index=False))
+    return sorted((host, dram_node, cxl_node) for host, dram_node, cxl_node in pairs
+                  if (dram_nodes is None or dram_node in dram_nodes) and (cxl_nodes is None or cxl_node in cxl_nodes))
+
+
+# Predict every ratio and core count of every (DRAM node, CXL node) pair with models
+def predict_all(df, models, ratios, cores_list=None, dram_nodes=None, cxl_nodes=None):
+    measured = measurements(df)
+    rows = []
+    for host, dram_node, cxl_node in node_pairs(df, dram_nodes, cxl_nodes):
+        host_cores = cores_list or sorted(df[df['hostname'] == host]['cores'].dropna().astype(int).unique())
+        for traffic, model_traffic in TRAFFIC_MODELS.items():
+            if traffic == model_traffic:
+                continue
+            for access in ('seq', 'rand'):
+                dram_model = models.get((host, dram_node, model_traffic, access))
+                cxl_model = models.get((host, cxl_node, model_traffic, access))
+                if dram_model is None or cxl_model is None:
+                    continue
+                for cores in host_cores:
+                    for cxl_ratio in ratios:
+                        f = cxl_ratio / 100
+                        bandwidth, latency = predict([(dram_model, 1 - f), (cxl_model, f)], cores)
+                        key_nodes = (dram_node if cxl_ratio < 100 else None, cxl_node if cxl_ratio > 0 else None)
+                        bw_measured, lat_measured = measured.get((host, *key_nodes, model_traffic, access, cores, cxl_ratio),
+                                                                 (None, None))
+                        rows.append({
+                            'hostname': host,
+                            'dram_node': dram_node,
+                            'cxl_node': cxl_node,
+                            'traffic': traffic,
+                            'access': access,
+                            'cores': cores,
+                            'dram_ratio': 100 - cxl_ratio,
+                            'cxl_ratio': cxl_ratio,
+                            'predicted_bandwidth_mbs': bandwidth,
+                            'predicted_latency_ns': latency,
+                            'measured_bandwidth_mbs': bw_measured,
+                            'measured_latency_ns': lat_measured,
+                            'bandwidth_error': relative_error(bandwidth, bw_measured) if bw_measured is not None else None,
+                            'latency_error': relative_error(latency, lat_measured) if lat_measured is not None else None,
+                        })
+    return pd.DataFrame(rows, columns=PREDICTION_COLUMNS)
+
+
+# Print the mean absolute prediction error of the single-node points (fitted)
+# and of the interleaved points (not fitted)
+def print_errors(predictions):
+    measured = predictions[predictions['measured_bandwidth_mbs'].notna()]
+    single = measured['cxl_ratio'].isin([0, 100])
+    for name, points in (('single node (fitted)', measured[single]), ('interleaved (not fitted)', measured[~single])):
+        if points.empty:
+            print(f'{name}: no measurements')
+            continue
+        bandwidth_error = points['bandwidth_error'].abs().mean()
+        latency_error = points['latency_error'].dropna().abs().mean()
+        print(f'{name}: {len(points)} points, mean absolute error bandwidth {bandwidth_error:.1%}, latency {latency_error:.1%}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit a bandwidth-latency model per memory node to MLC results and predict untested DRAM:CXL ratios and core counts")
+    parser.add_argument('Results', nargs='+', help='mlc_results.csv files of mlc_driver.py (several hosts can be combined)')
+    parser.add_argument('-o', '--output', help='output directory (default: the directory of the first results file)')
+    parser.add_argument('--ratios', type=mlc_driver.parse_list, default=list(range(0, 101, 5)), help='CXL percentages to predict (default: 0-100 in steps of 5)')
+    parser.add_argument('--cores', type=mlc_driver.parse_list, help='core counts to predict (default: the measured core counts)')
+    parser.add_argument('--dram-node', type=mlc_driver.parse_list, help='DRAM nodes to predict (default: every DRAM node with a ramp)')
+    parser.add_argument('--cxl-node', type=mlc_driver.parse_list, help='CXL nodes to predict (default: every CXL node with a ramp)')
+    args = parser.parse_args()
+
+    output = args.output or os.path.dirname(os.path.abspath(args.Results[0]))
+    df = mlc_driver.read_results(*args.Results)
+    models = fit_models(df)
+    if not models:
+        print('Error: no single-node ramp results to fit. Run the bw_ramp test first.')
+        exit(1)
+
+    model_rows = [dict(zip(['hostname', 'node', 'traffic', 'access'], key), **model) for key, model in sorted(models.items())]
+    for row in model_rows:
+        print(f"{row['hostname']} node {row['node']} {row['traffic']} {row['access']}: idle {row['idle_latency_ns']:.1f} ns, "
+              f"max {row['max_bandwidth_mbs']:.0f} MB/s, {row['bytes_in_flight']:.0f} bytes in flight per CPU, "
+              f"RMSE {row['rmse_ns']:.1f} ns ({row['points']} points)")
+    predictions = predict_all(df, models, args.ratios, args.cores, args.dram_node, args.cxl_node)
+    print_errors(predictions)
+
+    os.makedirs(output, exist_ok=True)
+    pd.DataFrame(model_rows, columns=MODEL_COLUMNS).to_csv(os.path.join(output, 'bw_model.csv'), index=False)
+    predictions.to_csv(os.path.join(output, 'bw_predictions.csv'), index=False)
+    print(f"Wrote {os.path.join(output, 'bw_model.csv')} and {os.path.join(output, 'bw_predictions.csv')} ({len(predictions)} predictions)")
+
+
+if __name__ == "__main__":
+    main()
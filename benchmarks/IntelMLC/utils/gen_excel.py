@@ -14,7 +14,9 @@ def csv_to_excel(directory, excel_filename):
     with pd.ExcelWriter(excel_filename) as writer:
         for filename in os.listdir(directory):
             if filename.endswith('.csv'):
-                tab_name = re.search('node.*(?=.csv)', filename).group()
+                # Per-test files are named after their nodes; other files (e.g. mlc_results.csv) after their stem
+                match = re.search('node.*(?=.csv)', filename)
+                tab_name = match.group() if match else filename[:-len('.csv')]
                 sanitized_tab_name = sanitize_tab_name(tab_name)
                 df = pd.read_csv(os.path.join(directory, filename))
                 df.to_excel(writer, sheet_name=sanitized_tab_name, index=False)
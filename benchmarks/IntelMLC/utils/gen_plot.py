@@ -1,90 +1,162 @@
-#!/usr/bin/python3 
+#!/usr/bin/python3
 
 import os
 import pandas as pd
 import re
+import matplotlib
+matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 from scipy.interpolate import make_interp_spline
 import numpy as np
 import argparse
+from concurrent.futures import ProcessPoolExecutor
 
 
-file_patterns = {
-    'w21_seq': r'bw_ramp_interleave.results.node_\d+.node_\d+.W21.seq.(?:10|25|50).csv|bw_ramp.results.node_\d+.R.seq.100:0|bw_ramp.results.node_\d+.R.seq.0:100',
-    'w23_seq': r'bw_ramp_interleave.results.node_\d+.node_\d+.W23.seq.(?:10|25|50).csv',
-    'w27_seq': r'bw_ramp_interleave.results.node_\d+.node_\d+.W27.seq.(?:10|25|50).csv',
-    'w21_rand': r'bw_ramp_interleave.results.node_\d+.node_\d+.W21.rand.(?:10|25|50).csv|bw_ramp.results.node_\d+.R.rand.100:0|bw_ramp.results.node_\d+.R.rand.0:100',
-    'w23_rand': r'bw_ramp_interleave.results.node_\d+.node_\d+.W23.rand.(?:10|25|50).csv',
-    'w27_rand': r'bw_ramp_interleave.results.node_\d+.node_\d+.W27.rand.(?:10|25|50).csv',
-}
+# Per-ramp result files written by mlc.sh. The test configuration is in the file name:
+#   bw_ramp.results.node_<N>.<traffic>.<access>.<DRAM:CXL ratio>.csv
+#   bw_ramp_interleave.results.node_<DRAM>.node_<CXL>.<traffic>.<access>.<CXL %>.csv
+ramp_file_pattern = re.compile(r'bw_ramp\.results\.node_(\d+)\.(\w+)\.(seq|rand)\.(\d+):(\d+)\.csv$')
+interleave_file_pattern = re.compile(r'bw_ramp_interleave\.results\.node_(\d+)\.node_(\d+)\.(W\d+)\.(seq|rand)\.(\d+)\.csv$')
 
-# We need to make sure not to include 100:0/0:100 files here as they only have one node.
-# and this regex is just used to pull the nodes from the filename.
-node_file_patterns = {
-    'w21_seq': r'bw_ramp_interleave.results.node_\d+.node_\d+.W21.seq.(?:10|25|50).csv',
-    'w23_seq': file_patterns['w23_seq'],
-    'w27_seq': file_patterns['w27_seq'],
-    'w21_rand': r'bw_ramp_interleave.results.node_\d+.node_\d+.W21.rand.(?:10|25|50).csv',
-    'w23_rand': file_patterns['w23_rand'],
-    'w27_rand': file_patterns['w27_rand']
+# Chart groups: the interleave traffic type of each group. The single node read
+# ramps (100:0 and 0:100) are the reference lines of the W21 (100% read) charts.
+chart_groups = {
+    'w21': {'W21', 'R'},
+    'w23': {'W23'},
+    'w27': {'W27'},
 }
 
-def read_csv_files(search_dir, regex_pattern=r'(.+)\.csv'):
-    csv_files = [file for file in os.listdir(search_dir) if re.match(regex_pattern, file)]
-    print(f'files: {csv_files}')
-    data_dict = {}
-
-    for file in csv_files:
-        df = pd.read_csv(file)
-        data_dict[file] = df
-
-    return data_dict
-
-
-def generate_stacked_line_chart(data_dict, x_column, y_column, image_name, title='Stacked Line Chart'):
+# Metrics plotted against the number of cores: (column, file name prefix, title)
+metrics = [
+    ('Bandwidth(MB/s)', 'bw', 'Bandwidth'),
+    ('Latency(ns)', 'lt', 'Latency'),
+]
+
+
+# Return the test configuration encoded in a per-ramp result file name, or None
+def parse_file_name(filename):
+    match = ramp_file_pattern.match(filename)
+    if match:
+        node, traffic, access, dram_ratio, cxl_ratio = match.groups()
+        return {
+            'file': filename,
+            'dram_node': int(node) if int(dram_ratio) > 0 else None,
+            'cxl_node': int(node) if int(cxl_ratio) > 0 else None,
+            'traffic': traffic,
+            'access': access,
+            'dram_ratio': int(dram_ratio),
+            'cxl_ratio': int(cxl_ratio),
+        }
+    match = interleave_file_pattern.match(filename)
+    if match:
+        dram_node, cxl_node, traffic, access, cxl_ratio = match.groups()
+        return {
+            'file': filename,
+            'dram_node': int(dram_node),
+            'cxl_node': int(cxl_node),
+            'traffic': traffic,
+            'access': access,
+            'dram_ratio': 100 - int(cxl_ratio),
+            'cxl_ratio': int(cxl_ratio),
+        }
+    return None
+
+
+# Read every per-ramp result file of a directory into one DataFrame, with the
+# configuration from the file name as columns
+def load_catalog(search_dir):
+    frames = []
+    for filename in sorted(os.listdir(search_dir)):
+        config = parse_file_name(filename)
+        if config is None:
+            continue
+        df = pd.read_csv(os.path.join(search_dir, filename))
+        frames.append(df.assign(**config))
+    if not frames:
+        return pd.DataFrame()
+    catalog = pd.concat(frames, ignore_index=True)
+    print(f"Loaded {len(catalog)} rows from {len(frames)} files in {search_dir}")
+    return catalog
+
+
+# The DRAM and CXL nodes of the series of a chart
+def chart_nodes(df):
+    dram_nodes = df['dram_node'].dropna()
+    cxl_nodes = df['cxl_node'].dropna()
+    return (int(dram_nodes.iloc[0]) if not dram_nodes.empty else None,
+            int(cxl_nodes.iloc[0]) if not cxl_nodes.empty else None)
+
+
+# Build the list of charts: one per group, access pattern and metric with at least one series
+def plan_charts(catalog, output_dir, groups=None, accesses=None, raw=False):
+    charts = []
+    for group, traffic in chart_groups.items():
+        if groups and group not in groups:
+            continue
+        for access in ('seq', 'rand'):
+            if accesses and access not in accesses:
+                continue
+            df = catalog[catalog['traffic'].isin(traffic) & (catalog['access'] == access)]
+            if df.empty:
+                continue
+            dram_node, cxl_node = chart_nodes(df)
+            for column, prefix, title in metrics:
+                image_name = f'{prefix}_{access}_node{dram_node}:node{cxl_node}_{access}_{group}'
+                charts.append({
+                    'data': df,
+                    'x_column': 'Num of Cores',
+                    'y_column': column,
+                    'image_path': os.path.join(output_dir, f'{image_name}.png'),
+                    'title': f'{group} {access} {title} node{dram_node}:node{cxl_node}',
+                    'raw': raw,
+                })
+    return charts
+
+
+def generate_stacked_line_chart(data, x_column, y_column, image_path, title='Stacked Line Chart', raw=False):
     plt.figure(figsize=(10, 6))
 
-    for filename, dataframe in data_dict.items():
+    for _, dataframe in data.groupby('file', sort=False):
+        dataframe = dataframe.sort_values(x_column)
         x = dataframe[x_column]
         y = dataframe[y_column]
 
-        # Perform cubic spline interpolation
-        x_new = np.linspace(x.min(), x.max(), 300)
-        spline = make_interp_spline(x, y)
-        y_smooth = spline(x_new)
-        
         node = dataframe['Node'].iloc[0]
         cxl_ratio = dataframe['DRAM:CXL Ratio'].iloc[0]
         label = f"{node} {cxl_ratio}"
-        plt.plot(x_new, y_smooth, label=label)
+
+        # A cubic spline needs four points and overshoots between sparse ones
+        if raw or len(x) < 4:
+            plt.plot(x, y, marker='o', label=label)
+        else:
+            # Perform cubic spline interpolation
+            x_new = np.linspace(x.min(), x.max(), 300)
+            spline = make_interp_spline(x, y)
+            y_smooth = spline(x_new)
+            plt.plot(x_new, y_smooth, label=label)
 
     plt.xlabel(x_column)
     plt.ylabel(y_column)
     plt.title(title)
     plt.legend()
-    plt.savefig(f'{image_name}.png')
-    plt.show()
-    
-    
-def extract_nodes_from_filenames(directory, regex_pattern):
-    pattern = re.compile(regex_pattern)
-    for filename in os.listdir(directory):
-        match = re.search(pattern, filename)
-        if match:
-            node_values = re.findall(r'node_(\d+)', filename)
-            if len(node_values) == 2:
-                A = int(node_values[0])
-                B = int(node_values[1])
-                return A, B
-    return None, None
+    plt.savefig(image_path)
+    plt.close()
+    return image_path
+
+
+def render_chart(chart):
+    return generate_stacked_line_chart(**chart)
 
 
 if __name__ == '__main__':
-    parser = argparse.ArgumentParser(description="Process command line arguments.")
+    parser = argparse.ArgumentParser(description="Plot the bandwidth and latency of the mlc.sh bandwidth ramps.")
     parser.add_argument('-d', '--directory', help='Name of the directory', required=True)
-    parser.add_argument('-r', '--ratio', choices=['w21', 'w23', 'w27'], help='Ratio', required=True)
-    parser.add_argument('-t', '--type', choices=['seq', 'rand'], help='Option: seq or rand', required=True)
-    
+    parser.add_argument('-r', '--ratio', choices=['w21', 'w23', 'w27'], help='Ratio (default: all)')
+    parser.add_argument('-t', '--type', choices=['seq', 'rand'], help='Option: seq or rand (default: both)')
+    parser.add_argument('-o', '--output', default='.', help='Directory of the charts (default: the current directory)')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), help='Number of charts rendered in parallel')
+    parser.add_argument('--raw', action='store_true', help='Plot the measured points instead of cubic splines')
+
     args = parser.parse_args()
 
     directory = args.directory
@@ -92,19 +164,16 @@ if __name__ == '__main__':
         print(f"Error: '{directory}' is not a valid directory.")
         exit(1)
 
-    ratio = args.ratio.lower()
-    data_type = args.type.lower()
-    
-    df_dict = read_csv_files(directory, file_patterns[f'{ratio}_{data_type}'])
-    nodes = extract_nodes_from_filenames(directory, node_file_patterns[f'{ratio}_{data_type}'])
-    generate_stacked_line_chart(df_dict, 
-                                'Num of Cores', 
-                                'Bandwidth(MB/s)',
-                                f'bw_{data_type}_node{nodes[0]}:node{nodes[1]}_{data_type}_{ratio}',
-                                title=f'{ratio} {data_type} Bandwidth node{nodes[0]}:node{nodes[1]}')
-    generate_stacked_line_chart(df_dict, 
-                            'Num of Cores', 
-                            'Latency(ns)',
-                            f'lt_{data_type}_node{nodes[0]}:node{nodes[1]}_{data_type}_{ratio}',
-                            title=f'{ratio} {data_type} Latency node{nodes[0]}:node{nodes[1]}')
+    catalog = load_catalog(directory)
+    if catalog.empty:
+        print(f"Error: no bandwidth ramp results in '{directory}'.")
+        exit(1)
 
+    os.makedirs(args.output, exist_ok=True)
+    charts = plan_charts(catalog, args.output,
+                         groups=[args.ratio.lower()] if args.ratio else None,
+                         accesses=[args.type.lower()] if args.type else None,
+                         raw=args.raw)
+    with ProcessPoolExecutor(max_workers=max(1, args.jobs)) as executor:
+        for image_path in executor.map(render_chart, charts):
+            print(f'Saved {image_path}')
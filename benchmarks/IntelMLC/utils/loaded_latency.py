@@ -0,0 +1,161 @@
+#!/usr/bin/python3
+
+# Parse the full MLC loaded-latency curves saved by mlc.sh into one tidy CSV.
+#
+# mlc.sh saves the output of every 'mlc --loaded_latency' run in the
+# loaded_latency/ directory of the results, with the test configuration encoded
+# in the file name:
+#   bw_ramp.node_<N>.<traffic>.<access>.<DRAM:CXL ratio>.cores_<C>.txt
+#   bw_ramp_interleave.node_<DRAM>.node_<CXL>.<traffic>.<access>.<CXL %>.cores_<C>.txt
+# Each run reports one (injection delay, latency, bandwidth) row per delay in
+# mlc_injection.delay. Every row of every run is written to curves.csv, and the
+# knee of each curve, where the latency starts rising sharply, to knees.csv.
+
+import argparse
+import csv
+import os
+import re
+
+# Columns of the tidy curve dataset
+CURVE_COLUMNS = ['test', 'dram_node', 'cxl_node', 'traffic', 'access', 'dram_ratio', 'cxl_ratio', 'cores',
+                 'inject_delay', 'latency_ns', 'bandwidth_mbs']
+
+# Columns that identify one curve
+CONFIG_COLUMNS = CURVE_COLUMNS[:8]
+
+# Columns of the per-curve summary, after the configuration columns
+SUMMARY_COLUMNS = ['points', 'unloaded_latency_ns', 'peak_bandwidth_mbs', 'peak_latency_ns',
+                   'knee_delay', 'knee_latency_ns', 'knee_bandwidth_mbs']
+
+RAMP_FILE_PATTERN = re.compile(r'bw_ramp\.node_(\d+)\.(\w+)\.(\w+)\.(\d+):(\d+)\.cores_(\d+)\.txt$')
+INTERLEAVE_FILE_PATTERN = re.compile(r'bw_ramp_interleave\.node_(\d+)\.node_(\d+)\.(\w+)\.(\w+)\.(\d+)\.cores_(\d+)\.txt$')
+
+# A result row of the loaded latency table: "<delay> <latency ns> <bandwidth MB/s>"
+RESULT_ROW_PATTERN = re.compile(r'^\s*(\d+)\s+(\d+(?:\.\d+)?)\s+(\d+(?:\.\d+)?)\s*$')
+
+
+# Parse the output of one 'mlc --loaded_latency' run into a list of
+# (inject delay, latency ns, bandwidth MB/s) tuples, in the order MLC reports them
+def parse_loaded_latency(text):
+    rows = []
+    in_table = False
+    for line in text.splitlines():
+        if line.startswith('=========='):
+            in_table = True
+            continue
+        match = RESULT_ROW_PATTERN.match(line)
+        if in_table and match:
+            rows.append((int(match.group(1)), float(match.group(2)), float(match.group(3))))
+    return rows
+
+
+# Return the test configuration encoded in a loaded latency file name, or None
+def parse_file_name(filename):
+    match = RAMP_FILE_PATTERN.match(filename)
+    if match:
+        node, traffic, access, dram_ratio, cxl_ratio, cores = match.groups()
+        return {
+            'test': 'bw_ramp',
+            # A single-node ramp tests either the DRAM node (100:0) or the CXL node (0:100)
+            'dram_node': int(node) if int(dram_ratio) > 0 else None,
+            'cxl_node': int(node) if int(cxl_ratio) > 0 else None,
+            'traffic': traffic,
+            'access': access,
+            'dram_ratio': int(dram_ratio),
+            'cxl_ratio': int(cxl_ratio),
+            'cores': int(cores),
+        }
+    match = INTERLEAVE_FILE_PATTERN.match(filename)
+    if match:
+        dram_node, cxl_node, traffic, access, cxl_ratio, cores = match.groups()
+        return {
+            'test': 'bw_ramp_interleave',
+            'dram_node': int(dram_node),
+            'cxl_node': int(cxl_node),
+            'traffic': traffic,
+            'access': access,
+            'dram_ratio': 100 - int(cxl_ratio),
+            'cxl_ratio': int(cxl_ratio),
+            'cores': int(cores),
+        }
+    return None
+
+
+# Find the knee of a loaded latency curve with the Kneedle method: order the
+# points from the lightest to the heaviest load (decreasing injection delay),
+# normalize bandwidth and latency to [0, 1] and pick the point furthest below
+# the diagonal, i.e. the most bandwidth gained before the latency takes off.
+# Returns the knee (delay, latency, bandwidth) tuple, or None if the curve has
+# fewer than three points or is flat.
+def find_knee(points):
+    points = sorted(points, key=lambda p: -p[0])
+    if len(points) < 3:
+        return None
+    latencies = [p[1] for p in points]
+    bandwidths = [p[2] for p in points]
+    min_lat, max_lat = min(latencies), max(latencies)
+    min_bw, max_bw = min(bandwidths), max(bandwidths)
+    if max_lat == min_lat or max_bw == min_bw:
+        return None
+
+    def distance(p):
+        return (p[2] - min_bw) / (max_bw - min_bw) - (p[1] - min_lat) / (max_lat - min_lat)
+
+    return max(points, key=distance)
+
+
+# Summarize one curve: unloaded latency (largest delay), peak bandwidth and the knee
+def summarize_curve(points):
+    unloaded = max(points, key=lambda p: p[0])
+    peak = max(points, key=lambda p: p[2])
+    knee = find_knee(points) or (None, None, None)
+    return dict(zip(SUMMARY_COLUMNS, [len(points), unloaded[1], peak[2], peak[1], *knee]))
+
+
+# Parse every loaded latency file in 'directory'. Returns {config tuple: [points]}
+def read_curves(directory):
+    curves = {}
+    for filename in sorted(os.listdir(directory)):
+        config = parse_file_name(filename)
+        if config is None:
+            continue
+        with open(os.path.join(directory, filename)) as f:
+            points = parse_loaded_latency(f.read())
+        if not points:
+            print(f'Warning: no loaded latency results in {filename}')
+            continue
+        curves[tuple(config[c] for c in CONFIG_COLUMNS)] = points
+    return curves
+
+
+def write_csv(path, columns, rows):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f'Wrote {len(rows)} rows to {path}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse the MLC loaded latency curves saved by mlc.sh into curves.csv and knees.csv")
+    parser.add_argument('Directory', metavar='Directory', type=str, help='the loaded_latency directory of an mlc.sh result')
+    parser.add_argument('-o', '--output', type=str, help='output directory (default: the input directory)')
+    args = parser.parse_args()
+
+    output = args.output or args.Directory
+    curves = read_curves(args.Directory)
+    curve_rows = []
+    knee_rows = []
+    for config, points in sorted(curves.items(), key=lambda item: tuple(str(v) for v in item[0])):
+        config = dict(zip(CONFIG_COLUMNS, config))
+        for delay, latency, bandwidth in points:
+            curve_rows.append(dict(config, inject_delay=delay, latency_ns=latency, bandwidth_mbs=bandwidth))
+        knee_rows.append(dict(config, **summarize_curve(points)))
+
+    os.makedirs(output, exist_ok=True)
+    write_csv(os.path.join(output, 'curves.csv'), CURVE_COLUMNS, curve_rows)
+    write_csv(os.path.join(output, 'knees.csv'), CONFIG_COLUMNS + SUMMARY_COLUMNS, knee_rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,610 @@
+#!/usr/bin/python3
+
+# Run the MLC test plan of mlc.sh and collect the results in one dataset.
+#
+# The driver builds the list of MLC runs (idle latency, peak bandwidth, the
+# bandwidth ramps of each node and the DRAM + CXL interleave ramps), writes the
+# MLC input spec of each run, runs MLC and parses its output. Every measured
+# point is appended to mlc_results.csv in the output directory as one row with
+# the full run configuration as columns, so results of different hosts and runs
+# can be concatenated and filtered without parsing file names.
+#
+# The raw MLC output of every run is kept next to the results (the ramps in
+# loaded_latency/, see loaded_latency.py). Runs already recorded in
+# mlc_results.csv are skipped, so an interrupted run is resumed by starting the
+# driver again with the same output directory. A run whose raw output exists but
+# was not recorded is parsed instead of being measured again.
+
+import argparse
+import contextlib
+import csv
+import json
+import os
+import re
+import shutil
+import socket as socket_module
+import subprocess
+import sys
+import time
+
+import loaded_latency
+import ratio_search
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'lib'))
+import hugepages
+import topology
+
+RESULTS_FILE = 'mlc_results.csv'
+SEARCH_FILE = 'ratio_search.csv'
+OPTIONS_FILE = 'mlc_driver.json'
+
+# Columns of the results dataset and their pandas dtypes (see read_results())
+RESULT_COLUMNS = {
+    'run_id': 'string',
+    'test': 'string',
+    'hostname': 'string',
+    'mlc_version': 'string',
+    'socket': 'Int64',
+    'cpus': 'string',
+    'cores': 'Int64',
+    'traffic': 'string',
+    'access': 'string',
+    'buffer_size_kb': 'Int64',
+    'dram_node': 'Int64',
+    'cxl_node': 'Int64',
+    'dram_ratio': 'Int64',
+    'cxl_ratio': 'Int64',
+    'all_threads': 'boolean',
+    'avx512': 'boolean',
+    'sample_time': 'Int64',
+    'inject_delay': 'Int64',
+    'latency_ns': 'float64',
+    'bandwidth_mbs': 'float64',
+    'finished': 'string',
+}
+
+# Tests of the plan, in the order they run
+TESTS = ['idle_latency', 'bandwidth', 'bw_ramp', 'bw_ramp_interleave']
+
+# Peak bandwidth traffic types and the names of their output files. Reads and
+# writes are as observed on the memory controller: R = 100% reads, W2 = 2 reads
+# and 1 write, W5 = 1 read and 1 write, W6 = 100% non-temporal writes, W7 = 2
+# reads and 1 non-temporal write. Depending on the power budget, BIOS settings
+# and other factors, using every CPU of the socket may not yield the maximum
+# bandwidth; the ramps measure the bandwidth at each core count.
+BANDWIDTH_TRAFFIC = [
+    ('R', 'READ'),
+    ('W6', 'WRITE_NT'),
+    ('W7', '2READ_1WRITE_NT'),
+    ('W5', '1READ_1WRITE'),
+    ('W2', '2READ_1WRITE'),
+]
+
+# Interleave traffic types and their CXL percentages. W21: 100% reads,
+# W23: 3 reads and 1 write, W27: 2 reads and 1 non-temporal write.
+# A ratio of 50 is only supported by W21.
+INTERLEAVE_RATIOS = {
+    'W21': [10, 25, 50],
+    'W23': [10, 25],
+    'W27': [10, 25],
+}
+
+# MLC's default injection delays, used for the full loaded latency curve
+FULL_CURVE_DELAYS = [0, 2, 8, 15, 50, 100, 200, 300, 400, 500, 700, 1000, 1300, 1700, 2500, 3500, 5000, 9000, 20000]
+
+# Options that change the measurements. Resuming with different values is refused.
+RESUME_OPTIONS = ['socket', 'first_cpu', 'cpu_range', 'cores_per_socket', 'dram_node', 'cxl_node', 'all_threads',
+                  'avx512', 'sample_time', 'buffer_size', 'delays']
+
+
+# Parse a list such as "0-3,8" into a list of ints
+parse_list = topology.parse_list
+
+
+# MLC version string from 'mlc --version', or None if it cannot be determined
+def mlc_version(mlc):
+    try:
+        output = subprocess.run([mlc, '--version'], capture_output=True, text=True).stdout
+    except OSError:
+        return None
+    match = re.search(r'v(\d+(?:\.\d+)*)', output)
+    return match.group(1) if match else None
+
+
+# Idle latency in ns from the output of 'mlc --idle_latency'
+def parse_idle_latency(text):
+    match = re.search(r'Each iteration took .*?\(\s*(\d+(?:\.\d+)?)\s*ns\)', text)
+    return float(match.group(1)) if match else None
+
+
+# Build the run plan. Each run is a dict with the result columns that describe
+# it, the MLC arguments ('argv', without the MLC binary), the input spec line
+# ('spec', or None) and the path of its raw output ('output').
+def build_plan(args):
+    x = ['-X'] if args.all_threads else []
+    step = 1 if args.all_threads else 2
+    nodes = [n for n in (args.cxl_node, args.dram_node) if n is not None]
+    common = {
+        'socket': args.socket,
+        'buffer_size_kb': args.buffer_size,
+        'all_threads': args.all_threads,
+        'avx512': args.avx512,
+    }
+
+    def ratios(node):
+        # A single node ramp measures either the DRAM node or the CXL node
+        return (100, 0) if node == args.dram_node else (0, 100)
+
+    plan = []
+    if 'idle_latency' in args.tests:
+        for node in nodes:
+            # Random access uses a 256 byte stride (-l256 -r)
+            for access, extra in (('seq', []), ('rand', ['-l256', '-r'])):
+                dram_ratio, cxl_ratio = ratios(node)
+                plan.append(dict(common, **{
+                    'run_id': f'idle_latency.node_{node}.{access}',
+                    'test': 'idle_latency',
+                    'cpus': str(args.first_cpu),
+                    'cores': 1,
+                    'access': access,
+                    'dram_node': node if dram_ratio else None,
+                    'cxl_node': node if cxl_ratio else None,
+                    'dram_ratio': dram_ratio,
+                    'cxl_ratio': cxl_ratio,
+                    'argv': ['--idle_latency', f'-c{args.first_cpu}', f'-j{node}', *extra, *x],
+                    'spec': None,
+                    'output': os.path.join(args.output, f'idle_latency_{access}_numa_node_{node}.txt'),
+                }))
+
+    if 'bandwidth' in args.tests:
+        for node in nodes:
+            for traffic, name in BANDWIDTH_TRAFFIC:
+                for access, short in (('seq', 'seq'), ('rand', 'rnd')):
+                    dram_ratio, cxl_ratio = ratios(node)
+                    run_id = f'bandwidth.node_{node}.{traffic}.{access}'
+                    plan.append(dict(common, **{
+                        'run_id': run_id,
+                        'test': 'bandwidth',
+                        'cpus': args.cpu_range,
+                        'cores': len(parse_list(args.cpu_range)),
+                        'traffic': traffic,
+                        'access': access,
+                        'dram_node': node if dram_ratio else None,
+                        'cxl_node': node if cxl_ratio else None,
+                        'dram_ratio': dram_ratio,
+                        'cxl_ratio': cxl_ratio,
+                        'sample_time': args.sample_time,
+                        'argv': ['--loaded_latency', '-d0', f'-o{run_input(args, run_id)}', f'-t{args.sample_time}', '-T',
+                                 *(['-Z'] if args.avx512 else []), *x],
+                        'numactl': ['-N', str(args.socket)],
+                        'spec': f'{args.cpu_range} {traffic} {access} {args.buffer_size} dram {node}',
+                        'output': os.path.join(args.output, f'bw_node{node}_{short}_{name}.txt'),
+                    }))
+
+    if 'bw_ramp' in args.tests:
+        for node in nodes:
+            dram_ratio, cxl_ratio = ratios(node)
+            for c in range(0, args.cores_per_socket, step):
+                for access in ('seq', 'rand'):
+                    run_id = f'bw_ramp.node_{node}.R.{access}.{dram_ratio}:{cxl_ratio}.cores_{c}'
+                    plan.append(dict(common, **{
+                        'run_id': run_id,
+                        'test': 'bw_ramp',
+                        'cpus': f'{args.first_cpu}-{args.first_cpu + c}',
+                        'cores': c,
+                        'traffic': 'R',
+                        'access': access,
+                        'dram_node': node if dram_ratio else None,
+                        'cxl_node': node if cxl_ratio else None,
+                        'dram_ratio': dram_ratio,
+                        'cxl_ratio': cxl_ratio,
+                        'argv': [f'-i{args.first_cpu}', '--loaded_latency', f'-g{delay_file(args)}',
+                                 f'-o{run_input(args, run_id)}', *x],
+                        'spec': f'{args.first_cpu}-{args.first_cpu + c} R {access} {args.buffer_size} dram {node}',
+                        'output': os.path.join(args.output, 'loaded_latency', f'{run_id}.txt'),
+                    }))
+
+    if 'bw_ramp_interleave' in args.tests and args.dram_node is not None and args.cxl_node is not None:
+        for c in range(0, args.cores_per_socket, step):
+            for traffic, cxl_ratios in INTERLEAVE_RATIOS.items():
+                for cxl_ratio in cxl_ratios:
+                    plan.append(interleave_run(args, 'bw_ramp_interleave', traffic, c, cxl_ratio))
+    return plan
+
+
+# A DRAM + CXL interleave run of 'traffic' on the first 'cores' + 1 CPUs with
+# 'cxl_ratio' percent of the buffer on the CXL node. The ramps measure every
+# delay of the delay file; the ratio search measures the peak (zero delay)
+# bandwidth over the sample time of the peak bandwidth tests.
+def interleave_run(args, test, traffic, cores, cxl_ratio):
+    run_id = f'{test}.node_{args.dram_node}.node_{args.cxl_node}.{traffic}.seq.{cxl_ratio}.cores_{cores}'
+    if test == 'ratio_search':
+        delays = ['-d0', f'-t{args.sample_time}']
+    else:
+        delays = [f'-g{delay_file(args)}']
+    return {
+        'run_id': run_id,
+        'test': test,
+        'socket': args.socket,
+        'buffer_size_kb': args.buffer_size,
+        'all_threads': args.all_threads,
+        'avx512': args.avx512,
+        'cpus': f'{args.first_cpu}-{args.first_cpu + cores}',
+        'cores': cores,
+        'traffic': traffic,
+        'access': 'seq',
+        'dram_node': args.dram_node,
+        'cxl_node': args.cxl_node,
+        'dram_ratio': 100 - cxl_ratio,
+        'cxl_ratio': cxl_ratio,
+        'sample_time': args.sample_time if test == 'ratio_search' else None,
+        'argv': [f'-i{args.first_cpu}', '--loaded_latency', *delays, f'-o{run_input(args, run_id)}'],
+        'spec': (f'{args.first_cpu}-{args.first_cpu + cores} {traffic} seq {args.buffer_size} '
+                 f'dram {args.dram_node} dram {args.cxl_node} {cxl_ratio}'),
+        'output': os.path.join(args.output, 'loaded_latency' if test == 'bw_ramp_interleave' else test, f'{run_id}.txt'),
+    }
+
+
+# Path of the MLC input spec file of a run
+def run_input(args, run_id):
+    return os.path.join(args.output, 'inputs', f'{run_id}.input')
+
+
+# Path of the injection delay file of the loaded latency runs
+def delay_file(args):
+    return os.path.join(args.output, 'inputs', 'injection.delay')
+
+
+# Parse the raw output of a run into result rows (result column dicts)
+def parse_run(run, text):
+    config = {column: run.get(column) for column in RESULT_COLUMNS if column in run}
+    if run['test'] == 'idle_latency':
+        latency = parse_idle_latency(text)
+        return [dict(config, latency_ns=latency)] if latency is not None else []
+    rows = []
+    for delay, latency, bandwidth in loaded_latency.parse_loaded_latency(text):
+        # The peak bandwidth test (-T) reports bandwidth only
+        rows.append(dict(config, inject_delay=delay, latency_ns=None if run['test'] == 'bandwidth' else latency,
+                         bandwidth_mbs=bandwidth))
+    return rows
+
+
+# Run MLC for one run, echoing and saving its output. Returns the output text,
+# or None if MLC failed.
+def execute_run(args, run):
+    if run['spec'] is not None:
+        with open(run_input(args, run['run_id']), 'w') as f:
+            f.write(run['spec'] + '\n')
+    cmd = [args.mlc, *run['argv']]
+    if run.get('numactl'):
+        cmd = [args.numactl, *run['numactl'], *cmd]
+    print(f"=== {run['run_id']}: {' '.join(cmd)}", flush=True)
+    process = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    sys.stdout.write(process.stdout)
+    if process.returncode != 0:
+        print(f"ERROR: MLC failed with exit code {process.returncode} for {run['run_id']}")
+        return None
+    tmp_path = f"{run['output']}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(process.stdout)
+    os.replace(tmp_path, run['output'])
+    return process.stdout
+
+
+# run_ids already recorded in a results file
+def recorded_runs(path):
+    if not os.path.exists(path):
+        return set()
+    with open(path, newline='') as f:
+        return {row['run_id'] for row in csv.DictReader(f)}
+
+
+# Zero injection delay rows of a test recorded in a results file, by run_id
+def recorded_rows(path, test):
+    if not os.path.exists(path):
+        return {}
+    with open(path, newline='') as f:
+        return {row['run_id']: row for row in csv.DictReader(f)
+                if row['test'] == test and row['inject_delay'] and int(row['inject_delay']) == 0}
+
+
+# Append result rows to the results file, writing the header if it is new
+def append_rows(path, rows):
+    new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+    with open(path, 'a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(RESULT_COLUMNS), extrasaction='ignore')
+        if new_file:
+            writer.writeheader()
+        writer.writerows(rows)
+
+
+# Load a results file with the column types of RESULT_COLUMNS. Several files
+# (e.g. from different hosts) are concatenated. pandas is only needed for the
+# analysis, not to run the tests, so it is imported here.
+def read_results(*paths):
+    import pandas as pd
+    frames = [pd.read_csv(path, dtype={c: t for c, t in RESULT_COLUMNS.items() if t != 'boolean'}) for path in paths]
+    df = pd.concat(frames, ignore_index=True)
+    for column, dtype in RESULT_COLUMNS.items():
+        if dtype == 'boolean':
+            df[column] = df[column].map({'True': True, 'False': False, True: True, False: False}).astype('boolean')
+    return df
+
+
+# Write the legacy per-ramp CSV files read by gen_plot.py and gen_excel.py: the
+# zero injection delay point of each ramp step
+def write_legacy_csv(args, plan):
+    rows = {}
+    with open(os.path.join(args.output, RESULTS_FILE), newline='') as f:
+        for row in csv.DictReader(f):
+            if row['inject_delay'] and int(row['inject_delay']) == 0:
+                rows[row['run_id']] = row
+
+    files = {}
+    for run in plan:
+        row = rows.get(run['run_id'])
+        if row is None:
+            continue
+        ratiostr = f"{run['dram_ratio']}:{run['cxl_ratio']}"
+        if run['test'] == 'bw_ramp':
+            node = run['dram_node'] if run['dram_node'] is not None else run['cxl_node']
+            name = f"bw_ramp.results.node_{node}.{run['traffic']}.{run['access']}.{ratiostr}.csv"
+            header = 'Node,DRAM:CXL Ratio,NUMA Node Tested,Num of Cores,IO Pattern,Access Pattern,Latency(ns),Bandwidth(MB/s)'
+            line = f"DRAM:CXL,\"{ratiostr}\",{node},{run['cores']},{run['traffic']},{run['access']},{row['latency_ns']},{row['bandwidth_mbs']}"
+        elif run['test'] == 'bw_ramp_interleave':
+            name = (f"bw_ramp_interleave.results.node_{run['dram_node']}.node_{run['cxl_node']}."
+                    f"{run['traffic']}.{run['access']}.{run['cxl_ratio']}.csv")
+            header = 'Node,DRAM:CXL Ratio,Num of Cores,IO Pattern,Access Pattern,Latency(ns),Bandwidth(MB/s)'
+            line = f"DRAM:CXL,\"{ratiostr}\",{run['cores']},{run['traffic']},{run['access']},{row['latency_ns']},{row['bandwidth_mbs']}"
+        else:
+            continue
+        files.setdefault(name, [header]).append(line)
+
+    for name, lines in files.items():
+        with open(os.path.join(args.output, name), 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+
+
+# Measure a run (or parse its raw output if MLC finished but the results were
+# not recorded) and append its rows to the results file. Returns the rows, or an
+# empty list if the run failed.
+def measure_run(args, run, results_path, host, version, position=''):
+    text = None
+    if not args.no_resume and os.path.exists(run['output']):
+        with open(run['output']) as f:
+            text = f.read()
+        if not parse_run(run, text):
+            text = None
+    if text is None:
+        if position:
+            print(position, end=' ')
+        text = execute_run(args, run)
+    rows = parse_run(run, text) if text is not None else []
+    if not rows:
+        print(f"WARNING: no results in the MLC output of {run['run_id']}")
+        return []
+    finished = time.strftime('%Y-%m-%dT%H:%M:%S')
+    rows = [dict(row, hostname=host, mlc_version=version, finished=finished) for row in rows]
+    append_rows(results_path, rows)
+    return rows
+
+
+# Largest CXL percentage of the ratio search of a traffic type
+def search_max_ratio(args, traffic):
+    return args.search_max_ratio or max(INTERLEAVE_RATIOS[traffic])
+
+
+# Search the bandwidth-maximizing CXL percentage of each search traffic type and
+# core count (see ratio_search.py) and write the optima to ratio_search.csv.
+# Every evaluated ratio is a 'ratio_search' run in the results file, so a resumed
+# search replays the recorded points and only measures the missing ones.
+# Returns the run_ids that failed.
+def run_ratio_search(args, results_path, host, version):
+    recorded = recorded_rows(results_path, 'ratio_search')
+    summary = []
+    failed = []
+    for traffic in args.search_traffic:
+        max_ratio = search_max_ratio(args, traffic)
+        for cores in args.search_cores:
+            print(f"=== Searching the best DRAM:CXL ratio of {traffic} on {cores} cores "
+                  f"(CXL {args.search_min_ratio}-{max_ratio}%)", flush=True)
+            rows = {}
+
+            def bandwidth(cxl_ratio):
+                run = interleave_run(args, 'ratio_search', traffic, cores, cxl_ratio)
+                row = recorded.get(run['run_id'])
+                if row is None:
+                    measured = measure_run(args, run, results_path, host, version)
+                    if not measured:
+                        raise RuntimeError(run['run_id'])
+                    row = measured[0]
+                rows[cxl_ratio] = row
+                print(f"    CXL {cxl_ratio:3d}%: {float(row['bandwidth_mbs']):.1f} MB/s", flush=True)
+                return float(row['bandwidth_mbs'])
+
+            try:
+                best, values = ratio_search.golden_section_max(bandwidth, args.search_min_ratio, max_ratio,
+                                                               args.search_tolerance)
+            except RuntimeError as e:
+                failed.append(str(e))
+                continue
+            dram_weight, cxl_weight = ratio_search.interleave_weights(100 - best, best)
+            print(f"    Best: DRAM:CXL {100 - best}:{best} ({float(rows[best]['bandwidth_mbs']):.1f} MB/s) "
+                  f"after {len(values)} runs")
+            summary.append({
+                'dram_node': args.dram_node,
+                'cxl_node': args.cxl_node,
+                'traffic': traffic,
+                'access': 'seq',
+                'cores': cores,
+                'cpus': rows[best]['cpus'],
+                'min_cxl_ratio': args.search_min_ratio,
+                'max_cxl_ratio': max_ratio,
+                'dram_ratio': 100 - best,
+                'cxl_ratio': best,
+                'dram_weight': dram_weight,
+                'cxl_weight': cxl_weight,
+                'bandwidth_mbs': rows[best]['bandwidth_mbs'],
+                'latency_ns': rows[best]['latency_ns'],
+                'evaluations': len(values),
+            })
+    loaded_latency.write_csv(os.path.join(args.output, SEARCH_FILE), ratio_search.SUMMARY_COLUMNS, summary)
+    return failed
+
+
+# Record the options of the run, or check that a resumed run uses the same ones
+def check_resume_options(args):
+    path = os.path.join(args.output, OPTIONS_FILE)
+    options = {key: getattr(args, key) for key in RESUME_OPTIONS}
+    # --no-resume measures every run again, so the options of the directory are replaced
+    if os.path.exists(path) and not args.no_resume:
+        with open(path) as f:
+            previous = json.load(f)
+        changed = [key for key in RESUME_OPTIONS if previous.get(key) != options[key]]
+        if changed:
+            print(f"Error: {args.output} was produced with different options ({', '.join(changed)}). "
+                  "Use another output directory or --no-resume.")
+            sys.exit(1)
+    with open(path, 'w') as f:
+        json.dump(options, f, indent=2)
+
+
+# Reserve --hugepages huge pages on each tested node while MLC runs, or nothing
+def huge_page_reservation(args):
+    if not args.hugepages:
+        return contextlib.nullcontext()
+    nodes = [n for n in (args.dram_node, args.cxl_node) if n is not None]
+    return hugepages.HugePageReservation({node: args.hugepages for node in nodes}, args.hugepage_size)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the MLC latency and bandwidth tests of mlc.sh and collect the results in one CSV dataset")
+    parser.add_argument('-o', '--output', required=True, help='output directory. An existing directory is resumed')
+    parser.add_argument('-c', '--cxl-node', type=int, help='NUMA node backed by CXL (default with --auto-nodes: the nearest CXL node)')
+    parser.add_argument('-d', '--dram-node', type=int, help='NUMA node backed by DRAM (default with --auto-nodes: the first DRAM node)')
+    parser.add_argument('--auto-nodes', action='store_true', help='pick the DRAM and CXL nodes that are not given from the memory topology (lib/topology.py)')
+    parser.add_argument('-s', '--socket', type=int, help='CPU socket (NUMA node) that runs MLC (default: the DRAM node)')
+    parser.add_argument('-m', '--mlc', default=shutil.which('mlc'), help='path to the MLC executable')
+    parser.add_argument('--numactl', default=shutil.which('numactl'), help='path to numactl')
+    parser.add_argument('--first-cpu', type=int, help='first CPU of the socket (default: from sysfs)')
+    parser.add_argument('--cpu-range', help='CPUs of the socket for the peak bandwidth tests (default: from sysfs)')
+    parser.add_argument('--cores-per-socket', type=int, help='cores per socket for the ramps (default: from sysfs)')
+    parser.add_argument('-X', '--all-threads', action='store_true', help='use all hyper-threads of each core')
+    parser.add_argument('--avx512', action=argparse.BooleanOptionalAction, default=True, help='use AVX-512 loads/stores in the peak bandwidth tests (-Z)')
+    parser.add_argument('-t', '--sample-time', type=int, default=30, help='MLC sample time of the peak bandwidth tests in seconds')
+    parser.add_argument('--buffer-size', type=int, default=40000, help='MLC buffer size per thread in KiB')
+    parser.add_argument('--delays', type=parse_list, default=[0], help='comma separated injection delays of the ramps (default: 0)')
+    parser.add_argument('-l', '--full-curve', action='store_true', help=f'measure the full loaded latency curve ({",".join(map(str, FULL_CURVE_DELAYS))})')
+    parser.add_argument('--tests', type=lambda v: v.split(','), default=TESTS, help=f'comma separated tests to run ({",".join(TESTS)})')
+    parser.add_argument('--ratio-search', action='store_true', help=f'search the bandwidth-maximizing DRAM:CXL ratio of each interleave traffic type and core count, written to {SEARCH_FILE}')
+    parser.add_argument('--search-traffic', type=lambda v: v.split(','), default=list(INTERLEAVE_RATIOS), help='comma separated traffic types of the ratio search (default: %(default)s)')
+    parser.add_argument('--search-cores', type=parse_list, help='comma separated core counts of the ratio search, e.g. 3,7,15,27 (default: the ramp core counts)')
+    parser.add_argument('--search-min-ratio', type=int, default=1, help='smallest CXL percentage of the ratio search (default: %(default)s)')
+    parser.add_argument('--search-max-ratio', type=int, help='largest CXL percentage of the ratio search (default: the largest ratio of the traffic type in the interleave ramps)')
+    parser.add_argument('--search-tolerance', type=int, default=1, help='stop the ratio search once the bracket is at most this many percentage points wide (default: %(default)s)')
+    parser.add_argument('--hugepages', type=int, help='reserve this many huge pages on each tested node while MLC runs, and restore the original counts afterwards (default: leave the huge pages as they are)')
+    parser.add_argument('--hugepage-size', default='2M', help='size of the --hugepages pages: 2M or 1G (default: %(default)s)')
+    parser.add_argument('--legacy-csv', action='store_true', help='also write the per-ramp CSV files read by gen_plot.py and gen_excel.py')
+    parser.add_argument('--no-resume', action='store_true', help='measure every run again, even if it is recorded in the output directory')
+    parser.add_argument('--dry-run', action='store_true', help='print the plan without running MLC')
+    args = parser.parse_args(argv)
+
+    if args.auto_nodes and (args.cxl_node is None or args.dram_node is None):
+        dram_node, cxl_node = topology.pick_nodes(topology.load_topology(), args.socket)
+        if args.dram_node is None and dram_node is not None:
+            args.dram_node = dram_node
+            print(f'Using DRAM node {dram_node}')
+        if args.cxl_node is None and cxl_node is not None:
+            args.cxl_node = cxl_node
+            print(f'Using CXL node {cxl_node}')
+    if args.cxl_node is None and args.dram_node is None:
+        parser.error("at least one of --cxl-node and --dram-node is required")
+    unknown = [t for t in args.tests if t not in TESTS]
+    if unknown:
+        parser.error(f"unknown tests: {', '.join(unknown)}")
+    if args.ratio_search:
+        if args.cxl_node is None or args.dram_node is None:
+            parser.error("--ratio-search requires both --cxl-node and --dram-node")
+        unknown = [t for t in args.search_traffic if t not in INTERLEAVE_RATIOS]
+        if unknown:
+            parser.error(f"unknown search traffic types: {', '.join(unknown)}. Use {', '.join(INTERLEAVE_RATIOS)}")
+        # Without --search-max-ratio the maximum depends on the traffic type, e.g. 25 for W23 and W27
+        for traffic in args.search_traffic:
+            if not 1 <= args.search_min_ratio < search_max_ratio(args, traffic) <= 99:
+                parser.error(f"the search ratios of {traffic} must satisfy 1 <= --search-min-ratio < "
+                             f"--search-max-ratio <= 99 (the maximum is {search_max_ratio(args, traffic)})")
+        if args.search_tolerance < 1:
+            parser.error("--search-tolerance must be at least 1")
+    if args.full_curve:
+        args.delays = FULL_CURVE_DELAYS
+    topo = topology.load_topology()
+    if args.socket is None:
+        args.socket = args.dram_node if args.dram_node is not None else 0
+    if args.cpu_range is None:
+        args.cpu_range = topology.format_list(topology.node_cpus(topo, args.socket))
+    if args.first_cpu is None:
+        args.first_cpu = parse_list(args.cpu_range)[0]
+    if args.cores_per_socket is None:
+        args.cores_per_socket = topology.cores_per_socket(topo)
+    if args.search_cores is None:
+        args.search_cores = list(range(0, args.cores_per_socket, 1 if args.all_threads else 2))
+    if not args.dry_run and (not args.mlc or not os.access(args.mlc, os.X_OK)):
+        parser.error("mlc command not found. Use -m to specify the path")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    plan = build_plan(args)
+    results_path = os.path.join(args.output, RESULTS_FILE)
+
+    if args.dry_run:
+        for run in plan:
+            print(f"{run['run_id']}: mlc {' '.join(run['argv'])}" + (f"  [{run['spec']}]" if run['spec'] else ''))
+        print(f"{len(plan)} runs")
+        if args.ratio_search:
+            print(f"Ratio search of {','.join(args.search_traffic)} on {len(args.search_cores)} core counts "
+                  f"(CXL {args.search_min_ratio}% to {f'{args.search_max_ratio}%' if args.search_max_ratio else 'the ramp maximum'})")
+        return
+
+    os.makedirs(os.path.join(args.output, 'inputs'), exist_ok=True)
+    os.makedirs(os.path.join(args.output, 'loaded_latency'), exist_ok=True)
+    if args.ratio_search:
+        os.makedirs(os.path.join(args.output, 'ratio_search'), exist_ok=True)
+    if args.no_resume and os.path.exists(results_path):
+        os.remove(results_path)
+    check_resume_options(args)
+    with open(delay_file(args), 'w') as f:
+        f.write('\n'.join(map(str, args.delays)) + '\n')
+
+    done = recorded_runs(results_path)
+    host = socket_module.gethostname()
+    version = mlc_version(args.mlc)
+    print(f"{len(plan)} runs, {len([r for r in plan if r['run_id'] in done])} already recorded in {results_path}")
+
+    # Failed runs are not recorded, so they are retried when the driver is started again
+    failed = []
+    try:
+        with huge_page_reservation(args):
+            for i, run in enumerate(plan):
+                if run['run_id'] in done:
+                    continue
+                if not measure_run(args, run, results_path, host, version, f"[{i + 1}/{len(plan)}]"):
+                    failed.append(run['run_id'])
+
+            if args.ratio_search:
+                failed += run_ratio_search(args, results_path, host, version)
+    except hugepages.HugePageError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+
+    if args.legacy_csv:
+        write_legacy_csv(args, plan)
+    print(f"Results: {results_path}")
+    if failed:
+        print(f"ERROR: {len(failed)} runs failed: {', '.join(failed)}. Start the driver again to retry them.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
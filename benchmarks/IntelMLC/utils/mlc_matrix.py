@@ -0,0 +1,248 @@
+#!/usr/bin/python3
+
+# Capture the MLC idle latency and peak bandwidth matrices of every CPU socket x
+# memory node pair, compare them with the HMAT numbers reported by the firmware
+# and draw them as heatmaps.
+#
+# 'mlc --latency_matrix' and 'mlc --bandwidth_matrix' measure from the CPUs of
+# each NUMA node with CPUs to the memory of every node, including the CPU-less
+# nodes of CXL memory expanders. The raw output of each is saved in the data
+# directory (latency_matrix.txt, bandwidth_matrix.txt) and parsed into
+# matrix.csv, one row per (metric, CPU node, memory node).
+#
+# With an HMAT, the kernel reports the read latency and bandwidth of every memory
+# node from its nearest CPU nodes in /sys/devices/system/node/node<N>/access1
+# (access0 if there is no access1), read with lib/topology.py.
+# These are added to matrix.csv with the ratio of the measured to the reported
+# value. The kernel reports bandwidth in MiB/s; it is converted to MB/s, the
+# unit of MLC.
+#
+# Several data directories can be given to compare hosts: their matrices are
+# combined into matrix_comparison.csv with one column per host.
+
+import argparse
+import contextlib
+import csv
+import os
+import re
+import socket as socket_module
+import subprocess
+import sys
+
+import loaded_latency
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'lib'))
+import hugepages
+import topology
+
+MATRIX_FILES = {
+    'latency_ns': 'latency_matrix.txt',
+    'bandwidth_mbs': 'bandwidth_matrix.txt',
+}
+
+MATRIX_COLUMNS = ['hostname', 'metric', 'cpu_node', 'memory_node', 'cpu_less', 'value', 'hmat_value', 'hmat_ratio']
+
+HMAT_ATTRIBUTES = {
+    'latency_ns': 'read_latency',
+    'bandwidth_mbs': 'read_bandwidth',
+}
+
+MIB_PER_MB = 1.048576
+
+
+# Parse the matrix of an MLC matrix test into {(cpu node, memory node): value}
+def parse_matrix(text):
+    matrix = {}
+    columns = None
+    for line in text.splitlines():
+        header = re.match(r'^\s*Numa node((?:\s+\d+)+)\s*$', line)
+        if header:
+            columns = [int(n) for n in header.group(1).split()]
+            continue
+        if columns is None:
+            continue
+        row = re.match(r'^\s*(\d+)((?:\s+(?:\d+(?:\.\d+)?|-))+)\s*$', line)
+        if row is None:
+            if matrix:
+                break
+            continue
+        for memory_node, value in zip(columns, row.group(2).split()):
+            if value != '-':
+                matrix[(int(row.group(1)), memory_node)] = float(value)
+    return matrix
+
+
+# HMAT read latency (ns) and bandwidth (MB/s) of each memory node from its
+# nearest CPU nodes: {(metric, cpu node, memory node): value}. Empty without an HMAT.
+def read_hmat(topo):
+    hmat = {}
+    for memory_node in topo['nodes']:
+        attributes = topology.access_attributes(topo, memory_node)
+        if attributes is None:
+            continue
+        for metric, attribute in HMAT_ATTRIBUTES.items():
+            if attribute not in attributes:
+                continue
+            value = attributes[attribute] * (MIB_PER_MB if metric == 'bandwidth_mbs' else 1)
+            for cpu_node in attributes['initiators']:
+                hmat[(metric, cpu_node, memory_node)] = value
+    return hmat
+
+
+# Run the MLC matrix tests whose raw output is not in 'directory' yet
+def run_matrices(directory, mlc, all_threads=False):
+    for metric, filename in MATRIX_FILES.items():
+        path = os.path.join(directory, filename)
+        if os.path.exists(path):
+            with open(path) as f:
+                if parse_matrix(f.read()):
+                    print(f'Using the {metric} matrix in {path}')
+                    continue
+        test = '--latency_matrix' if metric == 'latency_ns' else '--bandwidth_matrix'
+        cmd = [mlc, test] + (['-X'] if all_threads else [])
+        print(f"=== {' '.join(cmd)}", flush=True)
+        process = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        sys.stdout.write(process.stdout)
+        if process.returncode != 0:
+            print(f'ERROR: MLC failed with exit code {process.returncode}')
+            continue
+        with open(path, 'w') as f:
+            f.write(process.stdout)
+
+
+# Parse the matrices of a data directory into matrix rows. The CPU-less nodes are
+# read from the topology of this host, so they are only added with 'local'; the
+# HMAT numbers of this host are only compared with 'compare_hmat' as well.
+def matrix_rows(directory, hostname, local, compare_hmat=True):
+    topo = topology.load_topology() if local else None
+    hmat = read_hmat(topo) if local and compare_hmat else {}
+    cpu_less = {node for node, info in topo['nodes'].items() if not info['cpus']} if local else set()
+    rows = []
+    for metric, filename in MATRIX_FILES.items():
+        path = os.path.join(directory, filename)
+        if not os.path.exists(path):
+            continue
+        with open(path) as f:
+            matrix = parse_matrix(f.read())
+        for (cpu_node, memory_node), value in sorted(matrix.items()):
+            hmat_value = hmat.get((metric, cpu_node, memory_node))
+            rows.append({
+                'hostname': hostname,
+                'metric': metric,
+                'cpu_node': cpu_node,
+                'memory_node': memory_node,
+                'cpu_less': memory_node in cpu_less if local else None,
+                'value': value,
+                'hmat_value': hmat_value,
+                'hmat_ratio': value / hmat_value if hmat_value else None,
+            })
+    return rows
+
+
+# Read the hostname of a data directory from its mlc_results.csv, if any
+def directory_hostname(directory):
+    path = os.path.join(directory, 'mlc_results.csv')
+    if os.path.exists(path):
+        with open(path, newline='') as f:
+            for row in csv.DictReader(f):
+                return row['hostname']
+    return os.path.basename(os.path.abspath(directory))
+
+
+# Draw one heatmap per metric: CPU nodes as rows, memory nodes as columns
+def plot_heatmaps(rows, directory):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import numpy as np
+
+    for metric, title in (('latency_ns', 'Idle latency (ns)'), ('bandwidth_mbs', 'Peak read bandwidth (MB/s)')):
+        values = {(r['cpu_node'], r['memory_node']): r['value'] for r in rows if r['metric'] == metric}
+        if not values:
+            continue
+        cpu_nodes = sorted({c for c, _ in values})
+        memory_nodes = sorted({m for _, m in values})
+        data = np.full((len(cpu_nodes), len(memory_nodes)), np.nan)
+        for (c, m), value in values.items():
+            data[cpu_nodes.index(c), memory_nodes.index(m)] = value
+
+        fig, ax = plt.subplots(figsize=(1.5 + 1.2 * len(memory_nodes), 1.5 + 0.9 * len(cpu_nodes)))
+        image = ax.imshow(data, cmap='viridis_r' if metric == 'latency_ns' else 'viridis')
+        ax.set_xticks(range(len(memory_nodes)), [f'node {m}' for m in memory_nodes])
+        ax.set_yticks(range(len(cpu_nodes)), [f'node {c}' for c in cpu_nodes])
+        ax.set_xlabel('Memory NUMA node')
+        ax.set_ylabel('CPU NUMA node')
+        for i in range(len(cpu_nodes)):
+            for j in range(len(memory_nodes)):
+                if not np.isnan(data[i, j]):
+                    ax.text(j, i, f'{data[i, j]:.0f}', ha='center', va='center', color='w')
+        fig.colorbar(image, ax=ax)
+        ax.set_title(title)
+        fig.tight_layout()
+        path = os.path.join(directory, f"{MATRIX_FILES[metric][:-len('.txt')]}.png")
+        fig.savefig(path)
+        plt.close(fig)
+        print(f'Saved {path}')
+
+
+# Combine the matrix rows of several hosts into one table with a column per host
+def write_comparison(rows, path):
+    hosts = sorted({r['hostname'] for r in rows})
+    table = {}
+    for r in rows:
+        table.setdefault((r['metric'], r['cpu_node'], r['memory_node']), {})[r['hostname']] = r['value']
+    comparison = [dict(zip(['metric', 'cpu_node', 'memory_node'], key), **values) for key, values in sorted(table.items())]
+    loaded_latency.write_csv(path, ['metric', 'cpu_node', 'memory_node'] + hosts, comparison)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Capture, compare and plot the MLC idle latency and peak bandwidth matrices")
+    parser.add_argument('Directory', nargs='+', help='data directories. Several directories (e.g. of different hosts) are compared')
+    parser.add_argument('--run', action='store_true', help='run the MLC matrix tests missing from the (first) data directory on this host')
+    parser.add_argument('-m', '--mlc', default='mlc', help='path to the MLC executable (with --run)')
+    parser.add_argument('-X', '--all-threads', action='store_true', help='use all hyper-threads of each core (with --run)')
+    parser.add_argument('--hugepages', type=int, help='reserve this many huge pages on each node with memory while MLC runs (with --run, default: leave the huge pages as they are)')
+    parser.add_argument('--hugepage-size', default='2M', help='size of the --hugepages pages: 2M or 1G (default: %(default)s)')
+    parser.add_argument('--no-hmat', action='store_true', help='do not compare with the HMAT numbers of this host')
+    parser.add_argument('-o', '--output', help='output directory of matrix_comparison.csv (default: the current directory)')
+    args = parser.parse_args()
+
+    if args.run:
+        os.makedirs(args.Directory[0], exist_ok=True)
+        # The matrices measure every node with memory, so each needs its huge pages
+        reservation = contextlib.nullcontext()
+        if args.hugepages:
+            reservation = hugepages.HugePageReservation({node: args.hugepages for node in hugepages.memory_nodes()},
+                                                        args.hugepage_size)
+        try:
+            with reservation:
+                run_matrices(args.Directory[0], args.mlc, args.all_threads)
+        except hugepages.HugePageError as e:
+            print(f'ERROR: {e}')
+            exit(1)
+
+    this_host = socket_module.gethostname()
+    all_rows = []
+    for i, directory in enumerate(args.Directory):
+        hostname = this_host if args.run and i == 0 else directory_hostname(directory)
+        # The topology and HMAT of this host only apply to the matrices measured on it
+        rows = matrix_rows(directory, hostname, hostname == this_host, not args.no_hmat)
+        if not rows:
+            print(f'Warning: no MLC matrices in {directory}')
+            continue
+        loaded_latency.write_csv(os.path.join(directory, 'matrix.csv'), MATRIX_COLUMNS, rows)
+        plot_heatmaps(rows, directory)
+        for row in rows:
+            if row['hmat_ratio'] is not None:
+                print(f"{row['metric']} node {row['cpu_node']} -> node {row['memory_node']}: measured {row['value']:.1f}, "
+                      f"HMAT {row['hmat_value']:.1f} ({row['hmat_ratio']:.2f}x)")
+        all_rows += rows
+
+    if len(args.Directory) > 1 and all_rows:
+        output = args.output or '.'
+        os.makedirs(output, exist_ok=True)
+        write_comparison(all_rows, os.path.join(output, 'matrix_comparison.csv'))
+
+
+if __name__ == "__main__":
+    main()
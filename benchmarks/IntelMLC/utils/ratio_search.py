@@ -0,0 +1,64 @@
+#!/usr/bin/python3
+
+# Golden-section search for the DRAM:CXL interleave ratio with the highest bandwidth.
+#
+# The interleave ramps of mlc_driver.py measure a fixed grid of CXL percentages
+# (10, 25 and 50). The ratio that maximizes bandwidth is usually between the grid
+# points, and it is the value used for the weighted interleave settings. The
+# bandwidth of an interleaved buffer rises while the CXL device adds bandwidth
+# and falls once it becomes the bottleneck, so it is unimodal in the CXL
+# percentage. A golden-section search narrows the bracket [lo, hi] by about 38%
+# per MLC run, reusing one of the two inner points at each step, so it finds the
+# optimum to one percentage point in ~log(hi - lo) / log(1.618) runs instead of
+# hi - lo + 1. Measurement noise near a flat optimum can mislead the search by a
+# few points; the reported bandwidth is always a measured one.
+
+import math
+
+INVPHI = (math.sqrt(5) - 1) / 2
+
+# Columns of ratio_search.csv, one row per (traffic, core count)
+SUMMARY_COLUMNS = ['dram_node', 'cxl_node', 'traffic', 'access', 'cores', 'cpus', 'min_cxl_ratio', 'max_cxl_ratio',
+                   'dram_ratio', 'cxl_ratio', 'dram_weight', 'cxl_weight', 'bandwidth_mbs', 'latency_ns', 'evaluations']
+
+
+# Maximize f over the integers in [lo, hi] with a golden-section search. The
+# search stops once the bracket is at most 'tolerance' wide (at least 2); a
+# bracket of 2 or less is then measured completely. A bracket that is already
+# within the tolerance is measured at its ends and midpoint. Each point is
+# evaluated once.
+# Returns (best x, {x: f(x)} of every evaluated point). Raises ValueError if lo > hi.
+def golden_section_max(f, lo, hi, tolerance=1):
+    if lo > hi:
+        raise ValueError(f'empty search range [{lo}, {hi}]')
+    values = {}
+
+    def value(x):
+        if x not in values:
+            values[x] = f(x)
+        return values[x]
+
+    a, b = lo, hi
+    while b - a > max(tolerance, 2):
+        c = b - round((b - a) * INVPHI)
+        d = a + round((b - a) * INVPHI)
+        if c >= d:
+            c, d = (a + b) // 2, (a + b) // 2 + 1
+        if value(c) >= value(d):
+            b = d
+        else:
+            a = c
+    if b - a <= 2:
+        for x in range(a, b + 1):
+            value(x)
+    elif not values:
+        for x in (a, (a + b) // 2, b):
+            value(x)
+    best = max(values, key=lambda x: values[x])
+    return best, values
+
+
+# Smallest integer weights with the ratio of the two percentages, e.g. 75:25 -> 3:1
+def interleave_weights(dram_ratio, cxl_ratio):
+    divisor = math.gcd(dram_ratio, cxl_ratio) or 1
+    return dram_ratio // divisor, cxl_ratio // divisor
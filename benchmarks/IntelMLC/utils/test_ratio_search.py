@@ -0,0 +1,49 @@
+#!/usr/bin/python3
+
+# Tests of the golden-section ratio search: python3 -m unittest test_ratio_search
+
+import unittest
+
+import ratio_search
+
+
+class GoldenSectionMaxTest(unittest.TestCase):
+    def test_unimodal_optimum(self):
+        best, values = ratio_search.golden_section_max(lambda x: -(x - 37) ** 2, 1, 99)
+        self.assertEqual(best, 37)
+        self.assertLess(len(values), 99)
+
+    def test_tolerance_at_least_the_bracket(self):
+        # The search loop never runs; the ends and the midpoint are measured
+        best, values = ratio_search.golden_section_max(lambda x: -(x - 3) ** 2, 1, 5, 10)
+        self.assertEqual(sorted(values), [1, 3, 5])
+        self.assertEqual(best, 3)
+
+    def test_tolerance_equal_to_the_bracket(self):
+        best, values = ratio_search.golden_section_max(lambda x: x, 20, 30, 10)
+        self.assertEqual(best, 30)
+        self.assertEqual(sorted(values), [20, 25, 30])
+
+    def test_small_bracket_is_measured_completely(self):
+        best, values = ratio_search.golden_section_max(lambda x: -abs(x - 6), 5, 7, 10)
+        self.assertEqual(best, 6)
+        self.assertEqual(sorted(values), [5, 6, 7])
+
+    def test_each_point_evaluated_once(self):
+        calls = []
+
+        def f(x):
+            calls.append(x)
+            return -(x - 60) ** 2
+
+        _, values = ratio_search.golden_section_max(f, 10, 90, 1)
+        self.assertEqual(len(calls), len(set(calls)))
+        self.assertEqual(len(calls), len(values))
+
+    def test_empty_range(self):
+        with self.assertRaises(ValueError):
+            ratio_search.golden_section_max(lambda x: x, 5, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
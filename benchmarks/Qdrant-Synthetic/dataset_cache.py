@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+
+# On-disk cache for the synthetic datasets used by qdrant_benchmark.py.
+#
+# Every dataset is stored as a raw, headerless binary file that is opened with
+# numpy.memmap, plus a small JSON sidecar describing its shape and dtype. The
+# cache is keyed by (kind, dimension, count, dtype, seed), so repeated runs with
+# the same parameters reuse identical vectors instead of regenerating them.
+# 'kind' separates the base vectors that are ingested from the held-out query
+# vectors, which are drawn from an independent random stream.
+
+import json
+import logging
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Default location of the dataset cache. Matches the layout used by run_benchmarks.sh
+DEFAULT_CACHE_DIR = "/var/tmp/qdrant_benchmark/datasets"
+
+# Number of vectors generated and written per chunk. This bounds the memory used
+# while generating large datasets. Changing it changes the generated data.
+GENERATION_CHUNK_SIZE = 100000
+
+# Independent random streams for each dataset kind, derived from the user seed.
+# 'upsert' vectors are written while queries run in the mixed read/write mode.
+# 'payload' is the stream of the synthetic payload fields (see payloads.py).
+# 'warmup' vectors are the queries run before a measurement (see warmup.py).
+KIND_STREAMS = {
+    'base': 0,
+    'query': 1,
+    'upsert': 2,
+    'payload': 3,
+    'warmup': 4,
+}
+
+# Build the file stem for a cache entry. The name is human readable so the
+# cache directory can be inspected and pruned by hand.
+def cache_stem(kind, dimension, count, dtype, seed):
+    return f"{kind}.d{dimension}.n{count}.{np.dtype(dtype).name}.s{seed}"
+
+# Return the (data, metadata) paths for a cache entry
+def cache_paths(cache_dir, stem):
+    return os.path.join(cache_dir, f"{stem}.bin"), os.path.join(cache_dir, f"{stem}.json")
+
+# Open a cached array read-only, or return None if it does not exist or does not match
+def open_cached_array(cache_dir, stem, shape, dtype):
+    data_path, meta_path = cache_paths(cache_dir, stem)
+    if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+        return None
+
+    with open(meta_path) as f:
+        meta = json.load(f)
+
+    dtype = np.dtype(dtype)
+    expected_size = int(np.prod(shape)) * dtype.itemsize
+    if (tuple(meta.get('shape', ())) != tuple(shape) or meta.get('dtype') != dtype.name
+            or os.path.getsize(data_path) != expected_size):
+        logger.warning(f"Cached dataset '{data_path}' does not match the requested shape/dtype. Regenerating.")
+        return None
+
+    return np.memmap(data_path, dtype=dtype, mode='r', shape=tuple(shape))
+
+# Return a cached array, creating it first if needed.
+#
+# fill_fn(out) is called with a writable memmap of the requested shape and must
+# populate it in place. The file is written under a temporary name and renamed
+# into place once complete, so an interrupted run never leaves a partial entry.
+def cached_array(cache_dir, stem, shape, dtype, fill_fn, metadata=None):
+    array = open_cached_array(cache_dir, stem, shape, dtype)
+    if array is not None:
+        logger.info(f"Using cached dataset '{stem}' from {cache_dir}")
+        return array
+
+    os.makedirs(cache_dir, exist_ok=True)
+    data_path, meta_path = cache_paths(cache_dir, stem)
+    tmp_path = f"{data_path}.tmp.{os.getpid()}"
+
+    logger.info(f"Creating cached dataset '{stem}' in {cache_dir}...")
+    try:
+        out = np.memmap(tmp_path, dtype=dtype, mode='w+', shape=tuple(shape))
+        fill_fn(out)
+        out.flush()
+        del out
+        os.replace(tmp_path, data_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    meta = {'shape': list(shape), 'dtype': np.dtype(dtype).name}
+    meta.update(metadata or {})
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f, indent=2)
+
+    return np.memmap(data_path, dtype=dtype, mode='r', shape=tuple(shape))
+
+# Fill 'out' with random vectors, one chunk at a time.
+# FP32 vectors are uniform in [0, 1), UINT8 vectors are uniform in [0, 255].
+def generate_random_vectors(out, seed, stream):
+    rng = np.random.default_rng([seed, stream])
+    for start in range(0, out.shape[0], GENERATION_CHUNK_SIZE):
+        end = min(start + GENERATION_CHUNK_SIZE, out.shape[0])
+        shape = (end - start, out.shape[1])
+        if out.dtype == np.float32:
+            out[start:end] = rng.random(shape, dtype=np.float32)
+        elif out.dtype == np.uint8:
+            out[start:end] = rng.integers(0, 256, size=shape, dtype=np.uint8)
+        else:
+            raise ValueError(f"Unsupported data type: {out.dtype}")
+
+# Return a read-only memmap of 'count' synthetic vectors of the given kind (see KIND_STREAMS)
+def get_vectors(cache_dir, kind, dimension, count, dtype, seed):
+    if kind not in KIND_STREAMS:
+        raise ValueError(f"Unknown dataset kind: {kind}")
+
+    stem = cache_stem(kind, dimension, count, dtype, seed)
+    return cached_array(
+        cache_dir,
+        stem,
+        (count, dimension),
+        dtype,
+        lambda out: generate_random_vectors(out, seed, KIND_STREAMS[kind]),
+        metadata={'kind': kind, 'seed': seed},
+    )
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+
+# Collection footprint accounting for qdrant_benchmark.py.
+#
+# A footprint sample combines three sources:
+#   1. Collection info and segment telemetry from the Qdrant REST API
+#   2. The size of every file in the collection's storage directory inside the
+#      container, grouped by what it stores (vectors, quantized vectors, HNSW
+#      index, payload, payload index, WAL, other segment metadata)
+#   3. The resident set size of the Qdrant server process, read from
+#      /proc/<pid>/status on the host
+# Samples are taken at benchmark phases (after load, after indexing, after
+# queries) and are returned as flat dicts so they can be logged or added to
+# result rows.
+
+import logging
+import subprocess
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Storage directory of the Qdrant server inside the container
+QDRANT_STORAGE_PATH = "/qdrant/storage"
+
+# Bytes per vector element for each Qdrant datatype
+DATATYPE_SIZES = {
+    'float32': 4,
+    'float16': 2,
+    'uint8': 1,
+}
+
+# Storage categories, in the order they are reported
+STORAGE_CATEGORIES = ['vectors', 'quantized', 'index', 'payload', 'payload_index', 'wal', 'other']
+
+# Map a file path in the collection directory to a storage category. The checks
+# are ordered so that e.g. quantized data below a vector storage directory is not
+# counted as raw vectors.
+def storage_category(path):
+    parts = path.split('/')
+    if 'wal' in parts:
+        return 'wal'
+    if any('quantized' in p for p in parts):
+        return 'quantized'
+    if any(p.startswith('vector_index') for p in parts):
+        return 'index'
+    if any(p.startswith('vector_storage') for p in parts):
+        return 'vectors'
+    if any(p.startswith('payload_index') for p in parts):
+        return 'payload_index'
+    if any(p.startswith('payload_storage') for p in parts):
+        return 'payload'
+    return 'other'
+
+# Size of the collection storage directory inside the container, by category
+def get_storage_breakdown(container_name, collection_name):
+    breakdown = {f'storage_{c}_bytes': 0 for c in STORAGE_CATEGORIES}
+    breakdown['storage_total_bytes'] = 0
+    collection_path = f"{QDRANT_STORAGE_PATH}/collections/{collection_name}"
+    cmd = ['docker', 'exec', container_name, 'find', collection_path, '-type', 'f', '-printf', '%s\\t%P\\n']
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        logger.error(f"Error listing the collection storage directory: {result.stderr.strip()}")
+        return breakdown
+
+    for line in result.stdout.splitlines():
+        size, _, path = line.partition('\t')
+        if not size.isdigit():
+            continue
+        breakdown[f'storage_{storage_category(path)}_bytes'] += int(size)
+    breakdown['storage_total_bytes'] = sum(breakdown[f'storage_{c}_bytes'] for c in STORAGE_CATEGORIES)
+    return breakdown
+
+# Host PID of the main process in a container, or None if it is not running
+def get_container_pid(container_name):
+    cmd = ['docker', 'inspect', '-f', '{{.State.Pid}}', container_name]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0 or not result.stdout.strip().isdigit() or int(result.stdout) == 0:
+        return None
+    return int(result.stdout)
+
+# Resident memory of a process from /proc/<pid>/status, in bytes
+def get_process_rss(pid):
+    fields = {'VmRSS': 'rss_bytes', 'RssAnon': 'rss_anon_bytes', 'RssFile': 'rss_file_bytes', 'RssShmem': 'rss_shmem_bytes'}
+    rss = {}
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in fields:
+                    # Values are reported in kB
+                    rss[fields[key]] = int(value.split()[0]) * 1024
+    except OSError as e:
+        logger.error(f"Error reading the memory usage of PID {pid}: {e}")
+    return rss
+
+# Sum the RAM and disk usage reported by the server for every segment of the
+# collection (GET /telemetry). Returns an empty dict if the server does not
+# report segment details.
+def get_segment_telemetry(host, port, collection_name):
+    try:
+        response = requests.get(f"http://{host}:{port}/telemetry", params={'details_level': 10}, timeout=30)
+        response.raise_for_status()
+        telemetry = response.json().get('result', {})
+    except (requests.RequestException, ValueError) as e:
+        logger.error(f"Error getting Qdrant telemetry: {e}")
+        return {}
+
+    collections = telemetry.get('collections', {}).get('collections') or []
+    segments = []
+    for collection in collections:
+        if collection.get('id') != collection_name:
+            continue
+        for shard in collection.get('shards') or []:
+            segments.extend((shard.get('local') or {}).get('segments') or [])
+
+    if not segments:
+        return {}
+
+    totals = {'telemetry_segments': len(segments), 'telemetry_ram_bytes': 0, 'telemetry_disk_bytes': 0}
+    for segment in segments:
+        info = segment.get('info', {})
+        totals['telemetry_ram_bytes'] += info.get('ram_usage_bytes') or 0
+        totals['telemetry_disk_bytes'] += info.get('disk_usage_bytes') or 0
+    return totals
+
+# Raw vector data size implied by the collection config: points x dimension x element size
+def get_raw_vector_bytes(collection_info):
+    vectors = collection_info.config.params.vectors
+    datatype = getattr(vectors, 'datatype', None)
+    datatype = getattr(datatype, 'value', datatype) or 'float32'
+    return (collection_info.points_count or 0) * vectors.size * DATATYPE_SIZES.get(datatype, 4)
+
+# Take a footprint sample of a collection for the given benchmark phase
+def measure_footprint(client, collection_name, container_name, port, phase, host='localhost'):
+    collection_info = client.get_collection(collection_name)
+    sample = {
+        'phase': phase,
+        'points_count': collection_info.points_count,
+        'indexed_vectors_count': collection_info.indexed_vectors_count,
+        'segments_count': collection_info.segments_count,
+        'raw_vectors_bytes': get_raw_vector_bytes(collection_info),
+    }
+    sample.update(get_segment_telemetry(host, port, collection_name))
+    sample.update(get_storage_breakdown(container_name, collection_name))
+
+    pid = get_container_pid(container_name)
+    if pid is not None:
+        sample.update(get_process_rss(pid))
+    return sample
+
+# Log a footprint sample using 'format_size' to render byte counts
+def log_footprint(sample, format_size):
+    logger.info(f"Collection footprint ({sample['phase']}):")
+    for key, value in sample.items():
+        if key.endswith('_bytes') and value is not None:
+            logger.info(f"  {key[:-len('_bytes')]:<22} {format_size(value)}")
+        elif key != 'phase':
+            logger.info(f"  {key:<22} {value}")
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+
+# Exact k-nearest-neighbour ground truth and recall for qdrant_benchmark.py.
+#
+# Ground truth is computed locally with a blocked brute-force search. The query
+# set and the base vectors are processed in chunks so the score matrix and the
+# float32 copies of the data fit inside a fixed memory budget, and each block is
+# scored with a single matrix multiply so NumPy hands the work to BLAS. Results
+# are stored in the dataset cache next to the vectors they were computed from.
+
+import logging
+import time
+
+import numpy as np
+from tqdm import tqdm
+
+import dataset_cache
+
+logger = logging.getLogger(__name__)
+
+# Default memory budget (MiB) for the brute-force search working set
+DEFAULT_MEMORY_BUDGET_MB = 1024
+
+# Upper bound on the number of queries scored per block
+MAX_QUERY_CHUNK = 1024
+
+# Convert a block of vectors to float32 and scale every row to unit length so a
+# dot product gives the cosine similarity used by the benchmark collection.
+def normalize(block):
+    block = np.asarray(block, dtype=np.float32)
+    norms = np.linalg.norm(block, axis=1, keepdims=True)
+    return block / np.maximum(norms, np.finfo(np.float32).tiny)
+
+# Pick the number of base vectors scored per block so that the float32 base
+# block plus the (query_chunk x base_chunk) score matrix fit in the budget.
+def base_chunk_size(dimension, query_chunk, memory_budget_mb):
+    budget = memory_budget_mb * 1024 * 1024
+    # float32 base block + float32 scores + temporary argpartition indices
+    bytes_per_base_vector = 4 * dimension + 12 * query_chunk
+    return max(1, budget // bytes_per_base_vector)
+
+# Keep the k best (score, id) pairs per row from two candidate sets
+def merge_top_k(scores_a, ids_a, scores_b, ids_b, k):
+    scores = np.concatenate((scores_a, scores_b), axis=1)
+    ids = np.concatenate((ids_a, ids_b), axis=1)
+    keep = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(scores, keep, axis=1), np.take_along_axis(ids, keep, axis=1)
+
+# Exact top-k cosine neighbours of every query among 'base'.
+# Returns an int64 array of shape (len(queries), k) with ids ordered by decreasing similarity.
+# If 'mask' (a boolean array over 'base') is given, only the matching vectors are
+# candidates, as for a filtered search. Rows with fewer than k matches are padded with -1.
+def brute_force_knn(base, queries, k, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, out=None, mask=None):
+    num_base, dimension = base.shape
+    num_queries = len(queries)
+    k = min(k, num_base)
+    if out is None:
+        out = np.empty((num_queries, k), dtype=np.int64)
+
+    query_chunk = min(num_queries, MAX_QUERY_CHUNK)
+    base_chunk = base_chunk_size(dimension, query_chunk, memory_budget_mb)
+    logger.info(f"Computing exact top-{k} ground truth for {num_queries} queries over {num_base} vectors "
+                f"(query chunk {query_chunk}, base chunk {base_chunk})...")
+
+    start_time = time.time()
+    with tqdm(total=num_queries * num_base, desc="Ground truth", unit="pairs", unit_scale=True) as pbar:
+        for q_start in range(0, num_queries, query_chunk):
+            q_end = min(q_start + query_chunk, num_queries)
+            q_block = normalize(queries[q_start:q_end])
+
+            best_scores = np.full((q_end - q_start, k), -np.inf, dtype=np.float32)
+            best_ids = np.full((q_end - q_start, k), -1, dtype=np.int64)
+
+            for b_start in range(0, num_base, base_chunk):
+                b_end = min(b_start + base_chunk, num_base)
+                block = base[b_start:b_end]
+                block_offsets = np.arange(b_start, b_end)
+                if mask is not None:
+                    keep = mask[b_start:b_end]
+                    block, block_offsets = block[keep], block_offsets[keep]
+                if len(block) == 0:
+                    pbar.update((q_end - q_start) * (b_end - b_start))
+                    continue
+                scores = q_block @ normalize(block).T
+
+                block_k = min(k, len(block))
+                block_ids = np.argpartition(-scores, block_k - 1, axis=1)[:, :block_k]
+                block_scores = np.take_along_axis(scores, block_ids, axis=1)
+                best_scores, best_ids = merge_top_k(best_scores, best_ids, block_scores, block_offsets[block_ids], k)
+
+                pbar.update((q_end - q_start) * (b_end - b_start))
+
+            order = np.argsort(-best_scores, axis=1, kind='stable')
+            out[q_start:q_end] = np.take_along_axis(best_ids, order, axis=1)
+
+    logger.info(f"Ground truth computed in {time.time() - start_time:.2f} seconds.")
+    return out
+
+# Return the cached ground truth for a (base, query) pair from the dataset cache,
+# computing and storing it on first use.
+def get_ground_truth(cache_dir, base, queries, k, seed, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB):
+    num_base, dimension = base.shape
+    k = min(k, num_base)
+    stem = f"{dataset_cache.cache_stem('groundtruth', dimension, num_base, base.dtype, seed)}.q{len(queries)}.k{k}.cosine"
+    return dataset_cache.cached_array(
+        cache_dir,
+        stem,
+        (len(queries), k),
+        np.int64,
+        lambda out: brute_force_knn(base, queries, k, memory_budget_mb, out=out),
+        metadata={'kind': 'groundtruth', 'seed': seed, 'metric': 'cosine'},
+    )
+
+# Return the cached ground truth of a filtered query set. 'mask' selects the base
+# vectors matching the filter and 'filter_key' names the filter in the cache.
+def get_filtered_ground_truth(cache_dir, base, queries, k, seed, mask, filter_key, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB):
+    num_base, dimension = base.shape
+    k = min(k, num_base)
+    stem = f"{dataset_cache.cache_stem('groundtruth', dimension, num_base, base.dtype, seed)}.q{len(queries)}.k{k}.{filter_key}.cosine"
+    return dataset_cache.cached_array(
+        cache_dir,
+        stem,
+        (len(queries), k),
+        np.int64,
+        lambda out: brute_force_knn(base, queries, k, memory_budget_mb, out=out, mask=mask),
+        metadata={'kind': 'groundtruth', 'seed': seed, 'metric': 'cosine', 'filter': filter_key},
+    )
+
+# Mean recall@k of the returned ids against the ground truth ids. Padding ids
+# (-1, when a filter matches fewer than k points) are not counted.
+def recall_at_k(result_ids, ground_truth_ids, k):
+    hits = 0
+    total = 0
+    for found, expected in zip(result_ids, ground_truth_ids):
+        expected = [i for i in expected[:k].tolist() if i >= 0]
+        hits += len(set(found[:k]) & set(expected))
+        total += len(expected)
+    return hits / total if total > 0 else 0.0
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+
+# Mixed read/write workload helpers for qdrant_benchmark.py.
+#
+# In the mixed mode queries run back to back while an upsert thread writes points
+# at a fixed rate. Upserts create new segments and trigger the server's
+# optimizers (segment merges, vacuum, HNSW index builds), so a monitor thread
+# polls the collection status and each query is tagged with the phase the
+# collection was in when the query was sent: idle (status green), optimizing
+# (yellow) or optimization pending (grey). Latency percentiles are then reported
+# per phase.
+
+import logging
+import threading
+import time
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+
+logger = logging.getLogger(__name__)
+
+# How upserted points are assigned ids: 'append' adds new points after the loaded
+# ones, 'overwrite' replaces randomly chosen loaded points
+UPSERT_MODES = ['append', 'overwrite']
+
+# Map the collection status to the workload phase reported with the latencies
+STATUS_PHASES = {
+    'green': 'idle',
+    'yellow': 'optimizing',
+    'grey': 'pending',
+    'red': 'failed',
+}
+
+class StatusMonitor:
+    """Poll the status of a collection in a background thread and keep track of the current phase."""
+
+    def __init__(self, host, port, collection_name, interval=0.25):
+        self.host = host
+        self.port = port
+        self.collection_name = collection_name
+        self.interval = interval
+        self.phase = 'idle'
+        # (elapsed, phase) for every phase change
+        self.transitions = []
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='status-monitor', daemon=True)
+
+    def start(self):
+        self.start_time = time.monotonic()
+        self.thread.start()
+
+    def stop(self):
+        if self.thread.is_alive():
+            self.stop_event.set()
+            self.thread.join()
+
+    def _run(self):
+        client = QdrantClient(self.host, port=self.port)
+        while not self.stop_event.is_set():
+            try:
+                status = client.get_collection(self.collection_name).status
+            except Exception as e:
+                logger.debug(f"Error getting the collection status: {e}")
+            else:
+                status = getattr(status, 'value', status)
+                phase = STATUS_PHASES.get(status, status)
+                if phase != self.phase or not self.transitions:
+                    self.transitions.append((time.monotonic() - self.start_time, phase))
+                    logger.debug(f"Collection '{self.collection_name}' is {phase} (status {status})")
+                self.phase = phase
+            self.stop_event.wait(self.interval)
+        client.close()
+
+    # Seconds spent in each phase between start() and stop()
+    def phase_durations(self):
+        end_time = time.monotonic() - self.start_time
+        durations = {}
+        for i, (start, phase) in enumerate(self.transitions):
+            end = self.transitions[i + 1][0] if i + 1 < len(self.transitions) else end_time
+            durations[phase] = durations.get(phase, 0) + end - start
+        return durations
+
+class Upserter:
+    """Upsert batches of points at a fixed rate (points/second) in a background thread."""
+
+    def __init__(self, host, port, collection_name, vectors, rate, batch_size, mode='append', num_loaded=0, seed=0):
+        self.host = host
+        self.port = port
+        self.collection_name = collection_name
+        self.vectors = vectors
+        self.rate = rate
+        self.batch_size = batch_size
+        self.mode = mode
+        self.num_loaded = num_loaded
+        # New points are appended after the loaded ones; the offset grows across runs
+        self.next_id = num_loaded
+        self.rng = np.random.default_rng(seed)
+        self.upserted = 0
+        self.latencies = []
+        self.errors = 0
+        self.elapsed = 0
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.stop_event.clear()
+        self.upserted = 0
+        self.latencies = []
+        self.errors = 0
+        self.thread = threading.Thread(target=self._run, name='upserter', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is not None and self.thread.is_alive():
+            self.stop_event.set()
+            self.thread.join()
+
+    # Ids of the next batch of points
+    def _next_ids(self, count):
+        if self.mode == 'overwrite':
+            return self.rng.choice(self.num_loaded, size=min(count, self.num_loaded), replace=False).tolist()
+        ids = list(range(self.next_id, self.next_id + count))
+        self.next_id += count
+        return ids
+
+    def _run(self):
+        client = QdrantClient(self.host, port=self.port)
+        interval = self.batch_size / self.rate
+        start_time = time.monotonic()
+        next_batch_time = start_time
+        position = 0
+        while not self.stop_event.is_set():
+            ids = self._next_ids(self.batch_size)
+            # Cycle through the cached upsert vectors
+            rows = np.arange(position, position + len(ids)) % len(self.vectors)
+            position = (position + len(ids)) % len(self.vectors)
+
+            batch_start_time = time.perf_counter()
+            try:
+                client.upsert(
+                    collection_name=self.collection_name,
+                    points=models.Batch(ids=ids, vectors=self.vectors[rows].tolist()),
+                    wait=True
+                )
+            except Exception as e:
+                self.errors += 1
+                logger.debug(f"Upsert failed: {e}")
+            else:
+                self.latencies.append(time.perf_counter() - batch_start_time)
+                self.upserted += len(ids)
+
+            # Keep the target rate. If the server cannot keep up, the next batch is
+            # sent immediately and the achieved rate falls below the target.
+            next_batch_time += interval
+            self.stop_event.wait(max(0, next_batch_time - time.monotonic()))
+        self.elapsed = time.monotonic() - start_time
+        client.close()
+
+    # Achieved rate and upsert latency of the last run
+    def summary(self):
+        summary = {
+            'upsert_target_rate': self.rate,
+            'upsert_rate': self.upserted / self.elapsed if self.elapsed > 0 else 0,
+            'upserted_points': self.upserted,
+            'upsert_errors': self.errors,
+        }
+        if self.latencies:
+            p50, p99 = np.percentile(self.latencies, [50, 99])
+            summary.update({'upsert_p50_latency': float(p50), 'upsert_p99_latency': float(p99)})
+        return summary
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+# Multi-tenant helpers for qdrant_benchmark.py.
+#
+# The multi-tenant mode loads one collection per tenant into the same Qdrant
+# server and runs independent query streams against all of them at the same
+# time. Each stream runs in its own thread with its own client connection and
+# cycles through its tenant's held-out queries until the run duration has
+# passed. The streams of a tenant start at different offsets of the query set,
+# so they do not walk the same queries (and cache lines) in lockstep. All streams are released together, so their measurement windows
+# overlap and the per-tenant latencies include the interference of the other
+# tenants' working sets.
+
+import logging
+import threading
+import time
+
+from qdrant_client import QdrantClient
+
+logger = logging.getLogger(__name__)
+
+# Name of the collection of tenant 'index'
+def tenant_collection_name(index):
+    return f"tenant_{index}"
+
+class QueryStream:
+    """Run queries against one collection in a background thread for a fixed duration."""
+
+    def __init__(self, host, port, collection_name, query_vectors, top_k, duration, search_params=None, offset=0):
+        self.host = host
+        self.port = port
+        self.collection_name = collection_name
+        self.query_vectors = query_vectors
+        self.top_k = top_k
+        self.duration = duration
+        self.search_params = search_params
+        self.offset = offset
+        self.latencies = []
+        # Result ids of the first successful query of each query index, used for recall
+        self.result_ids = {}
+        self.errors = 0
+        self.elapsed = 0
+        self.start_event = None
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name=f'query-stream-{collection_name}', daemon=True)
+
+    def _run(self):
+        client = QdrantClient(self.host, port=self.port)
+        self.start_event.wait()
+        start_time = time.monotonic()
+        i = 0
+        while not self.stop_event.is_set() and time.monotonic() - start_time < self.duration:
+            query_index = (self.offset + i) % len(self.query_vectors)
+            query_start_time = time.perf_counter()
+            try:
+                hits = client.query_points(
+                    collection_name=self.collection_name,
+                    query=self.query_vectors[query_index],
+                    limit=self.top_k,
+                    search_params=self.search_params,
+                    with_payload=False
+                ).points
+            except Exception as e:
+                self.errors += 1
+                logger.debug(f"Query against '{self.collection_name}' failed: {e}")
+            else:
+                self.latencies.append(time.perf_counter() - query_start_time)
+                if query_index not in self.result_ids:
+                    self.result_ids[query_index] = [hit.id for hit in hits]
+            i += 1
+        self.elapsed = time.monotonic() - start_time
+        client.close()
+
+# Start all streams, release them together and wait for them to finish. The
+# streams are stopped early if 'should_stop()' becomes true. Returns the wall
+# time of the run in seconds.
+def run_streams(streams, should_stop=lambda: False):
+    start_event = threading.Event()
+    for stream in streams:
+        stream.start_event = start_event
+        stream.thread.start()
+
+    start_time = time.monotonic()
+    start_event.set()
+    try:
+        while any(stream.thread.is_alive() for stream in streams):
+            if should_stop():
+                logger.info("Query streams interrupted.")
+                break
+            time.sleep(0.1)
+    finally:
+        for stream in streams:
+            stream.stop_event.set()
+        for stream in streams:
+            stream.thread.join()
+    return time.monotonic() - start_time
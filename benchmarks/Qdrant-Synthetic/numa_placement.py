@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+
+# NUMA placement of the benchmark client and server for qdrant_benchmark.py.
+#
+# The Qdrant server is placed with the container's --cpuset-cpus/--cpuset-mems.
+# The Python client is placed in-process: its CPUs with sched_setaffinity() and
+# its memory with the set_mempolicy() system call. Both only affect the calling
+# thread and the threads it creates afterwards, so the client placement has to
+# be applied before any worker threads are started.
+#
+# Requested placements are not always what the kernel does (cpusets, hot-plugged
+# memory, allocations made before the policy was set), so the placement actually
+# observed is read back from /proc: the allowed CPUs and memory nodes, the
+# memory policy, and the resident memory per NUMA node from numa_maps.
+
+import ctypes
+import logging
+import os
+import platform
+import re
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'lib'))
+import topology
+
+logger = logging.getLogger(__name__)
+
+# Memory policy modes of set_mempolicy(2)
+MEMPOLICY_MODES = {
+    'default': 0,
+    'preferred': 1,
+    'bind': 2,
+    'interleave': 3,
+}
+
+# set_mempolicy/get_mempolicy system call numbers by architecture
+SYSCALLS = {
+    'x86_64': {'set_mempolicy': 238, 'get_mempolicy': 239},
+    'aarch64': {'set_mempolicy': 237, 'get_mempolicy': 236},
+}
+
+# Number of bits in the node masks passed to the kernel
+MAX_NODES = 1024
+
+# Parse a CPU or node list such as "0-3,8" into a list of ints
+parse_list = topology.parse_list
+
+# Format a list of ints as a compact list such as "0-3,8"
+format_list = topology.format_list
+
+# Return {node: [cpus]} for every online NUMA node. CPU-less nodes (e.g. CXL
+# memory expanders) have an empty CPU list.
+def node_cpus():
+    topo = topology.load_topology()
+    return {node: topology.node_cpus(topo, node) for node in sorted(topo['nodes'])}
+
+# Return the NUMA distance from 'node' to every node as {node: distance}
+def node_distances(node):
+    return dict(topology.load_topology()['nodes'][node]['distances'])
+
+# Pin the calling thread (and the threads it creates later) to 'cpus'
+def set_cpu_affinity(cpus):
+    os.sched_setaffinity(0, cpus)
+    logger.info(f"Client CPUs: {format_list(cpus)}")
+
+# Return libc's syscall() and the number of system call 'name' on this architecture
+def _syscall(name):
+    numbers = SYSCALLS.get(platform.machine())
+    if numbers is None:
+        raise OSError(f"Memory policies are not supported on {platform.machine()}")
+    libc = ctypes.CDLL(None, use_errno=True)
+    return libc.syscall, numbers[name]
+
+# Set the memory policy of the calling thread (and the threads it creates later)
+def set_memory_policy(mode, nodes=()):
+    syscall, number = _syscall('set_mempolicy')
+    mask = (ctypes.c_ulong * (MAX_NODES // 64))()
+    for node in nodes:
+        mask[node // 64] |= 1 << (node % 64)
+    if syscall(number, MEMPOLICY_MODES[mode], mask if nodes else None, MAX_NODES if nodes else 0) != 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, f"set_mempolicy({mode}, {format_list(nodes)}) failed: {os.strerror(errno)}")
+    logger.info(f"Client memory policy: {mode}" + (f" on nodes {format_list(nodes)}" if nodes else ""))
+
+# Return the (mode, nodes) memory policy of the calling thread
+def get_memory_policy():
+    syscall, number = _syscall('get_mempolicy')
+    mode = ctypes.c_int()
+    mask = (ctypes.c_ulong * (MAX_NODES // 64))()
+    if syscall(number, ctypes.byref(mode), mask, MAX_NODES, None, 0) != 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, f"get_mempolicy failed: {os.strerror(errno)}")
+    names = {v: k for k, v in MEMPOLICY_MODES.items()}
+    nodes = [i for i in range(MAX_NODES) if mask[i // 64] >> (i % 64) & 1]
+    # Ignore the mode flags in the upper bits
+    return names.get(mode.value & 0xff, str(mode.value)), nodes
+
+# Resident memory of a process per NUMA node in bytes, from /proc/<pid>/numa_maps
+def memory_by_node(pid='self'):
+    totals = {}
+    with open(f"/proc/{pid}/numa_maps") as f:
+        for line in f:
+            page_size = 4096
+            match = re.search(r'kernelpagesize_kB=(\d+)', line)
+            if match:
+                page_size = int(match.group(1)) * 1024
+            for node, pages in re.findall(r'\bN(\d+)=(\d+)', line):
+                totals[int(node)] = totals.get(int(node), 0) + int(pages) * page_size
+    return totals
+
+# Cpus_allowed_list and Mems_allowed_list of a process from /proc/<pid>/status
+def allowed_cpus_and_mems(pid='self'):
+    allowed = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            if key in ('Cpus_allowed_list', 'Mems_allowed_list'):
+                allowed[key] = value.strip()
+    return allowed.get('Cpus_allowed_list'), allowed.get('Mems_allowed_list')
+
+# Apply the requested client placement. 'cpus' is a CPU list string and 'nodes'
+# a node list string; None leaves the corresponding setting unchanged.
+def apply_client_placement(cpus=None, mem_policy=None, mem_nodes=None):
+    if cpus:
+        set_cpu_affinity(parse_list(cpus))
+    if mem_policy:
+        set_memory_policy(mem_policy, parse_list(mem_nodes) if mem_nodes else ())
+
+# Observe the placement of a process as flat result columns prefixed with 'prefix'
+def observe_process(pid, prefix):
+    columns = {}
+    try:
+        cpus, mems = allowed_cpus_and_mems(pid)
+        columns[f'{prefix}_observed_cpus'] = cpus
+        columns[f'{prefix}_observed_mems'] = mems
+        if cpus:
+            cpu_nodes = {node for node, node_cpu_list in node_cpus().items() if set(node_cpu_list) & set(parse_list(cpus))}
+            columns[f'{prefix}_observed_cpu_nodes'] = format_list(cpu_nodes)
+        for node, size in sorted(memory_by_node(pid).items()):
+            columns[f'{prefix}_mem_node{node}_bytes'] = size
+    except OSError as e:
+        logger.error(f"Error observing the placement of PID {pid}: {e}")
+    return columns
+
+# Observe the placement of the client (this process) and of the server process
+def observe_placement(server_pid=None):
+    columns = observe_process('self', 'client')
+    try:
+        mode, nodes = get_memory_policy()
+        columns['client_observed_mem_policy'] = mode
+        columns['client_observed_mem_policy_nodes'] = format_list(nodes)
+    except OSError as e:
+        logger.debug(f"Error reading the client memory policy: {e}")
+    if server_pid is not None:
+        columns.update(observe_process(server_pid, 'server'))
+    return columns
+
+# Build the named placements of the placement sweep. The server always runs on
+# the CPUs of 'server_node' minus 'client_cores' CPUs that are reserved for the
+# client, so its CPU resources are the same in every placement:
+#   client: same-socket (the reserved CPUs) or other-socket (CPUs of the nearest
+#           other node with CPUs), with its memory bound to its own node
+#   server memory: dram (server_node), cxl (the nearest CPU-less node) or
+#           dram+cxl (both allowed). Docker cannot give the server an
+#           interleave memory policy, so with dram+cxl the kernel decides the
+#           split; the observed per-node memory columns record it.
+# Placements the machine cannot provide are skipped. Returns a list of
+# (name, qdrant_benchmark arguments) pairs.
+def placement_sweep(server_node=0, client_cores=2):
+    nodes = node_cpus()
+    if server_node not in nodes or len(nodes[server_node]) <= client_cores:
+        raise ValueError(f"Node {server_node} does not have more than {client_cores} CPUs")
+    distances = node_distances(server_node)
+    by_distance = sorted((n for n in nodes if n != server_node), key=lambda n: (distances.get(n, 255), n))
+
+    server_cpus = nodes[server_node][:-client_cores]
+    clients = {'same-socket': (nodes[server_node][-client_cores:], server_node)}
+    other_nodes = [n for n in by_distance if len(nodes[n]) >= client_cores]
+    if other_nodes:
+        clients['other-socket'] = (nodes[other_nodes[0]][:client_cores], other_nodes[0])
+    else:
+        logger.warning("No other node with CPUs: skipping the other-socket client placements.")
+
+    server_mems = {'dram': [server_node]}
+    cxl_nodes = [n for n in by_distance if not nodes[n]]
+    if cxl_nodes:
+        server_mems['cxl'] = [cxl_nodes[0]]
+        server_mems['dram+cxl'] = [server_node, cxl_nodes[0]]
+    else:
+        logger.warning("No CPU-less memory node: skipping the cxl and dram+cxl server memory placements.")
+
+    placements = []
+    for client_name, (cpus, client_node) in clients.items():
+        for mem_name, mems in server_mems.items():
+            placements.append((f"client-{client_name}.server-{mem_name}", [
+                '--cpu-set', format_list(server_cpus),
+                '--numa-nodes', format_list(mems),
+                '--client-cpus', format_list(cpus),
+                '--client-mem-policy', 'bind',
+                '--client-mem-nodes', str(client_node),
+            ]))
+    return placements
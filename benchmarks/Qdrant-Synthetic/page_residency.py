@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+
+# Page-cache residency of the Qdrant storage files for qdrant_benchmark.py.
+#
+# With --on-disk, --hnsw-on-disk or --on-disk-payload the server memory-maps the
+# segment files instead of loading them into its heap, so query latency depends
+# on how much of each file is in the page cache. A sampler thread walks the
+# collection's storage directory through /proc/<pid>/root of the container at a
+# fixed interval, maps every file read-only into this process and asks mincore(2)
+# which of its pages are resident. Mapping a file does not fault its pages in,
+# so the measurement does not change what it measures.
+#
+# The NUMA node of the cached pages is read from /proc/<pid>/numa_maps of the
+# server, which lists the pages the server has mapped from each file per node.
+# Pages that are cached but not (yet) mapped by the server have no node there.
+#
+# Every sample writes one row per file to a CSV time series tagged with the
+# current benchmark phase (resource_sampler.current_phase). The resident fraction
+# per storage category over time is kept for the summary columns.
+
+import csv
+import ctypes
+import logging
+import mmap
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+import footprint
+import resource_sampler
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+
+_libc = ctypes.CDLL(None, use_errno=True)
+_libc.mmap.restype = ctypes.c_void_p
+_libc.mmap.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_long]
+_libc.munmap.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+_libc.mincore.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.POINTER(ctypes.c_ubyte)]
+
+MAP_FAILED = ctypes.c_void_p(-1).value
+
+# Storage directory of a collection, as seen from the host through the container's root
+def collection_dir(pid, collection_name):
+    return f"/proc/{pid}/root{footprint.QDRANT_STORAGE_PATH}/collections/{collection_name}"
+
+# Number of resident pages of the file 'path' and its size in bytes
+def file_residency(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        size = os.fstat(fd).st_size
+        if size == 0:
+            return 0, 0
+        address = _libc.mmap(None, size, mmap.PROT_READ, mmap.MAP_SHARED, fd, 0)
+        if address in (None, MAP_FAILED):
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"mmap of {path} failed: {os.strerror(errno)}")
+        try:
+            pages = (size + PAGE_SIZE - 1) // PAGE_SIZE
+            vec = (ctypes.c_ubyte * pages)()
+            if _libc.mincore(address, size, vec) != 0:
+                errno = ctypes.get_errno()
+                raise OSError(errno, f"mincore of {path} failed: {os.strerror(errno)}")
+            # The lowest bit of each entry is set if the page is resident
+            resident = int(np.count_nonzero(np.frombuffer(vec, dtype=np.uint8) & 1))
+        finally:
+            _libc.munmap(address, size)
+    finally:
+        os.close(fd)
+    return resident, size
+
+# Bytes of each storage file the server has mapped, per NUMA node:
+# {path inside the container: {node: bytes}}
+def mapped_bytes_by_node(pid, collection_name):
+    prefix = f"{footprint.QDRANT_STORAGE_PATH}/collections/{collection_name}/"
+    mapped = {}
+    with open(f"/proc/{pid}/numa_maps") as f:
+        for line in f:
+            match = re.search(r'\bfile=(\S+)', line)
+            if match is None or not match.group(1).startswith(prefix):
+                continue
+            page_size = PAGE_SIZE
+            size_match = re.search(r'kernelpagesize_kB=(\d+)', line)
+            if size_match:
+                page_size = int(size_match.group(1)) * 1024
+            nodes = mapped.setdefault(match.group(1)[len(prefix):], {})
+            for node, pages in re.findall(r'\bN(\d+)=(\d+)', line):
+                nodes[int(node)] = nodes.get(int(node), 0) + int(pages) * page_size
+    return mapped
+
+# One residency sample of every file of the collection:
+# [(relative path, category, size, resident bytes, {node: mapped bytes})]
+def sample_collection(pid, collection_name):
+    root = collection_dir(pid, collection_name)
+    try:
+        mapped = mapped_bytes_by_node(pid, collection_name)
+    except OSError as e:
+        logger.debug(f"Error reading the numa_maps of PID {pid}: {e}")
+        mapped = {}
+
+    files = []
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(directory, name)
+            relative_path = os.path.relpath(path, root)
+            try:
+                resident_pages, size = file_residency(path)
+            except OSError as e:
+                # Segments are created and removed by the optimizers while we walk
+                logger.debug(f"Skipping {relative_path}: {e}")
+                continue
+            files.append((relative_path, footprint.storage_category(relative_path), size,
+                          min(size, resident_pages * PAGE_SIZE), mapped.get(relative_path, {})))
+    return files
+
+class ResidencySampler:
+    """Sample the page-cache residency of a collection's files in a background thread and write the time series to a CSV file."""
+
+    def __init__(self, pid, collection_name, interval, output_path):
+        self.pid = pid
+        self.collection_name = collection_name
+        self.interval = interval
+        self.output_path = output_path
+        self.stop_event = threading.Event()
+        self.thread = None
+        # (phase, elapsed, {category: [size, resident bytes]}) of every sample of the last run
+        self.history = []
+
+    def start(self):
+        logger.info(f"Sampling the page-cache residency of '{self.collection_name}' every {self.interval * 1000:.0f} ms to {self.output_path}")
+        self.stop_event.clear()
+        self.history = []
+        self.thread = threading.Thread(target=self._run, name='residency-sampler', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is not None and self.thread.is_alive():
+            self.stop_event.set()
+            self.thread.join()
+
+    def _run(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.output_path)), exist_ok=True)
+        new_file = not os.path.exists(self.output_path) or os.path.getsize(self.output_path) == 0
+        fieldnames = ['timestamp', 'elapsed', 'phase', 'file', 'category', 'size_bytes', 'resident_bytes', 'resident_fraction', 'mapped_nodes']
+        start_time = time.time()
+        with open(self.output_path, 'a', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            if new_file:
+                writer.writeheader()
+            next_sample_time = time.monotonic()
+            while not self.stop_event.is_set():
+                now = time.time()
+                try:
+                    files = sample_collection(self.pid, self.collection_name)
+                except OSError:
+                    # The container has exited
+                    break
+
+                totals = {}
+                for path, category, size, resident, nodes in files:
+                    writer.writerow({
+                        'timestamp': now,
+                        'elapsed': now - start_time,
+                        'phase': resource_sampler.current_phase,
+                        'file': path,
+                        'category': category,
+                        'size_bytes': size,
+                        'resident_bytes': resident,
+                        'resident_fraction': resident / size if size else 1.0,
+                        'mapped_nodes': ' '.join(f"N{node}={nbytes}" for node, nbytes in sorted(nodes.items())),
+                    })
+                    for key in (category, 'total'):
+                        total = totals.setdefault(key, [0, 0])
+                        total[0] += size
+                        total[1] += resident
+                f.flush()
+                self.history.append((resource_sampler.current_phase, now - start_time, totals))
+
+                next_sample_time += self.interval
+                self.stop_event.wait(max(0, next_sample_time - time.monotonic()))
+
+    # Resident fraction over time per category, as flat result columns:
+    # residency_<category>_{first,min,mean,final}_fraction
+    def summary(self):
+        fractions = {}
+        for _, _, totals in self.history:
+            for category, (size, resident) in totals.items():
+                if size:
+                    fractions.setdefault(category, []).append(resident / size)
+
+        columns = {'residency_samples': len(self.history)}
+        for category, values in fractions.items():
+            columns.update({
+                f'residency_{category}_first_fraction': values[0],
+                f'residency_{category}_min_fraction': min(values),
+                f'residency_{category}_mean_fraction': sum(values) / len(values),
+                f'residency_{category}_final_fraction': values[-1],
+            })
+        return columns
+
+# Log the summary columns of a residency sampler
+def log_residency_summary(columns):
+    logger.info(f"Page-cache residency over {columns.get('residency_samples', 0)} samples (first / min / mean / final):")
+    for category in ['total'] + footprint.STORAGE_CATEGORIES:
+        key = f'residency_{category}'
+        if f'{key}_final_fraction' in columns:
+            logger.info(f"  {category:<14} " + ' / '.join(f"{columns[f'{key}_{stat}_fraction']:.1%}" for stat in ('first', 'min', 'mean', 'final')))
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+# Synthetic payloads and filters for the filtered search mode of qdrant_benchmark.py.
+#
+# Every point gets two integer payload fields:
+#   rank  uniform in [0, RANK_RANGE). A range filter 'rank < s * RANK_RANGE'
+#         matches a fraction s of the points, so any selectivity can be tested.
+#   tag   uniform in [0, cardinality). A filter matching k distinct tags matches
+#         a fraction k / cardinality of the points, which exercises keyword-style
+#         lookups whose cost depends on the number of distinct values.
+# The payloads are stored in the dataset cache next to the vectors, so the exact
+# ground truth of a filtered query can be computed locally.
+
+import numpy as np
+from qdrant_client.http import models
+
+import dataset_cache
+
+# Range of the 'rank' field
+RANK_RANGE = 1000000
+
+# Payload fields, in the column order of the cached payload array
+PAYLOAD_FIELDS = ['rank', 'tag']
+
+# Fill 'out' (count x 2 int32) with the payload fields, one chunk at a time
+def generate_payloads(out, cardinality, seed):
+    rng = np.random.default_rng([seed, dataset_cache.KIND_STREAMS['payload']])
+    for start in range(0, out.shape[0], dataset_cache.GENERATION_CHUNK_SIZE):
+        end = min(start + dataset_cache.GENERATION_CHUNK_SIZE, out.shape[0])
+        out[start:end, 0] = rng.integers(0, RANK_RANGE, size=end - start, dtype=np.int32)
+        out[start:end, 1] = rng.integers(0, cardinality, size=end - start, dtype=np.int32)
+
+# Return the payloads of 'count' points as a read-only (count x 2) memmap from the dataset cache
+def get_payloads(cache_dir, count, cardinality, seed):
+    return dataset_cache.cached_array(
+        cache_dir,
+        f"payload.n{count}.c{cardinality}.s{seed}",
+        (count, len(PAYLOAD_FIELDS)),
+        np.int32,
+        lambda out: generate_payloads(out, cardinality, seed),
+        metadata={'kind': 'payload', 'seed': seed, 'cardinality': cardinality, 'fields': PAYLOAD_FIELDS},
+    )
+
+# Payload dicts for the points in [start, end)
+def payload_batch(payloads, start, end):
+    return [dict(zip(PAYLOAD_FIELDS, map(int, row))) for row in payloads[start:end]]
+
+# Number of distinct tags a 'tag' filter matches for a selectivity
+def tag_count(selectivity, cardinality):
+    return max(1, min(cardinality, round(selectivity * cardinality)))
+
+# Build the Qdrant filter matching a fraction 'selectivity' of the points on
+# 'field'. Returns None (no filter) for a selectivity of 1 or more.
+def build_filter(field, selectivity, cardinality):
+    if selectivity >= 1:
+        return None
+    if field == 'rank':
+        condition = models.FieldCondition(key='rank', range=models.Range(lt=int(selectivity * RANK_RANGE)))
+    elif field == 'tag':
+        condition = models.FieldCondition(key='tag', match=models.MatchAny(any=list(range(tag_count(selectivity, cardinality)))))
+    else:
+        raise ValueError(f"Unknown payload field: {field}")
+    return models.Filter(must=[condition])
+
+# Boolean mask of the points matched by build_filter(field, selectivity, cardinality)
+def filter_mask(payloads, field, selectivity, cardinality):
+    if selectivity >= 1:
+        return np.ones(len(payloads), dtype=bool)
+    if field == 'rank':
+        return payloads[:, 0] < int(selectivity * RANK_RANGE)
+    if field == 'tag':
+        return payloads[:, 1] < tag_count(selectivity, cardinality)
+    raise ValueError(f"Unknown payload field: {field}")
+
+# Name of a selectivity bucket, used as the prefix of its result columns
+def bucket_name(selectivity):
+    return f"sel{selectivity:g}"
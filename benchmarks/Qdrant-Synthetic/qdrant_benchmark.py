@@ -18,6 +18,19 @@ import sys
 import io
 from statistics import mean
 import atexit
+import dataset_cache
+import footprint
+import ground_truth
+import mixed_workload
+import multi_tenant
+import numa_placement
+import page_residency
+import payloads
+import resource_sampler
+import self_test
+import snapshot_cache
+import sweep
+import warmup
 
 # Map the data type (--data-type) to Qdrant data type
 DATA_TYPE_MAP = {
@@ -33,6 +46,12 @@ NP_DATA_TYPE_MAP = {
     'UINT8': np.uint8
 }
 
+# Quantization modes (--quantization). Product quantization modes carry the compression ratio.
+QUANTIZATION_MODES = ['none', 'scalar', 'binary', 'product-x4', 'product-x8', 'product-x16', 'product-x32', 'product-x64']
+
+# Search-side settings that can be varied over one loaded collection (see run_benchmark())
+QUERY_VARIANT_KEYS = ['hnsw_ef', 'rescore', 'oversampling']
+
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -46,6 +65,9 @@ urlliblog.setLevel(logging.ERROR)
 # Global flag to indicate if the script is being interrupted
 interrupted = False
 
+# Host directory bind-mounted as the server's storage (--storage-dir), removed when the container stops
+storage_bind_dir = None
+
 # Handle Signals (Ctrl-C)
 def signal_handler(sig, frame):
     global qdrant_client
@@ -80,17 +102,30 @@ def check_root():
         sys.exit(1)
 
 # Start a Qdrant Docker Container using the latest image
-def run_qdrant_container(cpus, memory, storage, port, numa_nodes=None, cpu_set=None):
+# If snapshot_dir is given, it is bind-mounted as the server's snapshots directory.
+# The server storage is a tmpfs of 'storage' GB, unless storage_dir is given: then
+# an empty directory below it is bind-mounted instead, so the on-disk modes read
+# through the page cache of the device holding storage_dir.
+def run_qdrant_container(cpus, memory, storage, port, numa_nodes=None, cpu_set=None, snapshot_dir=None, storage_dir=None):
+    global storage_bind_dir
     logger.info(f"Starting Qdrant container with {cpus} CPUs, {memory}GB memory, {storage}GB storage, and port {port}...")
     cmd = [
         'docker', 'run', '-d',
         '--cpus', str(cpus),
         '--memory', f'{memory}g',
-        '--mount', f'type=tmpfs,destination=/qdrant/storage,tmpfs-size={storage}g',
         '-p', f'{port}:6333',
         '--name', 'qdrant_benchmark',
     ]
 
+    if storage_dir:
+        storage_bind_dir = os.path.join(os.path.abspath(storage_dir), 'qdrant_benchmark_storage')
+        shutil.rmtree(storage_bind_dir, ignore_errors=True)
+        os.makedirs(storage_bind_dir)
+        cmd.extend(['--mount', f'type=bind,source={storage_bind_dir},destination={footprint.QDRANT_STORAGE_PATH}'])
+        logger.info(f"Using storage directory: {storage_bind_dir}")
+    else:
+        cmd.extend(['--mount', f'type=tmpfs,destination={footprint.QDRANT_STORAGE_PATH},tmpfs-size={storage}g'])
+
     if numa_nodes:
         cmd.extend(['--cpuset-mems', numa_nodes])
         logger.info(f"Using NUMA nodes: {numa_nodes}")
@@ -99,6 +134,11 @@ def run_qdrant_container(cpus, memory, storage, port, numa_nodes=None, cpu_set=N
         cmd.extend(['--cpuset-cpus', cpu_set])
         logger.info(f"Using CPU set: {cpu_set}")
 
+    if snapshot_dir:
+        os.makedirs(snapshot_dir, exist_ok=True)
+        cmd.extend(['--mount', f'type=bind,source={os.path.abspath(snapshot_dir)},destination={snapshot_cache.CONTAINER_SNAPSHOTS_PATH}'])
+        logger.info(f"Using snapshot cache: {snapshot_dir}")
+
     cmd.append('qdrant/qdrant')
 
     try:
@@ -121,6 +161,8 @@ def stop_qdrant_container():
         logger.info("Qdrant container removed successfully.")
     except subprocess.CalledProcessError:
         logger.warning("No container to remove.")
+    if storage_bind_dir:
+        shutil.rmtree(storage_bind_dir, ignore_errors=True)
 
 # Wait for the Docker container to start before attempting to access the database
 def wait_for_qdrant_service(host='localhost', port=6333, timeout=60):
@@ -142,8 +184,28 @@ def wait_for_qdrant_service(host='localhost', port=6333, timeout=60):
     logger.error(f"Qdrant service did not become ready within {timeout} seconds.")
     return False
 
+# Build the Qdrant quantization config for a quantization mode (see QUANTIZATION_MODES).
+# With always_ram, the quantized vectors are kept in RAM even if the original
+# vectors are stored on disk (--on-disk).
+def build_quantization_config(mode, always_ram=False, scalar_quantile=0.99):
+    if mode == 'none':
+        return None
+    if mode == 'scalar':
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, quantile=scalar_quantile, always_ram=always_ram)
+        )
+    if mode == 'binary':
+        return models.BinaryQuantization(
+            binary=models.BinaryQuantizationConfig(always_ram=always_ram)
+        )
+    if mode.startswith('product-'):
+        return models.ProductQuantization(
+            product=models.ProductQuantizationConfig(compression=models.CompressionRatio(mode.split('-', 1)[1]), always_ram=always_ram)
+        )
+    raise ValueError(f"Unsupported quantization mode: {mode}")
+
 # Create a new QDrant Data Collection
-def create_collection(client, collection_name, vector_size, qdrant_data_type, on_disk, hnsw_on_disk, on_disk_payload):
+def create_collection(client, collection_name, vector_size, qdrant_data_type, on_disk, hnsw_on_disk, on_disk_payload, hnsw_m=16, hnsw_ef_construct=100, quantization_config=None):
     logger.info(f"Creating collection '{collection_name}' with vector size {vector_size} using datatype {qdrant_data_type}...")
     
     # Check if the collection already exists
@@ -169,11 +231,25 @@ def create_collection(client, collection_name, vector_size, qdrant_data_type, on
             on_disk=on_disk,
             datatype=qdrant_data_type
         ),
-        hnsw_config=models.HnswConfigDiff(on_disk=hnsw_on_disk),
+        hnsw_config=models.HnswConfigDiff(m=hnsw_m, ef_construct=hnsw_ef_construct, on_disk=hnsw_on_disk),
+        quantization_config=quantization_config,
         on_disk_payload=on_disk_payload,
     )
     logger.info(f"Collection '{collection_name}' created successfully.")
 
+# Create integer payload indexes on the given payload fields. Create them before
+# loading so the server indexes the payloads as they arrive, and the HNSW graph
+# gets the extra links that keep filtered searches connected.
+def create_payload_indexes(client, collection_name, fields):
+    for field in fields:
+        logger.info(f"Creating payload index on '{field}' for collection '{collection_name}'...")
+        client.create_payload_index(
+            collection_name=collection_name,
+            field_name=field,
+            field_schema=models.PayloadSchemaType.INTEGER,
+            wait=True
+        )
+
 # Disable Qdrant Indexing. This may reduce the time to load all the vectors.
 def disable_indexing(client, collection_name):
     """Disable indexing for faster bulk insertion."""
@@ -189,19 +265,83 @@ def disable_indexing(client, collection_name):
     )
 
 # Enable Qdrant indexing. Enable once all the vectors are loaded into the database.
-def enable_indexing(client, collection_name):
+# This is also used to change the HNSW parameters of a loaded collection. The
+# server rebuilds the index of the existing segments without re-ingesting them.
+def enable_indexing(client, collection_name, m=16, ef_construct=100):
     """Re-enable HNSW indexing after insertion."""
-    logger.info(f"Re-enabling HNSW indexing for collection '{collection_name}'...")
+    logger.info(f"Enabling HNSW indexing for collection '{collection_name}' with m={m}, ef_construct={ef_construct}...")
     client.update_collection(
         collection_name=collection_name,
         hnsw_config=models.HnswConfigDiff(
-            m=16,  # Restore HNSW parameters, adjust this based on your performance needs
-            ef_construct=100  # Set appropriate values for your use case
+            m=m,
+            ef_construct=ef_construct
         )
     )
 
+# Change the quantization of a loaded collection. The server quantizes the stored
+# vectors again in the background, so wait_for_collection_ready() should follow.
+def update_quantization(client, collection_name, quantization_config):
+    logger.info(f"Updating quantization for collection '{collection_name}': {quantization_config}")
+    client.update_collection(
+        collection_name=collection_name,
+        quantization_config=quantization_config if quantization_config is not None else models.Disabled.DISABLED
+    )
+
+# Wait until the collection optimizers have finished (collection status is green),
+# i.e. all segments are indexed after a load or a configuration change.
+#
+# After update_collection() ('changed'), a green status alone does not show that
+# the optimizer has picked up the change: the collection is still green until it
+# starts. The wait then also requires the optimizer to have been seen at work (a
+# status other than green, or a change of the indexed vector count) and every
+# point to be indexed, polling every 'change_poll_interval' so a short rebuild is
+# not missed. A collection that stays green without progress for 'pickup_timeout'
+# seconds is taken as ready, e.g. after a change that rebuilds nothing, or with
+# segments below the indexing threshold that are never indexed.
+def wait_for_collection_ready(client, collection_name, timeout=86400, poll_interval=1, changed=False,
+                              change_poll_interval=0.1, pickup_timeout=10):
+    logger.info(f"Waiting for collection '{collection_name}' optimization/indexing to complete...")
+    if changed:
+        poll_interval = change_poll_interval
+    else:
+        # Give the optimizers a moment to pick up the loaded vectors
+        time.sleep(poll_interval)
+    start_time = time.time()
+    progress_time = start_time
+    picked_up = False
+    indexed_count = None
+    while time.time() - start_time < timeout and not interrupted:
+        collection_info = client.get_collection(collection_name)
+        green = collection_info.status == models.CollectionStatus.GREEN
+        if green and collection_info.optimizer_status != models.OptimizersStatusOneOf.OK:
+            logger.error(f"Collection '{collection_name}' optimizer failed: {collection_info.optimizer_status}")
+            return False
+        if not green or (indexed_count is not None and collection_info.indexed_vectors_count != indexed_count):
+            picked_up = True
+            progress_time = time.time()
+        indexed_count = collection_info.indexed_vectors_count
+        indexed = (indexed_count or 0) >= (collection_info.points_count or 0)
+        if green and (not changed or (picked_up and indexed)):
+            logger.info(f"Collection '{collection_name}' is ready ({time.time() - start_time:.2f} seconds).")
+            return True
+        if green and time.time() - progress_time >= pickup_timeout:
+            logger.warning(f"Collection '{collection_name}' is green, {'' if picked_up else 'the optimizer did not start, '}"
+                           f"{indexed_count} of {collection_info.points_count} vectors are indexed, and nothing changed "
+                           f"for {pickup_timeout} seconds; taking it as ready ({time.time() - start_time:.2f} seconds).")
+            return True
+        time.sleep(poll_interval)
+    if interrupted:
+        logger.info("Waiting for the collection was interrupted.")
+        return False
+    logger.error(f"Collection '{collection_name}' did not become ready within {timeout} seconds.")
+    return False
+
 # Insert/Load vectors into the database.
-def insert_vectors(client, collection_name, num_vectors, vector_size, data_type, batch_size, disable_indexing_for_loading):
+# 'vectors' is typically a read-only memmap from the dataset cache. Each batch is
+# a slice (view) of it, so no copy of the dataset is made on the client.
+# 'payload_data' is an optional array of payload fields from payloads.get_payloads().
+def insert_vectors(client, collection_name, vectors, batch_size, disable_indexing_for_loading, hnsw_m=16, hnsw_ef_construct=100, payload_data=None):
+    num_vectors = len(vectors)
     if num_vectors == 0:
         logger.info(f"No vectors to insert into collection '{collection_name}'.")
         return 0, 0, 0
@@ -216,15 +356,7 @@ def insert_vectors(client, collection_name, num_vectors, vector_size, data_type,
             )
         )
 
-    # Generate vectors based on the specified data type
-    if data_type == 'float32':
-        vectors = np.random.rand(num_vectors, vector_size).astype(np.float32)
-    elif data_type == 'uint8':
-        vectors = np.random.randint(0, 256, size=(num_vectors, vector_size), dtype=np.uint8)
-    else:
-        raise ValueError(f"Unsupported data type: {data_type}")
-
-    logger.info(f"Inserting {num_vectors} vectors into collection '{collection_name}' using {data_type} datatype...")
+    logger.info(f"Inserting {num_vectors} vectors into collection '{collection_name}' using {vectors.dtype} datatype...")
     inserted_count = 0
     insertion_rates = []
     start_time = time.time()
@@ -245,6 +377,7 @@ def insert_vectors(client, collection_name, num_vectors, vector_size, data_type,
                 client.upload_collection(
                     collection_name=collection_name,
                     vectors=vectors[i:end_index],
+                    payload=payloads.payload_batch(payload_data, i, end_index) if payload_data is not None else None,
                     ids=list(range(i, end_index)),
                     batch_size=batch_size
                 )
@@ -271,47 +404,307 @@ def insert_vectors(client, collection_name, num_vectors, vector_size, data_type,
 
     # Re-enable HNSW indexing if it was disabled for loading
     if disable_indexing_for_loading:
-        logger.info(f"Re-enabling HNSW indexing for collection '{collection_name}'...")
-        client.update_collection(
-            collection_name=collection_name,
-            hnsw_config=models.HnswConfigDiff(
-                m=16,  # Re-enable with the desired HNSW configuration
-                ef_construct=100  # Customize this based on your use case
-            )
-        )
+        enable_indexing(client, collection_name, hnsw_m, hnsw_ef_construct)
 
     return average_rate, min(insertion_rates), max(insertion_rates)
 
 
+# Summarize per-query latencies (in seconds) measured over 'elapsed' seconds of wall time
+def latency_stats(latencies, elapsed):
+    if not latencies:
+        return {'queries': 0, 'qps': 0, 'avg_latency': 0, 'p50_latency': 0, 'p95_latency': 0, 'p99_latency': 0, 'max_latency': 0}
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        'queries': len(latencies),
+        'qps': len(latencies) / elapsed if elapsed > 0 else 0,
+        'avg_latency': mean(latencies),
+        'p50_latency': float(p50),
+        'p95_latency': float(p95),
+        'p99_latency': float(p99),
+        'max_latency': max(latencies),
+    }
+
 # Run a benchmark test and measure the performance
-def measure_performance(client, collection_name, vector_size, data_type, num_queries=1000):
+# Each query uses the next vector from the cached, held-out query set. If the
+# exact ground truth is given, recall@top_k is reported next to the latencies.
+def measure_performance(client, collection_name, query_vectors, top_k=10, ground_truth_ids=None, search_params=None):
+    num_queries = len(query_vectors)
     logger.info(f"Measuring performance with {num_queries} queries...")
 
-    # Check if the provided data type is supported
-    if data_type not in NP_DATA_TYPE_MAP:
-        raise ValueError(f"Unsupported data type: {data_type}")
+    latencies = []
+    result_ids = []
+    start_time = time.time()
+    for query_vector in query_vectors:
+        if interrupted:
+            logger.info("Performance measurement interrupted.")
+            break
+        query_start_time = time.perf_counter()
+        hits = client.query_points(
+            collection_name=collection_name,
+            query=query_vector,
+            limit=top_k,
+            search_params=search_params,
+            with_payload=False
+        ).points
+        latencies.append(time.perf_counter() - query_start_time)
+        result_ids.append([hit.id for hit in hits])
+    end_time = time.time()
+
+    stats = latency_stats(latencies, end_time - start_time)
+    logger.info(f"Average query time: {stats['avg_latency']:.6f} seconds (over {stats['queries']} queries)")
+    logger.info(f"Query latency p50: {stats['p50_latency']:.6f}, p95: {stats['p95_latency']:.6f}, p99: {stats['p99_latency']:.6f} seconds")
+    logger.info(f"Queries per second: {stats['qps']:.2f}")
+
+    if ground_truth_ids is not None:
+        stats['recall'] = ground_truth.recall_at_k(result_ids, ground_truth_ids, top_k)
+        logger.info(f"Recall@{top_k}: {stats['recall']:.4f}")
+
+    return stats
 
-    # Map the string data type to a NumPy data type
-    np_data_type = NP_DATA_TYPE_MAP[data_type]
+# Run queries back to back for 'duration' seconds while 'upserter' (a
+# mixed_workload.Upserter) writes points in the background. Each latency is
+# grouped by the phase of the collection (idle, optimizing, pending) when the
+# query was sent, and the per-phase stats are returned with a '<phase>_' prefix.
+def measure_mixed_performance(client, collection_name, port, query_vectors, top_k, upserter, duration, search_params=None):
+    logger.info(f"Measuring mixed read/write performance for {duration} seconds with {upserter.rate} upserts/second ({upserter.mode})...")
 
-    # Generate the query vector using the correct data type
-    query_vector = np.random.rand(vector_size).astype(np_data_type)
+    monitor = mixed_workload.StatusMonitor('localhost', port, collection_name)
+    monitor.start()
+    upserter.start()
+
+    latencies = []
+    phase_latencies = {}
+    start_time = time.time()
+    try:
+        # Cycle through the held-out query set until the duration has passed
+        i = 0
+        while time.time() - start_time < duration:
+            if interrupted:
+                logger.info("Performance measurement interrupted.")
+                break
+            phase = monitor.phase
+            query_start_time = time.perf_counter()
+            client.query_points(
+                collection_name=collection_name,
+                query=query_vectors[i % len(query_vectors)],
+                limit=top_k,
+                search_params=search_params,
+                with_payload=False
+            )
+            latency = time.perf_counter() - query_start_time
+            latencies.append(latency)
+            phase_latencies.setdefault(phase, []).append(latency)
+            i += 1
+    finally:
+        upserter.stop()
+        monitor.stop()
+    end_time = time.time()
 
+    stats = latency_stats(latencies, end_time - start_time)
+    logger.info(f"Average query time: {stats['avg_latency']:.6f} seconds (over {stats['queries']} queries)")
+    logger.info(f"Query latency p50: {stats['p50_latency']:.6f}, p95: {stats['p95_latency']:.6f}, p99: {stats['p99_latency']:.6f} seconds")
+    logger.info(f"Queries per second: {stats['qps']:.2f}")
+
+    phase_durations = monitor.phase_durations()
+    for phase in mixed_workload.STATUS_PHASES.values():
+        phase_stats = latency_stats(phase_latencies.get(phase, []), phase_durations.get(phase, 0))
+        stats.update({f'{phase}_{key}': value for key, value in phase_stats.items()})
+        stats[f'{phase}_seconds'] = phase_durations.get(phase, 0)
+        if phase_stats['queries'] > 0:
+            logger.info(f"Collection {phase} ({phase_durations.get(phase, 0):.1f} seconds): {phase_stats['queries']} queries, "
+                        f"p50: {phase_stats['p50_latency']:.6f}, p95: {phase_stats['p95_latency']:.6f}, "
+                        f"p99: {phase_stats['p99_latency']:.6f} seconds, {phase_stats['qps']:.2f} queries/second")
+
+    upsert_stats = upserter.summary()
+    logger.info(f"Upserted {upsert_stats['upserted_points']} points at {upsert_stats['upsert_rate']:.2f} points/second "
+                f"(target {upsert_stats['upsert_target_rate']}, {upsert_stats['upsert_errors']} failed batches)")
+    stats.update(upsert_stats)
+    return stats
+
+# Run the held-out queries with a mix of payload filters. Query i uses bucket
+# i % len(buckets), so the buckets are interleaved over the run. Each bucket is a
+# dict with its 'name', 'selectivity', the 'matched_fraction' of points its
+# 'filter' matches and optionally the exact 'ground_truth' of its queries. The
+# per-bucket stats are returned with a '<name>_' prefix.
+def measure_filtered_performance(client, collection_name, query_vectors, top_k, buckets, search_params=None):
+    num_queries = len(query_vectors)
+    logger.info(f"Measuring filtered search performance with {num_queries} queries over {len(buckets)} selectivity buckets...")
+
+    latencies = []
+    bucket_latencies = [[] for _ in buckets]
+    bucket_results = [[] for _ in buckets]
     start_time = time.time()
-    for i in range(num_queries):
+    for i, query_vector in enumerate(query_vectors):
         if interrupted:
             logger.info("Performance measurement interrupted.")
             break
-        client.search(
+        b = i % len(buckets)
+        query_start_time = time.perf_counter()
+        hits = client.query_points(
             collection_name=collection_name,
-            query_vector=query_vector,
-            limit=10
-        )
+            query=query_vector,
+            query_filter=buckets[b]['filter'],
+            limit=top_k,
+            search_params=search_params,
+            with_payload=False
+        ).points
+        latency = time.perf_counter() - query_start_time
+        latencies.append(latency)
+        bucket_latencies[b].append(latency)
+        bucket_results[b].append([hit.id for hit in hits])
     end_time = time.time()
-    actual_queries = i + 1
-    avg_query_time = (end_time - start_time) / actual_queries
-    logger.info(f"Average query time: {avg_query_time:.6f} seconds (over {actual_queries} queries)")
-    return avg_query_time
+
+    stats = latency_stats(latencies, end_time - start_time)
+    logger.info(f"Average query time: {stats['avg_latency']:.6f} seconds (over {stats['queries']} queries)")
+    logger.info(f"Query latency p50: {stats['p50_latency']:.6f}, p95: {stats['p95_latency']:.6f}, p99: {stats['p99_latency']:.6f} seconds")
+    logger.info(f"Queries per second: {stats['qps']:.2f}")
+
+    table = []
+    found_ids = []
+    expected_ids = []
+    for bucket, bucket_latency, results in zip(buckets, bucket_latencies, bucket_results):
+        # The buckets share the run, so a bucket's QPS is over the time spent in its own queries
+        bucket_stats = latency_stats(bucket_latency, sum(bucket_latency))
+        bucket_stats['selectivity'] = bucket['selectivity']
+        bucket_stats['matched_fraction'] = bucket['matched_fraction']
+        if bucket.get('ground_truth') is not None:
+            bucket_stats['recall'] = ground_truth.recall_at_k(results, bucket['ground_truth'], top_k)
+            found_ids.extend(results)
+            expected_ids.extend(bucket['ground_truth'][:len(results)])
+        stats.update({f"{bucket['name']}_{key}": value for key, value in bucket_stats.items()})
+        table.append(dict(bucket_stats, bucket=bucket['name']))
+
+    if expected_ids:
+        stats['recall'] = ground_truth.recall_at_k(found_ids, expected_ids, top_k)
+        logger.info(f"Recall@{top_k}: {stats['recall']:.4f}")
+
+    columns = ['bucket', 'matched_fraction', 'queries', 'p50_latency', 'p99_latency', 'qps']
+    sweep.log_rows("Filtered search by selectivity bucket:", table, columns + (['recall'] if expected_ids else []))
+    return stats
+
+# Build the search parameters for a query run. Returns None to use the server defaults.
+# rescore and oversampling only apply to quantized collections.
+def build_search_params(hnsw_ef=None, rescore=None, oversampling=None):
+    quantization = None
+    if rescore is not None or oversampling is not None:
+        quantization = models.QuantizationSearchParams(rescore=rescore, oversampling=oversampling)
+    if hnsw_ef is None and quantization is None:
+        return None
+    return models.SearchParams(hnsw_ef=hnsw_ef, quantization=quantization)
+
+# Warm the server up before a measurement (--warmup, see warmup.py). The warm-up
+# queries use the same search parameters as the measurement, and in the filtered
+# mode cycle through the same 'query_filters'. Returns the warm-up result columns
+# (warmup_*), or an empty dict if 'warmup_vectors' is None (warm-up disabled).
+def warm_up(client, collection_name, args, warmup_vectors, search_params=None, query_filters=None):
+    if warmup_vectors is None:
+        return {}
+
+    def run_query(i, query_vector):
+        client.query_points(
+            collection_name=collection_name,
+            query=query_vector,
+            query_filter=query_filters[i % len(query_filters)] if query_filters else None,
+            limit=args.top_k,
+            search_params=search_params,
+            with_payload=False
+        )
+
+    phase = resource_sampler.current_phase
+    resource_sampler.set_phase(phase.replace('queries', 'warmup', 1))
+    result = warmup.run_warmup(run_query, warmup_vectors, args.warmup_window, args.warmup_windows, args.warmup_cv,
+                               args.warmup_max_queries, args.warmup_max_seconds, lambda: interrupted)
+    resource_sampler.set_phase(phase)
+
+    columns = {f'warmup_{key}': value for key, value in latency_stats(result['latencies'], result['elapsed']).items()}
+    columns.update({'warmup_seconds': result['elapsed'], 'warmup_steady': result['steady'], 'warmup_cv': result['cv']})
+    return columns
+
+# Footprint columns for a sweep result row. 'memory_bytes' is the resident memory
+# of the server process and is the memory objective of the Pareto frontier.
+def footprint_columns(sample):
+    columns = {k: v for k, v in sample.items() if k != 'phase'}
+    columns['memory_bytes'] = sample.get('rss_bytes')
+    return columns
+
+# Sweep the HNSW build (m, ef_construct) and search (hnsw_ef) parameters over one
+# loaded collection. Changing m/ef_construct rebuilds the index from the vectors
+# already stored on the server, so the dataset is only ingested once. Returns one
+# result row per (m, ef_construct, hnsw_ef) combination, starting with 'config'.
+def run_hnsw_sweep(client, collection_name, port, query_vectors, top_k, ground_truth_ids, m_values, ef_construct_values, ef_values, config, warmup_fn=None):
+    rows = []
+    for m in m_values:
+        for ef_construct in ef_construct_values:
+            if interrupted:
+                return rows
+            build_start_time = time.time()
+            resource_sampler.set_phase(f"indexing m={m} ef_construct={ef_construct}")
+            enable_indexing(client, collection_name, m, ef_construct)
+            if not wait_for_collection_ready(client, collection_name, changed=True):
+                return rows
+            build_duration = time.time() - build_start_time
+            sample = footprint.measure_footprint(client, collection_name, 'qdrant_benchmark', port, f"m={m},ef_construct={ef_construct}")
+
+            for hnsw_ef in ef_values:
+                if interrupted:
+                    return rows
+                logger.info(f"HNSW sweep: m={m}, ef_construct={ef_construct}, hnsw_ef={hnsw_ef}")
+                resource_sampler.set_phase(f"queries m={m} ef_construct={ef_construct} hnsw_ef={hnsw_ef}")
+                warmup_columns = warmup_fn(build_search_params(hnsw_ef)) if warmup_fn else {}
+                stats = measure_performance(client, collection_name, query_vectors, top_k, ground_truth_ids, build_search_params(hnsw_ef))
+                row = dict(config)
+                row.update({
+                    'm': m,
+                    'ef_construct': ef_construct,
+                    'hnsw_ef': hnsw_ef,
+                    'index_build_seconds': build_duration,
+                })
+                row.update(footprint_columns(sample))
+                row.update(warmup_columns)
+                row.update(stats)
+                rows.append(row)
+    return rows
+
+# Sweep the quantization mode and the rescore/oversampling search settings over one
+# loaded collection. Each mode is applied with update_collection(), so the vectors
+# are only ingested once. Returns one result row per (mode, rescore, oversampling),
+# starting with 'config'.
+def run_quantization_sweep(client, collection_name, port, query_vectors, top_k, ground_truth_ids, modes, rescore_values, oversampling_values, always_ram, hnsw_ef, config, warmup_fn=None):
+    rows = []
+    for mode in modes:
+        if interrupted:
+            return rows
+        update_start_time = time.time()
+        resource_sampler.set_phase(f"quantizing {mode}")
+        update_quantization(client, collection_name, build_quantization_config(mode, always_ram))
+        if not wait_for_collection_ready(client, collection_name, changed=True):
+            return rows
+        update_duration = time.time() - update_start_time
+        sample = footprint.measure_footprint(client, collection_name, 'qdrant_benchmark', port, f"quantization={mode}")
+
+        # Rescoring and oversampling have no effect without quantization
+        search_settings = [(None, None)] if mode == 'none' else [(r, o) for r in rescore_values for o in oversampling_values]
+        for rescore, oversampling in search_settings:
+            if interrupted:
+                return rows
+            logger.info(f"Quantization sweep: mode={mode}, rescore={rescore}, oversampling={oversampling}")
+            resource_sampler.set_phase(f"queries {mode} rescore={rescore} oversampling={oversampling}")
+            search_params = build_search_params(hnsw_ef, rescore, oversampling)
+            warmup_columns = warmup_fn(search_params) if warmup_fn else {}
+            stats = measure_performance(client, collection_name, query_vectors, top_k, ground_truth_ids, search_params)
+            row = dict(config)
+            row.update({
+                'quantization': mode,
+                'rescore': rescore,
+                'oversampling': oversampling,
+                'hnsw_ef': hnsw_ef,
+                'quantization_seconds': update_duration,
+            })
+            row.update(footprint_columns(sample))
+            row.update(warmup_columns)
+            row.update(stats)
+            rows.append(row)
+    return rows
 
 # Get the `docker stats` output to show the memory utilization
 def get_docker_stats():
@@ -329,6 +722,42 @@ def get_docker_stats():
         logger.error("Error getting Docker stats")
         return None
 
+# Return True if the run writes synthetic payloads with the vectors
+def has_payload(args):
+    return bool(args.payload or args.filter_selectivities)
+
+# Return True if any part of the collection is memory-mapped from the storage directory
+def has_on_disk_storage(args):
+    return args.on_disk or args.hnsw_on_disk or args.on_disk_payload
+
+# Describe the dataset and collection config that determine the contents of a
+# loaded collection. Used as the snapshot cache key.
+def collection_snapshot_params(args, hnsw_m, hnsw_ef_construct, quantization):
+    return {
+        'vector_size': args.vector_size,
+        'numvectors': args.numvectors,
+        'data_type': args.data_type,
+        'seed': args.seed,
+        'distance': 'cosine',
+        'on_disk': args.on_disk,
+        'hnsw_on_disk': args.hnsw_on_disk,
+        'on_disk_payload': args.on_disk_payload,
+        'hnsw_m': hnsw_m,
+        'hnsw_ef_construct': hnsw_ef_construct,
+        'quantization': quantization,
+        'quantization_always_ram': args.quantization_always_ram,
+        'payload_cardinality': args.payload_cardinality if has_payload(args) else None,
+        'payload_index': ','.join(args.payload_index),
+    }
+
+# Log the per-phase summary of a resource sampler
+def log_resource_summary(sampler):
+    logger.info("Resource usage by phase:")
+    for phase, stats in sampler.summary().items():
+        logger.info(f"  {phase}: {format_duration(stats['duration'])}, peak memory {format_size(stats['peak_memory_bytes'])}, "
+                    f"final memory {format_size(stats['final_memory_bytes'])}, "
+                    f"CPU cores mean {stats['mean_cpu_cores']:.2f} / peak {stats['peak_cpu_cores']:.2f}")
+
 # Obtain the NVidia GPU stats from `nvidia-smi`
 def get_gpu_stats():
     if shutil.which('nvidia-smi'):
@@ -344,21 +773,6 @@ def get_gpu_stats():
             return result.stdout.strip()
     return "GPU stats not available"
 
-# Obtain the true database size using Qdrant metrics
-def get_database_size(client, collection_name):
-    collection_info = client.get_collection(collection_name)
-    if hasattr(collection_info, 'vectors_config'):
-        # Old API
-        vector_size = collection_info.vectors_config.size
-    elif hasattr(collection_info, 'config'):
-        # New API
-        vector_size = collection_info.config.params.vectors.size
-    else:
-        logger.error("Unable to determine vector size from collection info")
-        return 0
-    
-    return collection_info.points_count * vector_size * 4  # 4 bytes per float32
-
 # Run `df -h` in the container to show how much data is written to the disk
 def get_disk_usage(container_name):
     cmd = ['docker', 'exec', container_name, 'df', '-h']
@@ -396,16 +810,54 @@ def format_size(bytes_size):
             return f"{bytes_size:.2f} {unit} ({int(original_size)} bytes)"
         bytes_size /= 1024
 
-# The Main function
-def main():
-    # Argument Parsing
+# Return the sweep mode selected by the arguments: 'hnsw' or 'quantization' if
+# any of their sweep lists is given, otherwise None
+def sweep_mode(args):
+    hnsw_sweep = any([args.sweep_hnsw_m, args.sweep_hnsw_ef_construct, args.sweep_hnsw_ef])
+    quantization_sweep = any([args.sweep_quantization, args.sweep_rescore, args.sweep_oversampling])
+    if hnsw_sweep and quantization_sweep:
+        raise ValueError("The HNSW and quantization sweep modes cannot be combined. Run them separately.")
+    if hnsw_sweep:
+        return 'hnsw'
+    if quantization_sweep:
+        return 'quantization'
+    return None
+
+# Describe the configuration of a run for its result rows
+def result_config_columns(args):
+    columns = collection_snapshot_params(args, args.hnsw_m, args.hnsw_ef_construct, args.quantization)
+    columns.update(sweep.placement_from_args(args))
+    columns.update({
+        'cpus': args.cpus,
+        'memory': args.memory,
+        'storage_dir': args.storage_dir,
+        'numqueries': args.numqueries,
+        'top_k': args.top_k,
+        'warmup': args.warmup,
+        'filter_field': args.filter_field if args.filter_selectivities else None,
+        'upsert_mode': args.upsert_mode if args.upsert_rate > 0 else None,
+        'mixed_duration': args.mixed_duration if args.upsert_rate > 0 else None,
+    })
+    return columns
+
+# Configuration columns of a sweep row: the run configuration without the
+# parameters that the sweep varies, which the sweep rows report themselves
+def sweep_config_columns(args, swept):
+    return {c: v for c, v in result_config_columns(args).items() if c not in swept}
+
+# Build the command line parser of the benchmark
+def build_parser():
     parser = argparse.ArgumentParser(description="Benchmark Qdrant for performance testing by inserting a specified number of vectors. The tool helps measure Qdrant performance under different configurations, including CPU, memory, storage, and vector size.")
     parser.add_argument('--cpus', type=int, default=1, help='Number of CPUs')
     parser.add_argument('--memory', type=int, default=4, help='Memory in GB')
     parser.add_argument('--storage', type=int, default=10, help='Storage in GB')
+    parser.add_argument('--storage-dir', type=str, help='Keep the server storage in a directory below this host path (e.g. on an SSD) instead of a tmpfs of --storage GB')
     parser.add_argument('--port', type=int, default=6333, help='Host port for Qdrant')
     parser.add_argument('--numa-nodes', type=str, default=0, help='NUMA nodes to use (e.g., "0,1")')
     parser.add_argument('--cpu-set', type=str, help='Specific CPUs or CPU sockets to use (e.g., "0-3,4-7" or "0,1")')
+    parser.add_argument('--client-cpus', type=str, help='CPUs the benchmark client runs on (e.g. "0-3"). Default: wherever the scheduler puts it')
+    parser.add_argument('--client-mem-policy', type=str, choices=list(numa_placement.MEMPOLICY_MODES), help='Memory policy of the benchmark client (bind, interleave, preferred or default)')
+    parser.add_argument('--client-mem-nodes', type=str, help='NUMA nodes of the client memory policy (e.g. "0" or "0,2")')
     parser.add_argument('--vector-size', type=int, default=384, help='Vector size for the collection')
     parser.add_argument('--numvectors', type=int, default=1000000, help='Number of vectors to insert (must be a positive integer)')
     parser.add_argument('--data-type', type=str, default='FP32', choices=['FP32', 'UINT8'], help='Data type for vectors (FP32, UINT8)')
@@ -414,47 +866,220 @@ def main():
     parser.add_argument('--on-disk-payload', action='store_true', help='Enable on-disk storage for payloads')
     parser.add_argument('--disable-hnsw-indexing-for-loading', action='store_true', help='Disable HNSW indexing during vector loading and re-enable it afterward')
     parser.add_argument('--batch-size', type=int, default=1000, help='Number of vectors per batch')
+    parser.add_argument('--numqueries', type=int, default=1000, help='Number of distinct search queries to run')
+    parser.add_argument('--top-k', type=int, default=10, help='Number of nearest neighbours returned by each query and used for recall@k')
+    parser.add_argument('--warmup', action='store_true', help='Run warm-up queries before each measurement until the latency is steady (see --warmup-*)')
+    parser.add_argument('--warmup-window', type=int, default=100, help='Warm-up: number of queries per latency window')
+    parser.add_argument('--warmup-windows', type=int, default=3, help='Warm-up: number of consecutive windows whose median latencies must agree')
+    parser.add_argument('--warmup-cv', type=float, default=0.05, help='Warm-up: steady when the coefficient of variation of the window medians is at most this')
+    parser.add_argument('--warmup-max-queries', type=int, default=10000, help='Warm-up: maximum number of warm-up queries')
+    parser.add_argument('--warmup-max-seconds', type=float, default=120, help='Warm-up: maximum warm-up time in seconds')
+    parser.add_argument('--no-recall', action='store_true', help='Skip the ground truth computation and recall measurement')
+    parser.add_argument('--gt-memory-mb', type=int, default=ground_truth.DEFAULT_MEMORY_BUDGET_MB, help='Memory budget (MiB) for the brute-force ground truth computation')
+    parser.add_argument('--dataset-cache-dir', type=str, default=dataset_cache.DEFAULT_CACHE_DIR, help='Directory used to cache the generated vectors between runs')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for the generated vectors. Runs with the same seed use identical data')
+    parser.add_argument('--hnsw-m', type=int, default=16, help='HNSW m (number of graph links per node)')
+    parser.add_argument('--hnsw-ef-construct', type=int, default=100, help='HNSW ef_construct (candidate list size during index build)')
+    parser.add_argument('--hnsw-ef', type=int, help='HNSW ef used at search time (default: server default)')
+    parser.add_argument('--sweep-hnsw-m', type=sweep.int_list, help='Sweep mode: comma separated HNSW m values (e.g. "8,16,32")')
+    parser.add_argument('--sweep-hnsw-ef-construct', type=sweep.int_list, help='Sweep mode: comma separated HNSW ef_construct values (e.g. "64,128,256")')
+    parser.add_argument('--sweep-hnsw-ef', type=sweep.int_list, help='Sweep mode: comma separated search-time hnsw_ef values (e.g. "32,64,128,256")')
+    parser.add_argument('--quantization', type=str, default='none', choices=QUANTIZATION_MODES, help='Vector quantization mode')
+    parser.add_argument('--quantization-always-ram', action='store_true', help='Keep the quantized vectors in RAM even when the original vectors are on disk')
+    parser.add_argument('--rescore', action=argparse.BooleanOptionalAction, default=None, help='Rescore the quantized search results using the original vectors (default: server default)')
+    parser.add_argument('--oversampling', type=float, help='Oversampling factor for quantized search, e.g. 2.0 fetches 2 x top-k candidates before rescoring')
+    parser.add_argument('--sweep-quantization', type=sweep.choice_list(QUANTIZATION_MODES), help=f'Sweep mode: comma separated quantization modes ({",".join(QUANTIZATION_MODES)})')
+    parser.add_argument('--sweep-rescore', type=sweep.bool_list, help='Sweep mode: comma separated rescore settings (e.g. "true,false")')
+    parser.add_argument('--sweep-oversampling', type=sweep.float_list, help='Sweep mode: comma separated oversampling factors (e.g. "1.0,2.0,4.0")')
+    parser.add_argument('--sweep-output', type=str, help='CSV file the sweep results are appended to. The Pareto frontier is written to <name>.pareto.csv '
+                                                         '(default: /var/tmp/qdrant_benchmark/results/<hnsw|quantization>_sweep.csv)')
+    parser.add_argument('--payload', action='store_true', help='Write synthetic payloads (rank, tag) with the vectors. Implied by --filter-selectivities')
+    parser.add_argument('--payload-cardinality', type=int, default=1000, help='Number of distinct values of the "tag" payload field')
+    parser.add_argument('--payload-index', type=sweep.choice_list(payloads.PAYLOAD_FIELDS), default=[], help='Comma separated payload fields to index (rank, tag)')
+    parser.add_argument('--filter-field', type=str, default='rank', choices=payloads.PAYLOAD_FIELDS, help='Payload field the search filters use: "rank" (range filter) or "tag" (match any of several tags)')
+    parser.add_argument('--filter-selectivities', type=sweep.float_list, help='Filtered mode: comma separated fractions of points matched by the query filters, '
+                                                                            'e.g. "0.001,0.01,0.1,1" (1 is unfiltered). The queries are spread evenly over the buckets')
+    parser.add_argument('--upsert-rate', type=float, default=0, help='Mixed mode: upsert this many points per second while the queries run (0 disables the mixed mode)')
+    parser.add_argument('--upsert-batch-size', type=int, default=100, help='Mixed mode: number of points per upsert request')
+    parser.add_argument('--upsert-mode', type=str, default='append', choices=mixed_workload.UPSERT_MODES, help='Mixed mode: append new points or overwrite randomly chosen loaded points')
+    parser.add_argument('--mixed-duration', type=int, default=60, help='Mixed mode: seconds to run the queries and upserts for')
+    parser.add_argument('--tenant-sizes', type=sweep.int_list, help='Multi-tenant mode: comma separated number of vectors of each tenant collection, e.g. "1000000,500000,500000"')
+    parser.add_argument('--tenant-streams', type=int, default=1, help='Multi-tenant mode: parallel query streams per tenant')
+    parser.add_argument('--tenant-duration', type=int, default=60, help='Multi-tenant mode: seconds to run the query streams for')
+    parser.add_argument('--tenant-output', type=str, help='Multi-tenant mode: CSV file the per-tenant results are appended to (default: /var/tmp/qdrant_benchmark/results/multi_tenant.csv)')
+    parser.add_argument('--snapshot-cache', action='store_true', help='Restore the loaded and indexed collection from a cached snapshot if one matches, otherwise save one after loading')
+    parser.add_argument('--snapshot-cache-dir', type=str, default=snapshot_cache.DEFAULT_CACHE_DIR, help='Directory of the collection snapshot cache')
+    parser.add_argument('--sample-interval-ms', type=int, default=250, help='Interval of the background cgroup resource sampler in milliseconds (0 disables it)')
+    parser.add_argument('--sampler-output', type=str, help='CSV file for the resource sampler time series (default: /var/tmp/qdrant_benchmark/results/resources.<date_time>.csv)')
+    parser.add_argument('--residency-interval-ms', type=int, default=1000, help='Interval of the page-cache residency sampler of the storage files in the on-disk modes, in milliseconds (0 disables it)')
+    parser.add_argument('--residency-output', type=str, help='CSV file for the page-cache residency time series (default: /var/tmp/qdrant_benchmark/results/residency.<date_time>.csv)')
+    parser.add_argument('--footprint-output', type=str, help='CSV file the collection footprint samples (after load, after indexing, after queries) are appended to')
+    parser.add_argument('--self-test', action='store_true', help='Measure the harness overhead against an in-process stand-in server instead of running a benchmark (no Docker or root needed)')
     parser.add_argument('--verbose', action='store_true', help='Increase output verbosity')
+    return parser
 
-    args = parser.parse_args()
-
-    # Validate the arguments
+# Validate the parsed arguments and fill in the defaults that depend on other
+# arguments. Raises ValueError if the arguments are invalid.
+def validate_args(args):
     if args.numvectors <= 0:
-        logger.error("The number of vectors must be greater than 0.")
-        sys.exit(1)
-
-    if args.verbose:
-        logger.setLevel(logging.DEBUG)
-    else:
-        logger.setLevel(logging.INFO)
-
-    # If the user has not specified any of the help arguments, run the main benchmark suite.
-    help_flags = ['--help', '-h', '-?']
-    if not any(flag in sys.argv for flag in help_flags):
-        # Check for root privileges
-        check_root()
-
-        # Register the cleanup function to be called at exit
-        atexit.register(cleanup)
-
-        # Log the configuration options
-        logger.info("Configuration options for this run:")
-        logger.info(pprint.pformat(vars(args)))  # Use pprint to nicely format the dictionary
-
-
-        # Start benchmarking
-        try:
-            run_qdrant_container(args.cpus, args.memory, args.storage, args.port, args.numa_nodes, args.cpu_set)
-            if not wait_for_qdrant_service(port=args.port):
-                return
-
-            logger.info("Connecting to Qdrant server...")
-            client = QdrantClient("localhost", port=args.port)
-
-            collection_name = "benchmark_collection"
-            vector_size = args.vector_size
-            qdrant_data_type = DATA_TYPE_MAP[args.data_type]
-
+        raise ValueError("The number of vectors must be greater than 0.")
+
+    if args.numqueries <= 0:
+        raise ValueError("The number of queries must be greater than 0.")
+
+    if args.top_k <= 0:
+        raise ValueError("The number of nearest neighbours (--top-k) must be greater than 0.")
+
+    if args.warmup_window <= 0 or args.warmup_windows < 2 or args.warmup_cv <= 0 or args.warmup_max_queries <= 0 or args.warmup_max_seconds <= 0:
+        raise ValueError("The warm-up window, CV and budgets must be greater than 0, and at least 2 windows are needed.")
+
+    if args.upsert_rate < 0 or args.upsert_batch_size <= 0 or args.mixed_duration <= 0:
+        raise ValueError("The upsert rate must not be negative, and the upsert batch size and mixed duration must be greater than 0.")
+
+    if args.client_mem_policy not in (None, 'default') and not args.client_mem_nodes:
+        raise ValueError(f"The client memory policy '{args.client_mem_policy}' needs --client-mem-nodes.")
+
+    mode = sweep_mode(args)
+    if mode is not None and args.upsert_rate > 0:
+        raise ValueError("The mixed read/write mode (--upsert-rate) cannot be combined with the sweep modes.")
+
+    if args.payload_cardinality <= 0:
+        raise ValueError("The payload cardinality must be greater than 0.")
+
+    if args.filter_selectivities:
+        if any(s <= 0 or s > 1 for s in args.filter_selectivities):
+            raise ValueError("Filter selectivities must be greater than 0 and at most 1.")
+        if mode is not None or args.upsert_rate > 0:
+            raise ValueError("The filtered mode (--filter-selectivities) cannot be combined with the sweep or mixed read/write modes.")
+        if args.numqueries < len(args.filter_selectivities):
+            raise ValueError("The number of queries must be at least the number of filter selectivities.")
+
+    if args.sampler_output is None:
+        args.sampler_output = f"/var/tmp/qdrant_benchmark/results/resources.{time.strftime('%Y%m%d_%H%M%S')}.csv"
+
+    if args.residency_output is None:
+        args.residency_output = f"/var/tmp/qdrant_benchmark/results/residency.{time.strftime('%Y%m%d_%H%M%S')}.csv"
+
+    if args.sweep_output is None:
+        args.sweep_output = f"/var/tmp/qdrant_benchmark/results/{mode or 'hnsw'}_sweep.csv"
+
+    if args.tenant_sizes:
+        if any(size <= 0 for size in args.tenant_sizes) or args.tenant_streams <= 0 or args.tenant_duration <= 0:
+            raise ValueError("Tenant sizes, the number of streams per tenant and the tenant duration must be greater than 0.")
+        if mode is not None or args.upsert_rate > 0 or args.filter_selectivities or args.snapshot_cache or args.warmup:
+            raise ValueError("The multi-tenant mode (--tenant-sizes) cannot be combined with the sweep, mixed, filtered, warm-up or snapshot cache modes.")
+        if args.tenant_output is None:
+            args.tenant_output = "/var/tmp/qdrant_benchmark/results/multi_tenant.csv"
+
+# Run one benchmark: start the container, load (or restore) the collection, run
+# the queries and stop the container. 'args' are parsed and validated arguments
+# (see build_parser() and validate_args()).
+#
+# 'query_variants' is an optional list of dicts overriding the search-side
+# settings (QUERY_VARIANT_KEYS) of the arguments. Every variant is measured
+# against the same loaded collection, so callers running a matrix of query
+# settings only pay for loading and indexing once. The sweep modes ignore it.
+#
+# Returns a list of result rows (flat dicts): one per query variant, or one per
+# swept configuration in the sweep modes.
+def run_benchmark(args, query_variants=None):
+    # Place the client before it allocates the dataset or starts any threads
+    numa_placement.apply_client_placement(args.client_cpus, args.client_mem_policy, args.client_mem_nodes)
+
+    # Any sweep list enables the sweep mode. Dimensions that are not swept use the single value options.
+    mode = sweep_mode(args)
+    m_values = args.sweep_hnsw_m or [args.hnsw_m]
+    ef_construct_values = args.sweep_hnsw_ef_construct or [args.hnsw_ef_construct]
+    ef_values = args.sweep_hnsw_ef or [args.hnsw_ef]
+    quantization_modes = args.sweep_quantization or [args.quantization]
+    rescore_values = args.sweep_rescore or [args.rescore]
+    oversampling_values = args.sweep_oversampling or [args.oversampling]
+
+    # Load (or generate and cache) the dataset and ground truth before starting the container
+    np_data_type = NP_DATA_TYPE_MAP[args.data_type]
+    vectors = dataset_cache.get_vectors(args.dataset_cache_dir, 'base', args.vector_size, args.numvectors, np_data_type, args.seed)
+    query_vectors = dataset_cache.get_vectors(args.dataset_cache_dir, 'query', args.vector_size, args.numqueries, np_data_type, args.seed)
+    warmup_vectors = None
+    if args.warmup:
+        warmup_vectors = dataset_cache.get_vectors(args.dataset_cache_dir, 'warmup', args.vector_size, args.numqueries, np_data_type, args.seed)
+    ground_truth_ids = None
+    mixed = args.upsert_rate > 0
+    if mixed:
+        # The upserts change the nearest neighbours while the queries run, so the exact ground truth does not apply
+        logger.info("Recall is not measured in the mixed read/write mode.")
+    elif not args.no_recall and not args.filter_selectivities:
+        ground_truth_ids = ground_truth.get_ground_truth(args.dataset_cache_dir, vectors, query_vectors, args.top_k, args.seed, args.gt_memory_mb)
+
+    # Payloads, and the filter buckets of the filtered mode with the exact ground truth of their queries
+    payload_data = None
+    filter_buckets = []
+    if has_payload(args):
+        payload_data = payloads.get_payloads(args.dataset_cache_dir, args.numvectors, args.payload_cardinality, args.seed)
+    for b, selectivity in enumerate(args.filter_selectivities or []):
+        mask = payloads.filter_mask(payload_data, args.filter_field, selectivity, args.payload_cardinality)
+        bucket = {
+            'name': payloads.bucket_name(selectivity),
+            'selectivity': selectivity,
+            'matched_fraction': float(mask.mean()),
+            'filter': payloads.build_filter(args.filter_field, selectivity, args.payload_cardinality),
+            'ground_truth': None,
+        }
+        if not args.no_recall:
+            filter_key = f"{args.filter_field}{selectivity:g}.c{args.payload_cardinality}.b{b}of{len(args.filter_selectivities)}"
+            bucket['ground_truth'] = ground_truth.get_filtered_ground_truth(
+                args.dataset_cache_dir, vectors, query_vectors[b::len(args.filter_selectivities)], args.top_k, args.seed,
+                mask, filter_key, args.gt_memory_mb)
+        filter_buckets.append(bucket)
+
+    # Points written by the upsert thread in the mixed mode. The set is reused
+    # cyclically, so it only needs to cover one run at the target rate.
+    upsert_vectors = None
+    if mixed:
+        upsert_count = max(args.upsert_batch_size, min(int(args.upsert_rate * args.mixed_duration), args.numvectors))
+        upsert_vectors = dataset_cache.get_vectors(args.dataset_cache_dir, 'upsert', args.vector_size, upsert_count, np_data_type, args.seed)
+
+    # Start benchmarking
+    rows = []
+    sampler = None
+    try:
+        run_qdrant_container(args.cpus, args.memory, args.storage, args.port, args.numa_nodes, args.cpu_set,
+                             args.snapshot_cache_dir if args.snapshot_cache else None, args.storage_dir)
+        if not wait_for_qdrant_service(port=args.port):
+            return rows
+
+        # Start sampling the container's resource usage in the background
+        if args.sample_interval_ms > 0:
+            container_pid = footprint.get_container_pid('qdrant_benchmark')
+            if container_pid is not None:
+                sampler = resource_sampler.start_container_sampler(container_pid, args.sample_interval_ms / 1000, args.sampler_output)
+
+        logger.info("Connecting to Qdrant server...")
+        client = QdrantClient("localhost", port=args.port)
+
+        collection_name = "benchmark_collection"
+        vector_size = args.vector_size
+        qdrant_data_type = DATA_TYPE_MAP[args.data_type]
+
+        # Restore the collection from the snapshot cache if a matching snapshot exists
+        restored = False
+        restore_duration = 0
+        if args.snapshot_cache:
+            snapshot_key, snapshot_params = snapshot_cache.snapshot_key(
+                collection_snapshot_params(args, m_values[0], ef_construct_values[0], quantization_modes[0]),
+                snapshot_cache.get_server_version(port=args.port)
+            )
+            if snapshot_cache.find_snapshot(args.snapshot_cache_dir, snapshot_key):
+                resource_sampler.set_phase('restore')
+                restore_duration = snapshot_cache.restore_snapshot(client, collection_name, snapshot_key)
+                logger.info(f"Restored {args.numvectors} vectors from snapshot {snapshot_key} in {format_duration(restore_duration)} ({restore_duration:.2f} seconds).")
+                restored = True
+            else:
+                logger.info(f"No cached snapshot for key {snapshot_key}. The collection will be loaded and saved.")
+
+        footprints = []
+        insert_avg = insert_min = insert_max = 0
+        insertion_duration = 0
+        if not restored:
             create_collection(
                 client, 
                 collection_name, 
@@ -462,8 +1087,12 @@ def main():
                 qdrant_data_type,
                 args.on_disk, 
                 args.hnsw_on_disk, 
-                args.on_disk_payload
+                args.on_disk_payload,
+                m_values[0],
+                ef_construct_values[0],
+                build_quantization_config(quantization_modes[0], args.quantization_always_ram)
             )
+            create_payload_indexes(client, collection_name, args.payload_index)
 
             logger.info("Initial database size: 0 bytes")
             logger.info("Docker stats before data insertion:")
@@ -472,28 +1101,30 @@ def main():
             logger.info(get_gpu_stats())
 
             # Initial data ingestion
+            resource_sampler.set_phase('load')
             logger.info(f"Inserting {args.numvectors} vectors...")
             insertion_start_time = time.time()
             insert_avg, insert_min, insert_max = insert_vectors(
                 client,
                 collection_name,
-                args.numvectors,
-                args.vector_size,
-                qdrant_data_type,
+                vectors,
                 args.batch_size,
-                args.disable_hnsw_indexing_for_loading
+                args.disable_hnsw_indexing_for_loading,
+                m_values[0],
+                ef_construct_values[0],
+                payload_data
             )
             if interrupted:
-                return
-            
+                return rows
+
             # Calculate and print the total time taken to insert all the vectors
             insertion_end_time = time.time()
             insertion_duration = insertion_end_time - insertion_start_time
             formatted_duration = format_duration(insertion_duration)
             logger.info(f"Successfully inserted {args.numvectors} vectors in {formatted_duration} ({insertion_duration:.2f} seconds).")
 
-            db_size_bytes = get_database_size(client, collection_name)
-            logger.info(f"Database size after initial insertion: {format_size(db_size_bytes)}")
+            footprints.append(footprint.measure_footprint(client, collection_name, 'qdrant_benchmark', args.port, 'after_load'))
+            footprint.log_footprint(footprints[-1], format_size)
 
             logger.info("Docker stats after initial insertion:")
             logger.info(json.dumps(get_docker_stats(), indent=2))
@@ -501,35 +1132,412 @@ def main():
             logger.info(get_gpu_stats())
             logger.info("Disk usage after initial insertion:")
             logger.info(get_disk_usage('qdrant_benchmark'))
+        else:
+            footprints.append(footprint.measure_footprint(client, collection_name, 'qdrant_benchmark', args.port, 'after_restore'))
+            footprint.log_footprint(footprints[-1], format_size)
+
+        # Wait for the index to be built before querying
+        resource_sampler.set_phase('indexing')
+        indexing_start_time = time.time()
+        if not wait_for_collection_ready(client, collection_name):
+            return rows
+        indexing_duration = time.time() - indexing_start_time
+
+        footprints.append(footprint.measure_footprint(client, collection_name, 'qdrant_benchmark', args.port, 'after_indexing'))
+        footprint.log_footprint(footprints[-1], format_size)
+
+        # Save the loaded and indexed collection so later runs can skip ingestion
+        if args.snapshot_cache and not restored:
+            resource_sampler.set_phase('snapshot')
+            snapshot_cache.save_snapshot(client, collection_name, args.snapshot_cache_dir, snapshot_key, snapshot_params)
+
+        # Record the start time of the benchmark
+        benchmark_start_time = time.time()
+
+        warmup_fn = lambda search_params: warm_up(client, collection_name, args, warmup_vectors, search_params)
+        if mode == 'hnsw':
+            # The swept parameters replace the single values of the run configuration
+            config = sweep_config_columns(args, ('hnsw_m', 'hnsw_ef_construct'))
+            rows = run_hnsw_sweep(client, collection_name, args.port, query_vectors, args.top_k, ground_truth_ids,
+                                  m_values, ef_construct_values, ef_values, config, warmup_fn)
+            observed = numa_placement.observe_placement(footprint.get_container_pid('qdrant_benchmark'))
+            for row in rows:
+                row.update(observed)
+            maximize = ('qps',) if args.no_recall else ('recall', 'qps')
+            frontier = sweep.save_sweep_results(args.sweep_output, rows, list(config), maximize=maximize, minimize=('memory_bytes',))
+            sweep.log_rows("HNSW sweep Pareto frontier (each configuration in the results file):", frontier,
+                           sweep.PLACEMENT_COLUMNS + ['m', 'ef_construct', 'hnsw_ef', *maximize, 'memory_bytes'])
+        elif mode == 'quantization':
+            config = sweep_config_columns(args, ('quantization',))
+            rows = run_quantization_sweep(client, collection_name, args.port, query_vectors, args.top_k, ground_truth_ids,
+                                          quantization_modes, rescore_values, oversampling_values,
+                                          args.quantization_always_ram, args.hnsw_ef, config, warmup_fn)
+            observed = numa_placement.observe_placement(footprint.get_container_pid('qdrant_benchmark'))
+            for row in rows:
+                row.update(observed)
+            maximize = ('qps',) if args.no_recall else ('recall', 'qps')
+            frontier = sweep.save_sweep_results(args.sweep_output, rows, list(config), maximize=maximize, minimize=('memory_bytes',))
+            sweep.log_rows("Quantization sweep Pareto frontier (each configuration in the results file):", frontier,
+                           sweep.PLACEMENT_COLUMNS + ['quantization', 'rescore', 'oversampling', *maximize, 'p99_latency', 'memory_bytes'])
+        else:
+            # In the on-disk modes, track the page-cache residency of the storage files while the queries run
+            residency_sampler = None
+            if has_on_disk_storage(args) and args.residency_interval_ms > 0:
+                container_pid = footprint.get_container_pid('qdrant_benchmark')
+                if container_pid is not None:
+                    residency_sampler = page_residency.ResidencySampler(container_pid, collection_name, args.residency_interval_ms / 1000,
+                                                                        args.residency_output)
+
+            # In the mixed mode one upserter is shared by all query variants, so appended point ids do not repeat
+            upserter = None
+            if mixed:
+                upserter = mixed_workload.Upserter('localhost', args.port, collection_name, upsert_vectors, args.upsert_rate,
+                                                   args.upsert_batch_size, args.upsert_mode, args.numvectors, args.seed)
+
+            # Run the held-out queries once per query variant and measure latency and recall
+            for variant in query_variants or [{}]:
+                settings = {key: getattr(args, key) for key in QUERY_VARIANT_KEYS}
+                settings.update(variant)
+                if variant:
+                    logger.info(f"Query variant: {', '.join(f'{k}={v}' for k, v in settings.items())}")
+
+                resource_sampler.set_phase('queries' if not variant else f"queries {' '.join(f'{k}={v}' for k, v in settings.items())}")
+                search_params = build_search_params(settings['hnsw_ef'], settings['rescore'], settings['oversampling'])
+                if residency_sampler is not None:
+                    residency_sampler.start()
+                try:
+                    warmup_columns = warm_up(client, collection_name, args, warmup_vectors, search_params,
+                                             [bucket['filter'] for bucket in filter_buckets])
+                    if interrupted:
+                        return rows
+                    if filter_buckets:
+                        query_stats = measure_filtered_performance(client, collection_name, query_vectors, args.top_k,
+                                                                   filter_buckets, search_params)
+                    elif mixed:
+                        query_stats = measure_mixed_performance(client, collection_name, args.port, query_vectors, args.top_k,
+                                                                upserter, args.mixed_duration, search_params)
+                    else:
+                        query_stats = measure_performance(client, collection_name, query_vectors, args.top_k, ground_truth_ids, search_params)
+                finally:
+                    if residency_sampler is not None:
+                        residency_sampler.stop()
+
+                if interrupted:
+                    return rows
+
+                logger.info(f"Final average query time: {query_stats['avg_latency']:.6f} seconds")
+                if 'recall' in query_stats:
+                    logger.info(f"Final recall@{args.top_k}: {query_stats['recall']:.4f}")
+
+                footprints.append(footprint.measure_footprint(client, collection_name, 'qdrant_benchmark', args.port, 'after_queries'))
+                footprint.log_footprint(footprints[-1], format_size)
+                row = result_config_columns(args)
+                row.update(settings)
+                row.update({
+                    'restored': restored,
+                    'restore_seconds': restore_duration,
+                    'insert_seconds': insertion_duration,
+                    'insert_avg_rate': insert_avg,
+                    'insert_min_rate': insert_min,
+                    'insert_max_rate': insert_max,
+                    'indexing_seconds': indexing_duration,
+                })
+                row.update(footprint_columns(footprints[-1]))
+                row.update(numa_placement.observe_placement(footprint.get_container_pid('qdrant_benchmark')))
+                if residency_sampler is not None:
+                    residency = residency_sampler.summary()
+                    page_residency.log_residency_summary(residency)
+                    row.update(residency)
+                row.update(warmup_columns)
+                row.update(query_stats)
+                rows.append(row)
 
-            # Record the start time of the benchmark
-            benchmark_start_time = time.time()
+        if interrupted:
+            return rows
+
+        if mode is not None:
+            footprints.append(footprint.measure_footprint(client, collection_name, 'qdrant_benchmark', args.port, 'after_queries'))
+            footprint.log_footprint(footprints[-1], format_size)
+        if args.footprint_output:
+            sweep.append_results_csv(args.footprint_output, [dict(footprint_row, **sweep.placement_from_args(args)) for footprint_row in footprints])
+
+        # Calculate and print the total benchmark duration
+        benchmark_end_time = time.time()
+        benchmark_duration = benchmark_end_time - benchmark_start_time
+        formatted_duration = format_duration(benchmark_duration)
+        logger.info(f"Total benchmark completed in {formatted_duration} ({benchmark_duration:.2f} seconds).")
+
+        # Report overall insertion rates
+        logger.info("Overall Insertion Rate Summary:")
+        logger.info(f"Initial insertion - Avg: {insert_avg:.2f}, Min: {insert_min:.2f}, Max: {insert_max:.2f} vectors/second")
+    finally:
+        if sampler is not None:
+            sampler.stop()
+            log_resource_summary(sampler)
+        stop_qdrant_container()
+
+    return rows
+
+# Multi-tenant mode: load one collection per tenant (--tenant-sizes) into the same
+# server and run --tenant-streams independent query streams against each of them
+# in parallel for --tenant-duration seconds. Tenant i uses the dataset seed
+# --seed + i, so the tenants hold different vectors. Returns one result row per
+# tenant plus an aggregate row (tenant 'all'), which are also appended to --tenant-output.
+def run_multi_tenant_benchmark(args):
+    numa_placement.apply_client_placement(args.client_cpus, args.client_mem_policy, args.client_mem_nodes)
+
+    np_data_type = NP_DATA_TYPE_MAP[args.data_type]
+    tenants = []
+    for i, size in enumerate(args.tenant_sizes):
+        seed = args.seed + i
+        tenant = {
+            'index': i,
+            'collection_name': multi_tenant.tenant_collection_name(i),
+            'numvectors': size,
+            'seed': seed,
+            'vectors': dataset_cache.get_vectors(args.dataset_cache_dir, 'base', args.vector_size, size, np_data_type, seed),
+            'query_vectors': dataset_cache.get_vectors(args.dataset_cache_dir, 'query', args.vector_size, args.numqueries, np_data_type, seed),
+            'ground_truth': None,
+        }
+        if not args.no_recall:
+            tenant['ground_truth'] = ground_truth.get_ground_truth(args.dataset_cache_dir, tenant['vectors'], tenant['query_vectors'],
+                                                                   args.top_k, seed, args.gt_memory_mb)
+        tenants.append(tenant)
+
+    rows = []
+    sampler = None
+    try:
+        run_qdrant_container(args.cpus, args.memory, args.storage, args.port, args.numa_nodes, args.cpu_set,
+                             storage_dir=args.storage_dir)
+        if not wait_for_qdrant_service(port=args.port):
+            return rows
 
-            # Call measure_performance with the correct data type from the arguments
-            avg_query_time = measure_performance(client, collection_name, args.vector_size, args.data_type)
+        if args.sample_interval_ms > 0:
+            container_pid = footprint.get_container_pid('qdrant_benchmark')
+            if container_pid is not None:
+                sampler = resource_sampler.start_container_sampler(container_pid, args.sample_interval_ms / 1000, args.sampler_output)
 
+        logger.info("Connecting to Qdrant server...")
+        client = QdrantClient("localhost", port=args.port)
+
+        # Load every tenant, then wait for all of them to be indexed
+        for tenant in tenants:
+            create_collection(
+                client,
+                tenant['collection_name'],
+                args.vector_size,
+                DATA_TYPE_MAP[args.data_type],
+                args.on_disk,
+                args.hnsw_on_disk,
+                args.on_disk_payload,
+                args.hnsw_m,
+                args.hnsw_ef_construct,
+                build_quantization_config(args.quantization, args.quantization_always_ram)
+            )
+            resource_sampler.set_phase(f"load {tenant['collection_name']}")
+            logger.info(f"Inserting {tenant['numvectors']} vectors into tenant {tenant['index']}...")
+            tenant['insert_avg_rate'], _, _ = insert_vectors(
+                client,
+                tenant['collection_name'],
+                tenant['vectors'],
+                args.batch_size,
+                args.disable_hnsw_indexing_for_loading,
+                args.hnsw_m,
+                args.hnsw_ef_construct
+            )
             if interrupted:
-                return
-            
-            logger.info(f"Final average query time: {avg_query_time:.6f} seconds")
+                return rows
+
+        resource_sampler.set_phase('indexing')
+        for tenant in tenants:
+            if not wait_for_collection_ready(client, tenant['collection_name']):
+                return rows
+            tenant['footprint'] = footprint.measure_footprint(client, tenant['collection_name'], 'qdrant_benchmark', args.port, 'after_indexing')
+            footprint.log_footprint(tenant['footprint'], format_size)
+
+        # Run the query streams of all tenants at the same time
+        resource_sampler.set_phase('queries')
+        search_params = build_search_params(args.hnsw_ef, args.rescore, args.oversampling)
+        streams = []
+        for tenant in tenants:
+            tenant['streams'] = [
+                multi_tenant.QueryStream('localhost', args.port, tenant['collection_name'], tenant['query_vectors'],
+                                         args.top_k, args.tenant_duration, search_params,
+                                         offset=j * len(tenant['query_vectors']) // args.tenant_streams)
+                for j in range(args.tenant_streams)
+            ]
+            streams.extend(tenant['streams'])
+        logger.info(f"Running {len(streams)} query streams against {len(tenants)} tenants for {args.tenant_duration} seconds...")
+        elapsed = multi_tenant.run_streams(streams, lambda: interrupted)
+
+        sample = footprint.measure_footprint(client, tenants[0]['collection_name'], 'qdrant_benchmark', args.port, 'after_queries')
+        config = result_config_columns(args)
+        config.update({'tenants': len(tenants), 'tenant_streams': args.tenant_streams, 'tenant_duration': args.tenant_duration})
+        all_latencies = []
+        for tenant in tenants:
+            latencies = [latency for stream in tenant['streams'] for latency in stream.latencies]
+            all_latencies.extend(latencies)
+            row = dict(config, tenant=tenant['index'], numvectors=tenant['numvectors'], seed=tenant['seed'])
+            row['insert_avg_rate'] = tenant['insert_avg_rate']
+            row['storage_total_bytes'] = tenant['footprint'].get('storage_total_bytes')
+            row['errors'] = sum(stream.errors for stream in tenant['streams'])
+            row.update(latency_stats(latencies, elapsed))
+            if tenant['ground_truth'] is not None:
+                # Recall over the queries that succeeded, in any stream of the tenant
+                result_ids = {}
+                for stream in tenant['streams']:
+                    result_ids.update(stream.result_ids)
+                indexes = sorted(result_ids)
+                row['recall'] = ground_truth.recall_at_k([result_ids[i] for i in indexes],
+                                                         [tenant['ground_truth'][i] for i in indexes], args.top_k)
+            rows.append(row)
+
+        # Aggregate throughput over all tenants. The resident memory is shared by all of them.
+        total = dict(config, tenant='all', numvectors=sum(args.tenant_sizes))
+        total['storage_total_bytes'] = sum(tenant['footprint'].get('storage_total_bytes', 0) for tenant in tenants)
+        total['errors'] = sum(row['errors'] for row in rows)
+        total['memory_bytes'] = sample.get('rss_bytes')
+        total.update(numa_placement.observe_placement(footprint.get_container_pid('qdrant_benchmark')))
+        total.update(latency_stats(all_latencies, elapsed))
+        rows.append(total)
+
+        sweep.log_rows("Multi-tenant results:", rows, ['tenant', 'numvectors', 'queries', 'qps', 'p50_latency', 'p95_latency', 'p99_latency']
+                       + (['recall'] if not args.no_recall else []))
+        logger.info(f"Aggregate throughput: {total['qps']:.2f} queries/second over {len(tenants)} tenants")
+        sweep.append_results_csv(args.tenant_output, rows)
+    finally:
+        if sampler is not None:
+            sampler.stop()
+            log_resource_summary(sampler)
+        stop_qdrant_container()
+
+    return rows
+
+# Average time (in seconds) of the stdout/stderr redirection that insert_vectors() wraps around every batch
+def redirection_overhead(iterations=10000):
+    start_time = time.perf_counter()
+    for _ in range(iterations):
+        old_stdout, old_stderr = sys.stdout, sys.stderr
+        sys.stdout, sys.stderr = io.StringIO(), io.StringIO()
+        sys.stdout, sys.stderr = old_stdout, old_stderr
+    return (time.perf_counter() - start_time) / iterations
+
+# Result row of one self-test step: 'elapsed' is the client wall time of the step
+# and 'server_stats' the [calls, seconds] the stand-in server recorded for it.
+def self_test_row(operation, elapsed, server_stats, vectors=None):
+    calls, server_time = server_stats or (0, 0.0)
+    row = {
+        'operation': operation,
+        'calls': calls,
+        'ops_per_second': calls / elapsed if elapsed > 0 else 0,
+        'vectors_per_second': vectors / elapsed if vectors and elapsed > 0 else None,
+        'call_us': elapsed / calls * 1e6 if calls else 0,
+        'server_us': server_time / calls * 1e6 if calls else 0,
+    }
+    row['client_overhead_us'] = row['call_us'] - row['server_us']
+    return row
+
+# Harness self-test (--self-test): run the ingestion and query code paths against
+# an in-process stand-in server that returns canned responses (see self_test.py).
+# The rates measured here are the most the harness itself can drive. A result
+# from a real server close to them reflects the client rather than the server.
+def run_self_test(args):
+    numa_placement.apply_client_placement(args.client_cpus, args.client_mem_policy, args.client_mem_nodes)
+
+    np_data_type = NP_DATA_TYPE_MAP[args.data_type]
+    vectors = dataset_cache.get_vectors(args.dataset_cache_dir, 'base', args.vector_size, args.numvectors, np_data_type, args.seed)
+    query_vectors = dataset_cache.get_vectors(args.dataset_cache_dir, 'query', args.vector_size, args.numqueries, np_data_type, args.seed)
+
+    server = self_test.StandInServer()
+    server.start()
+    rows = []
+    try:
+        client = QdrantClient("127.0.0.1", port=server.port)
+        collection_name = "benchmark_collection"
+        create_collection(client, collection_name, args.vector_size, DATA_TYPE_MAP[args.data_type],
+                          args.on_disk, args.hnsw_on_disk, args.on_disk_payload, args.hnsw_m, args.hnsw_ef_construct)
+        server.take_stats()
+
+        # Ingestion through insert_vectors(), including the progress bar and the stdout/stderr redirection
+        start_time = time.perf_counter()
+        insert_vectors(client, collection_name, vectors, args.batch_size, False)
+        rows.append(self_test_row('upsert', time.perf_counter() - start_time, server.take_stats().get('upsert'), len(vectors)))
+
+        # The same uploads without the redirection and progress bar
+        logger.info("Uploading the vectors again without the stdout/stderr redirection...")
+        start_time = time.perf_counter()
+        for i in range(0, len(vectors), args.batch_size):
+            if interrupted:
+                break
+            end_index = min(i + args.batch_size, len(vectors))
+            client.upload_collection(
+                collection_name=collection_name,
+                vectors=vectors[i:end_index],
+                ids=list(range(i, end_index)),
+                batch_size=args.batch_size
+            )
+        rows.append(self_test_row('upsert (no redirection)', time.perf_counter() - start_time, server.take_stats().get('upsert'), len(vectors)))
+
+        # Queries through measure_performance()
+        start_time = time.perf_counter()
+        measure_performance(client, collection_name, query_vectors, args.top_k, search_params=build_search_params(args.hnsw_ef))
+        rows.append(self_test_row('search', time.perf_counter() - start_time, server.take_stats().get('search')))
+        client.close()
+    finally:
+        server.stop()
+
+    sweep.log_rows("Harness self-test (stand-in server, canned responses):", rows,
+                   ['operation', 'calls', 'ops_per_second', 'vectors_per_second', 'call_us', 'server_us', 'client_overhead_us'])
+    logger.info(f"stdout/stderr redirection in insert_vectors(): {redirection_overhead() * 1e6:.2f} us per batch")
+    logger.info("Benchmark results close to these rates are limited by the harness, not by the Qdrant server.")
+    return rows
+
+# The Main function
+def main():
+    # Argument Parsing
+    parser = build_parser()
+    args = parser.parse_args()
+
+    # Validate the arguments
+    try:
+        validate_args(args)
+    except ValueError as e:
+        logger.error(str(e))
+        sys.exit(1)
 
-            # Calculate and print the total benchmark duration
-            benchmark_end_time = time.time()
-            benchmark_duration = benchmark_end_time - benchmark_start_time
-            formatted_duration = format_duration(benchmark_duration)
-            logger.info(f"Total benchmark completed in {formatted_duration} ({benchmark_duration:.2f} seconds).")
+    if args.verbose:
+        logger.setLevel(logging.DEBUG)
+    else:
+        logger.setLevel(logging.INFO)
+
+    # The self-test does not start a container, so it needs neither root nor Docker
+    if args.self_test:
+        run_self_test(args)
+        return
+
+    # If the user has not specified any of the help arguments, run the main benchmark suite.
+    help_flags = ['--help', '-h', '-?']
+    if not any(flag in sys.argv for flag in help_flags):
+        # Check for root privileges
+        check_root()
 
-            # Report overall insertion rates
-            logger.info("Overall Insertion Rate Summary:")
-            logger.info(f"Initial insertion - Avg: {insert_avg:.2f}, Min: {insert_min:.2f}, Max: {insert_max:.2f} vectors/second")
+        # Register the cleanup function to be called at exit
+        atexit.register(cleanup)
 
+        # Log the configuration options
+        logger.info("Configuration options for this run:")
+        logger.info(pprint.pformat(vars(args)))  # Use pprint to nicely format the dictionary
+
+        try:
+            if args.tenant_sizes:
+                run_multi_tenant_benchmark(args)
+            else:
+                run_benchmark(args)
         except requests.ConnectionError as e:
             logger.error(f"Failed to connect to Qdrant: {e}")
             sys.exit(1)
         except Exception as e:
             logger.error(f"An error occurred: {str(e)}")
-        finally:
-            stop_qdrant_container()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+
+# Background resource sampler for qdrant_benchmark.py.
+#
+# A sampler thread reads the cgroup v2 files of the Qdrant container directly
+# (memory.current, memory.stat, cpu.stat, io.stat) at a fixed interval and
+# appends one row per sample to a CSV time series. Each row is tagged with the
+# current benchmark phase (set with set_phase()), so memory growth and CPU
+# saturation can be lined up with loading, indexing and query phases. Reading
+# the cgroup files is far cheaper than running `docker stats` for every sample.
+
+import csv
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Root of the cgroup v2 unified hierarchy
+CGROUP_ROOT = "/sys/fs/cgroup"
+
+# Current benchmark phase, shared by all samplers
+current_phase = 'startup'
+
+# Set the benchmark phase recorded with the following samples
+def set_phase(phase):
+    global current_phase
+    current_phase = phase
+
+# Return the cgroup v2 directory of a process, or None if the process is not
+# in a cgroup v2 hierarchy (e.g. the host uses cgroup v1)
+def cgroup_path_for_pid(pid):
+    try:
+        with open(f"/proc/{pid}/cgroup") as f:
+            for line in f:
+                hierarchy, _, path = line.strip().split(':', 2)
+                if hierarchy == '0':
+                    cgroup_path = os.path.join(CGROUP_ROOT, path.lstrip('/'))
+                    if os.path.exists(os.path.join(cgroup_path, 'memory.current')):
+                        return cgroup_path
+    except (OSError, ValueError) as e:
+        logger.error(f"Error reading the cgroup of PID {pid}: {e}")
+    return None
+
+# Read a flat-keyed cgroup file ("key value" per line) into a dict of ints
+def read_flat_keyed(path):
+    values = {}
+    with open(path) as f:
+        for line in f:
+            key, _, value = line.partition(' ')
+            if value.strip().isdigit():
+                values[key] = int(value)
+    return values
+
+# Read io.stat and sum the counters over all devices
+def read_io_stat(path):
+    totals = {'rbytes': 0, 'wbytes': 0, 'rios': 0, 'wios': 0, 'dbytes': 0, 'dios': 0}
+    with open(path) as f:
+        for line in f:
+            for field in line.split()[1:]:
+                key, _, value = field.partition('=')
+                if key in totals and value.isdigit():
+                    totals[key] += int(value)
+    return totals
+
+# Read one sample from a cgroup directory as a flat dict
+def read_cgroup_sample(cgroup_path):
+    sample = {}
+    with open(os.path.join(cgroup_path, 'memory.current')) as f:
+        sample['memory_current'] = int(f.read())
+    for key, value in read_flat_keyed(os.path.join(cgroup_path, 'memory.stat')).items():
+        sample[f'memory_{key}'] = value
+    for key, value in read_flat_keyed(os.path.join(cgroup_path, 'cpu.stat')).items():
+        sample[f'cpu_{key}'] = value
+    io_stat_path = os.path.join(cgroup_path, 'io.stat')
+    if os.path.exists(io_stat_path):
+        for key, value in read_io_stat(io_stat_path).items():
+            sample[f'io_{key}'] = value
+    return sample
+
+class ResourceSampler:
+    """Sample a cgroup at a fixed interval in a background thread and write the time series to a CSV file."""
+
+    def __init__(self, cgroup_path, interval, output_path):
+        self.cgroup_path = cgroup_path
+        self.interval = interval
+        self.output_path = output_path
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='resource-sampler', daemon=True)
+        # (phase, elapsed, memory_current, cpu_cores) of every sample, used for the phase summary
+        self.history = []
+
+    def start(self):
+        logger.info(f"Sampling cgroup {self.cgroup_path} every {self.interval * 1000:.0f} ms to {self.output_path}")
+        self.thread.start()
+
+    def stop(self):
+        if self.thread.is_alive():
+            self.stop_event.set()
+            self.thread.join()
+
+    def _run(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.output_path)), exist_ok=True)
+        start_time = time.time()
+        previous = None
+        with open(self.output_path, 'w', newline='') as f:
+            writer = None
+            next_sample_time = time.monotonic()
+            while not self.stop_event.is_set():
+                now = time.time()
+                try:
+                    sample = read_cgroup_sample(self.cgroup_path)
+                except (OSError, ValueError):
+                    # The container has exited
+                    break
+
+                # CPU utilization in cores since the previous sample
+                cpu_cores = 0.0
+                if previous is not None and now > previous[0]:
+                    cpu_cores = (sample.get('cpu_usage_usec', 0) - previous[1].get('cpu_usage_usec', 0)) / 1e6 / (now - previous[0])
+                previous = (now, sample)
+
+                row = {'timestamp': now, 'elapsed': now - start_time, 'phase': current_phase, 'cpu_cores': cpu_cores}
+                row.update(sample)
+                if writer is None:
+                    writer = csv.DictWriter(f, fieldnames=list(row), extrasaction='ignore', restval='')
+                    writer.writeheader()
+                writer.writerow(row)
+                f.flush()
+                self.history.append((current_phase, row['elapsed'], sample['memory_current'], cpu_cores))
+
+                # Keep a fixed sampling rate regardless of how long the reads took
+                next_sample_time += self.interval
+                self.stop_event.wait(max(0, next_sample_time - time.monotonic()))
+
+    # Per-phase summary: duration, peak and final memory, mean and peak CPU cores
+    def summary(self):
+        phases = {}
+        for phase, elapsed, memory, cpu_cores in self.history:
+            stats = phases.setdefault(phase, {'start': elapsed, 'end': elapsed, 'samples': 0, 'peak_memory_bytes': 0,
+                                              'final_memory_bytes': 0, 'cpu_cores_total': 0.0, 'peak_cpu_cores': 0.0})
+            stats['end'] = elapsed
+            stats['samples'] += 1
+            stats['peak_memory_bytes'] = max(stats['peak_memory_bytes'], memory)
+            stats['final_memory_bytes'] = memory
+            stats['cpu_cores_total'] += cpu_cores
+            stats['peak_cpu_cores'] = max(stats['peak_cpu_cores'], cpu_cores)
+
+        for stats in phases.values():
+            stats['duration'] = stats.pop('end') - stats.pop('start')
+            stats['mean_cpu_cores'] = stats.pop('cpu_cores_total') / stats['samples']
+        return phases
+
+# Start a sampler for the container's cgroup. Returns None if the cgroup cannot be found.
+def start_container_sampler(container_pid, interval, output_path):
+    cgroup_path = cgroup_path_for_pid(container_pid)
+    if cgroup_path is None:
+        logger.warning("Could not find the cgroup v2 directory of the Qdrant container. Resource sampling is disabled.")
+        return None
+    sampler = ResourceSampler(cgroup_path, interval, output_path)
+    sampler.start()
+    return sampler
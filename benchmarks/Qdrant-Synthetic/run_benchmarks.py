@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+
+# Run a matrix of qdrant_benchmark.py configurations and collect the results.
+#
+# The matrix is the cross product of the load-side dimensions (vector size x
+# number of vectors), which need a freshly loaded collection, and the query-side
+# dimensions (hnsw_ef, rescore, oversampling), which only change the search
+# parameters. Configurations are grouped by their load-side values so each
+# collection is loaded once and every query-side variant is measured against it
+# before the container is torn down.
+#
+# Every configuration produces one result row (QPS, latency percentiles, recall,
+# memory footprint and the configuration itself) in a Parquet or CSV file. Rows
+# carry a config_id, so an interrupted matrix can be resumed: configurations
+# already in the results file are skipped.
+#
+# Any option that is not recognized here is passed to qdrant_benchmark.py, e.g.
+#   sudo python3 run_benchmarks.py --vector-sizes 384,768 --numvectors 1000000 --hnsw-ef 64,128 -- --cpus 8 --memory 32
+
+import argparse
+import atexit
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+
+import numa_placement
+import qdrant_benchmark
+import sweep
+
+logger = logging.getLogger(__name__)
+
+# Default matrix, matching the original run_benchmarks.sh
+DEFAULT_VECTOR_SIZES = [384, 768, 1024, 2048, 3072, 4096]
+DEFAULT_NUM_VECTORS = [1000000, 5000000, 10000000, 25000000, 50000000, 100000000]
+
+# Default results file
+DEFAULT_OUTPUT = "/var/tmp/qdrant_benchmark/results/benchmark_results.parquet"
+
+# Identify a configuration by its load-side values, query-side values and the
+# options passed through to qdrant_benchmark.py
+def config_id(load_config, variant, benchmark_argv):
+    # Unset load-side values are left out, so adding a dimension keeps the ids of existing results
+    load_config = {k: v for k, v in load_config.items() if v not in (None, [])}
+    config = {'load': load_config, 'variant': variant, 'benchmark_args': benchmark_argv}
+    return hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+# Build the list of (load config, [query variants]) groups to run, in order.
+# 'placements' is a list of (name, qdrant_benchmark arguments) pairs, see
+# numa_placement.placement_sweep(); a placement needs its own container and client
+# placement, so it is a load-side dimension.
+def build_plan(args, placements):
+    variants = [
+        {'hnsw_ef': hnsw_ef, 'rescore': rescore, 'oversampling': oversampling}
+        for hnsw_ef in args.hnsw_ef
+        for rescore in args.rescore
+        for oversampling in args.oversampling
+    ]
+    return [
+        ({'vector_size': vector_size, 'numvectors': numvectors, 'placement': name, 'placement_args': placement_args}, variants)
+        for vector_size in args.vector_sizes
+        for numvectors in args.numvectors
+        for name, placement_args in placements
+    ]
+
+# Return True if the results file is written as Parquet
+def is_parquet(path):
+    return path.endswith('.parquet')
+
+# Read all result rows from a Parquet or CSV results file. Returns an empty list if it does not exist.
+def read_results(path):
+    if not os.path.exists(path):
+        return []
+    if is_parquet(path):
+        import pandas as pd
+        return pd.read_parquet(path).to_dict('records')
+    return sweep.read_results_csv(path)
+
+# Append result rows to a Parquet or CSV results file
+def append_results(path, rows):
+    if not rows:
+        return
+    if not is_parquet(path):
+        sweep.append_results_csv(path, rows)
+        return
+
+    import pandas as pd
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    frame = pd.DataFrame(read_results(path) + rows)
+    # A Parquet column has a single type. Columns mixing types, e.g. numa_nodes
+    # given as 0 or "0,1", are stored as strings.
+    for column in frame.columns:
+        if frame[column].dropna().map(type).nunique() > 1:
+            frame[column] = frame[column].map(lambda v: v if v is None or v != v else str(v))
+    # Write to a temporary file first so an interrupted write does not lose earlier results
+    tmp_path = f"{path}.tmp"
+    frame.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    logger.info(f"Saved {len(rows)} result rows to {path}")
+
+# Check that the libraries needed for the results format are installed
+def check_output_format(path):
+    if not is_parquet(path):
+        return True
+    try:
+        import pandas  # noqa: F401
+        import pyarrow  # noqa: F401
+    except ImportError:
+        logger.error("Writing Parquet results requires pandas and pyarrow (pip install pandas pyarrow). "
+                     "Use an --output file ending in .csv to write CSV instead.")
+        return False
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a matrix of Qdrant benchmarks. Options not listed here are passed to qdrant_benchmark.py.")
+    parser.add_argument('--vector-sizes', type=sweep.int_list, default=DEFAULT_VECTOR_SIZES, help='Comma separated vector sizes')
+    parser.add_argument('--numvectors', type=sweep.int_list, default=DEFAULT_NUM_VECTORS, help='Comma separated numbers of vectors')
+    parser.add_argument('--hnsw-ef', type=sweep.int_list, default=[None], help='Comma separated search-time hnsw_ef values (default: server default)')
+    parser.add_argument('--rescore', type=sweep.bool_list, default=[None], help='Comma separated rescore settings for quantized collections (e.g. "true,false")')
+    parser.add_argument('--oversampling', type=sweep.float_list, default=[None], help='Comma separated oversampling factors for quantized collections (e.g. "1.0,2.0")')
+    parser.add_argument('--placement-sweep', action='store_true', help='Run every configuration in each client/server NUMA placement: client on the same or other socket, '
+                                                                       'server memory on DRAM, CXL or both')
+    parser.add_argument('--placement-server-node', type=int, default=0, help='Placement sweep: NUMA node whose CPUs and DRAM the server uses')
+    parser.add_argument('--placement-client-cores', type=int, default=2, help='Placement sweep: number of CPUs reserved for the client')
+    parser.add_argument('--output', type=str, default=DEFAULT_OUTPUT, help='Results file. Parquet if it ends in .parquet, otherwise CSV')
+    parser.add_argument('--no-resume', action='store_true', help='Run every configuration, even if it is already in the results file')
+    parser.add_argument('--dry-run', action='store_true', help='Only list the configurations that would be run')
+
+    args, benchmark_argv = parser.parse_known_args()
+    if benchmark_argv and benchmark_argv[0] == '--':
+        benchmark_argv = benchmark_argv[1:]
+
+    # Parse the pass-through options once to report errors before anything is run
+    benchmark_parser = qdrant_benchmark.build_parser()
+    try:
+        benchmark_args = benchmark_parser.parse_args(benchmark_argv)
+        qdrant_benchmark.validate_args(benchmark_args)
+    except ValueError as e:
+        logger.error(str(e))
+        sys.exit(1)
+    if qdrant_benchmark.sweep_mode(benchmark_args) is not None:
+        logger.error("The --sweep-* options of qdrant_benchmark.py cannot be used with run_benchmarks.py. Use --hnsw-ef, --rescore and --oversampling instead.")
+        sys.exit(1)
+    if benchmark_args.tenant_sizes:
+        logger.error("The multi-tenant mode of qdrant_benchmark.py cannot be used with run_benchmarks.py.")
+        sys.exit(1)
+
+    if not check_output_format(args.output):
+        sys.exit(1)
+
+    completed = set()
+    if not args.no_resume:
+        completed = {str(row.get('config_id')) for row in read_results(args.output)}
+
+    placements = [(None, [])]
+    if args.placement_sweep:
+        try:
+            placements = numa_placement.placement_sweep(args.placement_server_node, args.placement_client_cores)
+        except (OSError, ValueError) as e:
+            logger.error(f"Cannot build the placement sweep: {e}")
+            sys.exit(1)
+
+    # Work out which variants of each load group still have to run
+    groups = build_plan(args, placements)
+    plan = []
+    for load_config, variants in groups:
+        pending = [(config_id(load_config, v, benchmark_argv), v) for v in variants]
+        pending = [(cid, v) for cid, v in pending if cid not in completed]
+        if pending:
+            plan.append((load_config, pending))
+
+    total = sum(len(variants) for _, variants in groups)
+    remaining = sum(len(pending) for _, pending in plan)
+    logger.info(f"{total} configurations in {len(groups)} load groups, {total - remaining} already in {args.output}, {remaining} to run.")
+    for load_config, pending in plan:
+        placement = f" placement={load_config['placement']}" if load_config['placement'] else ""
+        logger.info(f"  vector_size={load_config['vector_size']} numvectors={load_config['numvectors']}{placement}: {len(pending)} query variants")
+    if args.dry_run or not plan:
+        return
+
+    qdrant_benchmark.check_root()
+    atexit.register(qdrant_benchmark.cleanup)
+
+    for load_config, pending in plan:
+        if qdrant_benchmark.interrupted:
+            break
+
+        start_time = time.strftime('%Y-%m-%d %H:%M:%S')
+        logger.info(f"[{start_time}] Starting benchmark for vector size: {load_config['vector_size']} and vectors: {load_config['numvectors']}")
+
+        run_args = benchmark_parser.parse_args(benchmark_argv + load_config['placement_args'] +
+                                               ['--vector-size', str(load_config['vector_size']), '--numvectors', str(load_config['numvectors'])])
+        try:
+            qdrant_benchmark.validate_args(run_args)
+            rows = qdrant_benchmark.run_benchmark(run_args, [v for _, v in pending])
+        except Exception as e:
+            # Leave the configurations out of the results so a resumed run retries them
+            logger.error(f"Benchmark for vector size {load_config['vector_size']} and {load_config['numvectors']} vectors failed: {e}")
+            continue
+
+        # run_benchmark() returns one row per variant, in order. Fewer rows mean it was interrupted.
+        finished = time.strftime('%Y-%m-%d %H:%M:%S')
+        for (cid, _), row in zip(pending, rows):
+            row['config_id'] = cid
+            row['placement'] = load_config['placement']
+            row['benchmark_args'] = ' '.join(benchmark_argv)
+            row['finished'] = finished
+        append_results(args.output, rows[:len(pending)])
+
+        end_time = time.strftime('%Y-%m-%d %H:%M:%S')
+        logger.info(f"[{end_time}] Completed benchmark for vector size: {load_config['vector_size']} and vectors: {load_config['numvectors']}")
+
+    logger.info(f"All benchmarks completed. Results saved to {args.output}.")
+
+if __name__ == "__main__":
+    main()
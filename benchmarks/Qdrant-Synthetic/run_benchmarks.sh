@@ -1,5 +1,9 @@
 #!/bin/bash
 
+# Run the Qdrant benchmark matrix. The matrix, result collection and resume
+# logic live in run_benchmarks.py, which calls qdrant_benchmark.py as a library.
+# Re-running this script skips the configurations already in the results file.
+
 # Define parameters for the benchmark runs
 VECTOR_SIZES=(384 768 1024 2048 3072 4096)
 NUM_VECTORS=(1000000 5000000 10000000 25000000 50000000 100000000)
@@ -9,53 +13,25 @@ LOG_DIR="/var/tmp/qdrant_benchmark/logs"
 CSV_DIR="/var/tmp/qdrant_benchmark/results"
 mkdir -p $LOG_DIR $CSV_DIR
 
-# CSV output files
-QPS_CSV="${CSV_DIR}/qps_results.csv"
-LATENCY_CSV="${CSV_DIR}/latency_results.csv"
-MEMORY_CSV="${CSV_DIR}/memory_results.csv"
-
-# Initialize CSV headers
-echo "Vector Size,1M,5M,10M,25M,50M,100M" > $QPS_CSV
-echo "Vector Size,1M,5M,10M,25M,50M,100M" > $LATENCY_CSV
-echo "Vector Size,1M,5M,10M,25M,50M,100M" > $MEMORY_CSV
-
-# Loop through each vector size and number of vectors
-for vector_size in "${VECTOR_SIZES[@]}"; do
-    QPS_ROW="$vector_size"
-    LATENCY_ROW="$vector_size"
-    MEMORY_ROW="$vector_size"
-    
-    for num_vectors in "${NUM_VECTORS[@]}"; do
-        TIMESTAMP=$(date +"%Y%m%d_%H%M%S")
-        LOG_FILE="${LOG_DIR}/benchmark_${vector_size}_${num_vectors}_${TIMESTAMP}.log"
-
-	# Display the start time of the test in the desired format
-        START_TIME=$(date +"%Y-%m-%d %H:%M:%S")
-	echo "[START_TIME] Starting benchmark for vector size: $vector_size and vectors: $num_vectors"
-
-        # Run the benchmark and save output to the log file
-        python3 ./qdrant_benchmark.py --vector-size $vector_size --initial-vectors $num_vectors > $LOG_FILE 2>&1
-        
-        # Extract the relevant information from the log file
-        QPS=$(grep -oP 'Average query time: \K[\d\.]+' $LOG_FILE)
-        LATENCY=$(grep -oP 'Final average query time: \K[\d\.]+' $LOG_FILE)
-        MEMORY_USAGE=$(grep -oP '"Memory": "\K[\d\.]+GiB' $LOG_FILE | tail -1)
-        
-        # Add extracted data to the corresponding rows
-        QPS_ROW="$QPS_ROW,$QPS"
-        LATENCY_ROW="$LATENCY_ROW,$LATENCY"
-        MEMORY_ROW="$MEMORY_ROW,$MEMORY_USAGE"
-        
-        # Display the end time of the test in the desired format
-        END_TIME=$(date +"%Y-%m-%d %H:%M:%S")
-	echo "[END_TIME] Completed benchmark for vector size: $vector_size and vectors: $num_vectors"
-    done
-    
-    # Append rows to the CSV files
-    echo "$QPS_ROW" >> $QPS_CSV
-    echo "$LATENCY_ROW" >> $LATENCY_CSV
-    echo "$MEMORY_ROW" >> $MEMORY_CSV
-done
-
-echo "All benchmarks completed. Results saved to $CSV_DIR."
+# Structured results, one row per configuration
+RESULTS_FILE="${CSV_DIR}/benchmark_results.parquet"
+
+TIMESTAMP=$(date +"%Y%m%d_%H%M%S")
+LOG_FILE="${LOG_DIR}/benchmark_matrix_${TIMESTAMP}.log"
+
+# Join an array with commas
+join_by_comma() {
+    local IFS=","
+    echo "$*"
+}
+
+# Any arguments given to this script are passed to run_benchmarks.py, and from
+# there to qdrant_benchmark.py, e.g. ./run_benchmarks.sh --cpus 8 --memory 32
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+python3 "${SCRIPT_DIR}/run_benchmarks.py" \
+    --vector-sizes "$(join_by_comma "${VECTOR_SIZES[@]}")" \
+    --numvectors "$(join_by_comma "${NUM_VECTORS[@]}")" \
+    --output "${RESULTS_FILE}" \
+    "$@" 2>&1 | tee "${LOG_FILE}"
 
+exit "${PIPESTATUS[0]}"
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+
+# Stand-in Qdrant server for the harness self-test of qdrant_benchmark.py.
+#
+# The self-test runs the harness's ingestion and query code paths against a
+# minimal HTTP server inside the benchmark process instead of a real Qdrant
+# container. The stand-in parses each request body and returns a canned response,
+# so the measured rates are the ceiling of the harness itself: the Python client,
+# JSON (de)serialization and the HTTP round trip. The server records the time it
+# spends on each request, which is subtracted from the client-observed latency to
+# get the client overhead per call.
+
+import json
+import logging
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Version reported by the stand-in server
+STANDIN_VERSION = "1.12.0"
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Answer the Qdrant REST calls made by the harness with canned responses."""
+
+    # Keep connections alive like the real server does
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    # Send a JSON response and record the time spent on the request. The call is
+    # recorded before any of the response is sent, so it is counted by the time
+    # the client has the response and can read the statistics.
+    def _send(self, status, response, start_time, route):
+        body = json.dumps(response).encode()
+        self.server.record(route, time.perf_counter() - start_time)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _respond(self, status, result, start_time, route):
+        self._send(status, {'result': result, 'status': 'ok', 'time': 0}, start_time, route)
+
+    def _not_found(self, start_time, route):
+        self._send(404, {'status': {'error': 'Not found: Collection does not exist!'}, 'time': 0}, start_time, route)
+
+    # Read and parse the JSON request body, as the real server has to
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length == 0:
+            return {}
+        return json.loads(self.rfile.read(length))
+
+    def _handle(self):
+        start_time = time.perf_counter()
+        path = self.path.split('?', 1)[0]
+        body = self._read_body()
+
+        if path == '/':
+            return self._send(200, {'title': 'qdrant stand-in', 'version': STANDIN_VERSION}, start_time, 'root')
+        match = re.fullmatch(r'/collections/([^/]+)(/.*)?', path)
+        if match is None:
+            return self._respond(200, True, start_time, 'other')
+
+        name, rest = match.group(1), match.group(2) or ''
+        if rest == '' and self.command == 'GET':
+            if name not in self.server.collections:
+                return self._not_found(start_time, 'get_collection')
+            return self._respond(200, self.server.collection_info(name), start_time, 'get_collection')
+        if rest == '' and self.command == 'PUT':
+            self.server.collections[name] = body
+            return self._respond(200, True, start_time, 'create_collection')
+        if rest == '' and self.command == 'DELETE':
+            self.server.collections.pop(name, None)
+            return self._respond(200, True, start_time, 'delete_collection')
+        if rest == '' and self.command == 'PATCH':
+            return self._respond(200, True, start_time, 'update_collection')
+        if rest == '/points' and self.command == 'PUT':
+            return self._respond(200, {'operation_id': 0, 'status': 'completed'}, start_time, 'upsert')
+        if rest == '/points/query' and self.command == 'POST':
+            hits = [{'id': i, 'version': 0, 'score': 1.0} for i in range(body.get('limit', 10))]
+            return self._respond(200, {'points': hits}, start_time, 'search')
+        return self._respond(200, True, start_time, 'other')
+
+    do_GET = do_PUT = do_POST = do_DELETE = do_PATCH = _handle
+
+class StandInServer(ThreadingHTTPServer):
+    """In-process HTTP server that mimics the Qdrant REST API used by the harness."""
+
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0):
+        super().__init__((host, port), StandInHandler)
+        self.collections = {}
+        self.lock = threading.Lock()
+        # route -> [calls, total server time in seconds]
+        self.stats = {}
+        self.thread = threading.Thread(target=self.serve_forever, name='standin-server', daemon=True)
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        self.thread.start()
+        logger.info(f"Stand-in Qdrant server listening on port {self.port}")
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    # Record the server time of one request
+    def record(self, route, duration):
+        with self.lock:
+            stats = self.stats.setdefault(route, [0, 0.0])
+            stats[0] += 1
+            stats[1] += duration
+
+    # Return and clear the recorded stats
+    def take_stats(self):
+        with self.lock:
+            stats, self.stats = self.stats, {}
+        return stats
+
+    # A green, empty collection built from the create request
+    def collection_info(self, name):
+        config = self.collections[name]
+        return {
+            'status': 'green',
+            'optimizer_status': 'ok',
+            'points_count': 0,
+            'indexed_vectors_count': 0,
+            'segments_count': 1,
+            'config': {
+                'params': {'vectors': config.get('vectors', {'size': 1, 'distance': 'Cosine'})},
+                'hnsw_config': {'m': 16, 'ef_construct': 100, 'full_scan_threshold': 10000},
+                'optimizer_config': {
+                    'deleted_threshold': 0.2, 'vacuum_min_vector_number': 1000, 'default_segment_number': 0,
+                    'flush_interval_sec': 5,
+                },
+                'wal_config': {'wal_capacity_mb': 32, 'wal_segments_ahead': 0},
+            },
+            'payload_schema': {},
+        }
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+
+# Collection snapshot cache for qdrant_benchmark.py.
+#
+# After a collection has been loaded and indexed, the harness can save a Qdrant
+# snapshot of it. The cache directory on the host is bind-mounted into the
+# container as the server's snapshots directory, so the server writes snapshots
+# straight into the cache and can recover them from a local file:// location
+# without uploading them over HTTP.
+#
+# Snapshots are keyed by the dataset, the collection config and the Qdrant
+# server version. A later run with the same key restores the collection instead
+# of ingesting and indexing the vectors again.
+
+import hashlib
+import json
+import logging
+import os
+import time
+
+import requests
+from qdrant_client.http import models
+
+logger = logging.getLogger(__name__)
+
+# Default location of the snapshot cache on the host
+DEFAULT_CACHE_DIR = "/var/tmp/qdrant_benchmark/snapshots"
+
+# Snapshots directory of the Qdrant server inside the container
+CONTAINER_SNAPSHOTS_PATH = "/qdrant/snapshots"
+
+# Return the Qdrant server version reported by the REST API root
+def get_server_version(host='localhost', port=6333):
+    response = requests.get(f"http://{host}:{port}/", timeout=30)
+    response.raise_for_status()
+    return response.json().get('version', 'unknown')
+
+# Build the cache key for a collection. 'params' is a dict describing the
+# dataset and collection config; the key is a hash of it plus the server version.
+def snapshot_key(params, server_version):
+    key_params = dict(params, server_version=server_version)
+    digest = hashlib.sha256(json.dumps(key_params, sort_keys=True, default=str).encode()).hexdigest()
+    return digest[:16], key_params
+
+# Host path of a cached snapshot, or None if it does not exist
+def find_snapshot(cache_dir, key):
+    path = os.path.join(cache_dir, f"{key}.snapshot")
+    if os.path.exists(path) and os.path.exists(os.path.join(cache_dir, f"{key}.json")):
+        return path
+    return None
+
+# Restore a collection from a cached snapshot. Returns the restore time in seconds.
+def restore_snapshot(client, collection_name, key):
+    location = f"file://{CONTAINER_SNAPSHOTS_PATH}/{key}.snapshot"
+    logger.info(f"Restoring collection '{collection_name}' from snapshot {location}...")
+    start_time = time.time()
+    client.recover_snapshot(
+        collection_name=collection_name,
+        location=location,
+        priority=models.SnapshotPriority.SNAPSHOT,
+        wait=True,
+    )
+    duration = time.time() - start_time
+    logger.info(f"Collection '{collection_name}' restored in {duration:.2f} seconds.")
+    return duration
+
+# Create a snapshot of a collection and store it in the cache under 'key'
+def save_snapshot(client, collection_name, cache_dir, key, key_params):
+    logger.info(f"Saving a snapshot of collection '{collection_name}' to the snapshot cache...")
+    start_time = time.time()
+    snapshot = client.create_snapshot(collection_name=collection_name, wait=True)
+
+    # The server writes the snapshot to <snapshots dir>/<collection>/<name>
+    server_path = os.path.join(cache_dir, collection_name, snapshot.name)
+    os.replace(server_path, os.path.join(cache_dir, f"{key}.snapshot"))
+    checksum_path = f"{server_path}.checksum"
+    if os.path.exists(checksum_path):
+        os.remove(checksum_path)
+
+    metadata = dict(key_params, snapshot_size=snapshot.size, created=time.strftime('%Y-%m-%d %H:%M:%S'))
+    with open(os.path.join(cache_dir, f"{key}.json"), 'w') as f:
+        json.dump(metadata, f, indent=2, default=str)
+    logger.info(f"Snapshot {key} ({snapshot.size} bytes) saved in {time.time() - start_time:.2f} seconds.")
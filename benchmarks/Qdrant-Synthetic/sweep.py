@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+
+# Helpers shared by the parameter sweep modes of qdrant_benchmark.py.
+#
+# A sweep produces one result row (a flat dict) per configuration. Rows are
+# appended to a CSV file so several invocations, e.g. one per storage placement,
+# can accumulate into the same file. The Pareto frontier is then recomputed over
+# the whole file, separately for each run configuration (dataset, resource limits,
+# placement, ...), so only rows that differ in the swept parameters are ranked
+# against each other.
+
+import argparse
+import csv
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Columns that identify where the collection data was placed. They are part of
+# the configuration columns that group the rows of the Pareto frontier.
+PLACEMENT_COLUMNS = ['on_disk', 'hnsw_on_disk', 'on_disk_payload', 'quantization_always_ram', 'numa_nodes', 'cpu_set',
+                     'client_cpus', 'client_mem_policy', 'client_mem_nodes']
+
+# Parse a comma separated list of integers, e.g. "8,16,32", for argparse
+def int_list(value):
+    try:
+        return [int(v) for v in value.split(',') if v.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid integer list: '{value}'")
+
+# Parse a comma separated list of floats, e.g. "1.0,2.0,4.0", for argparse
+def float_list(value):
+    try:
+        return [float(v) for v in value.split(',') if v.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid number list: '{value}'")
+
+# Parse a comma separated list of booleans, e.g. "true,false", for argparse
+def bool_list(value):
+    values = []
+    for v in value.split(','):
+        v = v.strip().lower()
+        if v in ('true', 'yes', 'on', '1'):
+            values.append(True)
+        elif v in ('false', 'no', 'off', '0'):
+            values.append(False)
+        elif v:
+            raise argparse.ArgumentTypeError(f"Invalid boolean '{v}' in list: '{value}'")
+    return values
+
+# Return an argparse type that parses a comma separated list restricted to 'choices'
+def choice_list(choices):
+    def parse(value):
+        values = [v.strip() for v in value.split(',') if v.strip()]
+        for v in values:
+            if v not in choices:
+                raise argparse.ArgumentTypeError(f"Invalid choice '{v}' (choose from {', '.join(choices)})")
+        return values
+    return parse
+
+# Describe the storage placement of a run from its parsed arguments
+def placement_from_args(args):
+    return {
+        'on_disk': args.on_disk,
+        'hnsw_on_disk': args.hnsw_on_disk,
+        'on_disk_payload': args.on_disk_payload,
+        'quantization_always_ram': args.quantization_always_ram,
+        'numa_nodes': args.numa_nodes,
+        'cpu_set': args.cpu_set,
+        'client_cpus': args.client_cpus,
+        'client_mem_policy': args.client_mem_policy,
+        'client_mem_nodes': args.client_mem_nodes,
+    }
+
+# Append result rows to a CSV file. The header is the union of the existing
+# columns and any new ones, so the file is rewritten if new columns appear.
+def append_results_csv(path, rows):
+    if not rows:
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    existing = read_results_csv(path)
+    columns = []
+    for row in existing + rows:
+        for column in row:
+            if column not in columns:
+                columns.append(column)
+
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(existing)
+        writer.writerows(rows)
+    logger.info(f"Saved {len(rows)} result rows to {path}")
+
+# Read all rows from a results CSV file. Returns an empty list if it does not exist.
+def read_results_csv(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, newline='') as f:
+        return list(csv.DictReader(f))
+
+# Return True if row 'a' dominates row 'b': at least as good on every objective
+# and strictly better on one.
+def dominates(a, b, maximize, minimize):
+    better_or_equal = (all(a[c] >= b[c] for c in maximize) and
+                       all(a[c] <= b[c] for c in minimize))
+    strictly_better = (any(a[c] > b[c] for c in maximize) or
+                       any(a[c] < b[c] for c in minimize))
+    return better_or_equal and strictly_better
+
+# Return the non-dominated rows. Objective values are converted to float so rows
+# read back from a CSV file can be compared; rows missing an objective are skipped.
+def pareto_frontier(rows, maximize=(), minimize=()):
+    candidates = []
+    for row in rows:
+        try:
+            values = {c: float(row[c]) for c in (*maximize, *minimize)}
+        except (KeyError, TypeError, ValueError):
+            continue
+        candidates.append((values, row))
+
+    return [row for values, row in candidates
+            if not any(dominates(other, values, maximize, minimize) for other, _ in candidates)]
+
+# Compute the Pareto frontier separately for each value of 'group_columns', e.g.
+# the run configuration columns without the swept parameters
+def pareto_frontier_by_config(rows, group_columns, maximize=(), minimize=()):
+    groups = {}
+    for row in rows:
+        key = tuple(str(row.get(c, '')) for c in group_columns)
+        groups.setdefault(key, []).append(row)
+
+    frontier = []
+    for group in groups.values():
+        frontier.extend(pareto_frontier(group, maximize, minimize))
+    return frontier
+
+# Append rows to 'path', then recompute the frontier over everything in the file,
+# grouped by 'group_columns', and write it to '<path stem>.pareto.csv'. Returns
+# the frontier rows.
+def save_sweep_results(path, rows, group_columns, maximize=(), minimize=()):
+    append_results_csv(path, rows)
+    all_rows = read_results_csv(path)
+    frontier = pareto_frontier_by_config(all_rows, group_columns, maximize, minimize)
+
+    frontier_path = f"{os.path.splitext(path)[0]}.pareto.csv"
+    if os.path.exists(frontier_path):
+        os.remove(frontier_path)
+    append_results_csv(frontier_path, frontier)
+    return frontier
+
+# Log a compact table of result rows
+def log_rows(title, rows, columns):
+    logger.info(title)
+    logger.info(" | ".join(f"{c:>14}" for c in columns))
+    for row in rows:
+        cells = []
+        for c in columns:
+            value = row.get(c, '')
+            try:
+                value = f"{float(value):.4f}" if '.' in str(value) else value
+            except ValueError:
+                pass
+            cells.append(f"{str(value):>14}")
+        logger.info(" | ".join(cells))
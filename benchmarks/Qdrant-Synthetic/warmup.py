@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+# Warm-up detection for the query phase of qdrant_benchmark.py.
+#
+# The first queries after loading run against cold CPU and page caches and
+# compete with optimizer work still pending on the server, so their latency is
+# not representative of the steady state. With --warmup, warm-up queries are run
+# back to back before each measurement and grouped into windows of a fixed number
+# of queries. The server is considered warm once the median latencies of the last
+# few windows agree, i.e. their coefficient of variation is at most a threshold.
+# Warm-up ends when that happens or when its query or time budget is used up, and
+# its latencies are reported separately from the measured (steady-state) queries.
+#
+# The warm-up queries are drawn from their own random stream (dataset kind
+# 'warmup'), so the measured queries have not been seen by the server before.
+
+import logging
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Median latency of each complete window of 'window' latencies
+def window_medians(latencies, window):
+    return [float(np.median(latencies[start:start + window])) for start in range(0, len(latencies) - window + 1, window)]
+
+# Coefficient of variation (stddev / mean) of the medians of the last 'windows'
+# complete windows, or None if there are not enough latencies yet
+def windowed_cv(latencies, window, windows):
+    complete = len(latencies) - len(latencies) % window
+    if complete < window * windows:
+        return None
+    medians = window_medians(latencies[complete - window * windows:complete], window)
+    average = float(np.mean(medians))
+    return float(np.std(medians)) / average if average > 0 else 0.0
+
+# Run warm-up queries until the latency is steady or the budget is used up.
+#
+# run_query(i, query_vector) sends the i-th warm-up query; 'queries' is cycled.
+# Returns a dict with the warm-up 'latencies', its 'elapsed' seconds, whether the
+# steady state was reached ('steady') and the last windowed CV ('cv').
+def run_warmup(run_query, queries, window=100, windows=3, max_cv=0.05, max_queries=10000, max_seconds=120,
+               should_stop=lambda: False):
+    logger.info(f"Warming up: windows of {window} queries until the CV of the last {windows} window medians is at most "
+                f"{max_cv:g} (at most {max_queries} queries or {max_seconds} seconds)...")
+    latencies = []
+    steady = False
+    cv = None
+    start_time = time.monotonic()
+    while len(latencies) < max_queries and time.monotonic() - start_time < max_seconds and not should_stop():
+        i = len(latencies)
+        query_start_time = time.perf_counter()
+        run_query(i, queries[i % len(queries)])
+        latencies.append(time.perf_counter() - query_start_time)
+
+        if len(latencies) % window == 0:
+            cv = windowed_cv(latencies, window, windows)
+            if cv is not None and cv <= max_cv:
+                steady = True
+                break
+    elapsed = time.monotonic() - start_time
+
+    if steady:
+        logger.info(f"Latency steady after {len(latencies)} warm-up queries ({elapsed:.1f} seconds, CV {cv:.3f}).")
+    else:
+        logger.warning(f"Latency not steady after {len(latencies)} warm-up queries ({elapsed:.1f} seconds"
+                       + (f", CV {cv:.3f}" if cv is not None else "") + "). Measuring anyway.")
+    return {'latencies': latencies, 'elapsed': elapsed, 'steady': steady, 'cv': cv}
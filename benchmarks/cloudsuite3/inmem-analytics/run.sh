@@ -3,6 +3,8 @@ if [[ -f ./setup_env.sh ]]; then
 	source ./setup_env.sh
 fi
 
+TOPOLOGY="$(dirname "$0")/../../../lib/topology.py"
+
 CPUSETS_CPU_NODE=""
 CPUSETS_CPU=""
 CPUSETS_MEM=""
@@ -50,7 +52,7 @@ while getopts "hpc:m:w:d:e:p:o:n:a:z:t:s:x:" opt; do
 		c)
 			if [[ $OPTARG =~ ^[0-9]+$ ]]; then
 				CPUSETS_CPU_NODE=$OPTARG
-				CPUSETS_CPU="--cpuset-cpus="$(lscpu -p=CPU,NODE | awk -F, '$2 == '$OPTARG' && $1 != "#" {print $1}' | paste -sd ",")
+				CPUSETS_CPU="--cpuset-cpus="$(python3 "${TOPOLOGY}" node-cpus $OPTARG)
 			else
 				echo "Error: -c option requires an integer argument."
 				exit 1
@@ -5,13 +5,16 @@ from io import StringIO
 import os
 import re
 import subprocess
+import sys
 import time
 
-import psutil
 import pandas as pd
 
 from graph_scripts.utils import dump_file_name
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "lib"))
+import topology
+
 ARRAY_SIZES: list[int] = [
     100_000_000,
     200_000_000,
@@ -25,15 +28,8 @@ WHITESPACE_REPLACE = re.compile(r"\s+")
 
 
 def core_count_per_socket() -> list[int]:
-    command = ["lscpu", "-p=SOCKET"]
-    output = subprocess.check_output(command).decode("utf-8")
-
-    # Some motherboards have 2 sockets, we need to account for that
-    # because we only want the core count of one socket
-    socket_count = len(set(x for x in output.split("\n")[4:] if len(x)))
-    total_core_count = psutil.cpu_count(logical=False)
-
-    cores = int(total_core_count / socket_count)
+    # Some motherboards have 2 sockets, we only want the core count of one socket
+    cores = topology.cores_per_socket(topology.load_topology())
 
     # 1, 2, 4, 6, ..., 32 (or whatever the core count might be)
     return [1, *[x * 2 for x in range(1, (cores // 2) + 1)]]
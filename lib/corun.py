@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+
+# Co-run (noisy neighbor) interference mode for the benchmarks.
+#
+# Every benchmark of the suite runs alone on an otherwise idle host, but in
+# production the memory bandwidth of a node, and of a CXL device in particular,
+# is shared with other tenants. This runs a foreground benchmark command (MLC
+# idle latency, Redis, TPC-C, Qdrant, ...) once without and then once with each
+# level of a controlled background memory bandwidth load, and records how much
+# the foreground degrades as a function of the background bandwidth.
+#
+# The background load is either MLC (loaded latency with bandwidth threads only,
+# -T) or STREAM (benchmarks/stream/stream_c.exe), with its memory on a chosen
+# NUMA node and its threads on chosen CPUs. Its levels are:
+#   --threads 1,2,4   the number of background CPUs, each at full speed
+#   --target-gbs 5,20 a target bandwidth in GB/s (MLC only): the MLC loaded
+#                     latency curve of all background CPUs is measured once and
+#                     the largest injection delay that reaches the target is used
+# The load runs in intervals of about --interval seconds, restarted until the
+# foreground exits. MLC runs for exactly the interval (-t). STREAM has no time
+# limit and allocates and initializes its arrays on every start, so its run
+# alone is timed with --stream-ntimes iterations (10 by default), and its
+# co-run intervals get as many iterations as fill --interval at that pace. The
+# restarts then leave short gaps without load, rather than one every few
+# seconds. The bandwidth of each level is measured alone (one interval, before
+# the co-run) and during the co-run (the mean of the completed intervals), so
+# the load is known even when the foreground slows the background down too.
+#
+# The foreground is any command, given after '--'. Its wall clock time is always
+# recorded. With --metric, a number parsed from its output is recorded instead
+# (a regular expression whose first group is the value, or a preset such as
+# mlc-idle-latency). The degradation of each run is relative to the mean of the
+# runs without background load: positive when the foreground is worse.
+#
+# Usage:
+#   <cxlbench>/lib/corun.py -o corun_results --background mlc --bg-node 2 \
+#       --threads 2,4,8,16 --metric mlc-idle-latency -- mlc --idle_latency -c0 -j2
+#   <cxlbench>/lib/corun.py -o corun_results --background stream --bg-node 2 \
+#       --threads 4,8 -- ./benchmarks/redis/run.sh -c 0 -m 2 ...
+
+import argparse
+import csv
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+import topology
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_STREAM = os.path.join(REPO_DIR, 'benchmarks', 'stream', 'stream_c.exe')
+# STREAM iterations of the timed run alone, and the most it accepts (uint16_t ntimes)
+STREAM_NTIMES = 10
+STREAM_MAX_NTIMES = 65535
+
+RESULTS_FILE = 'corun.csv'
+
+# Columns of corun.csv, one row per foreground run
+CORUN_COLUMNS = ['level', 'repeat', 'background', 'bg_node', 'bg_cpus', 'bg_threads', 'inject_delay', 'stream_ntimes', 'target_gbs',
+                 'alone_gbs', 'corun_gbs', 'fg_seconds', 'fg_exit', 'fg_metric', 'degradation']
+
+# Foreground metric presets: (regular expression, higher is better)
+METRIC_PRESETS = {
+    'mlc-idle-latency': (r'Each iteration took .*?\(\s*(\d+(?:\.\d+)?)\s*ns\)', False),
+    'stream-triad': (r'^Triad:\s+\S+\s+(\d+(?:\.\d+)?)', True),
+}
+
+# A result row of the MLC loaded latency table: "<delay> <latency ns> <bandwidth MB/s>"
+MLC_ROW_PATTERN = re.compile(r'^\s*(\d+)\s+(\d+(?:\.\d+)?)\s+(\d+(?:\.\d+)?)\s*$')
+# A Triad row of STREAM: "Triad: <direction> <best rate MB/s> <avg> <min> <max>"
+STREAM_TRIAD_PATTERN = re.compile(r'^Triad:\s+\S+\s+(\d+(?:\.\d+)?)', re.MULTILINE)
+
+
+# Parse the loaded latency table of MLC into (delay, latency ns, bandwidth MB/s) tuples
+def parse_mlc_curve(text):
+    rows = []
+    in_table = False
+    for line in text.splitlines():
+        if line.startswith('=========='):
+            in_table = True
+            continue
+        match = MLC_ROW_PATTERN.match(line)
+        if in_table and match:
+            rows.append((int(match.group(1)), float(match.group(2)), float(match.group(3))))
+    return rows
+
+
+# Bandwidth in MB/s of one background interval, or None if it did not complete
+def parse_bandwidth(background, text):
+    if background == 'mlc':
+        rows = parse_mlc_curve(text)
+        return rows[0][2] if rows else None
+    rates = [float(r) for r in STREAM_TRIAD_PATTERN.findall(text)]
+    return statistics.mean(rates) if rates else None
+
+
+# The largest injection delay of an MLC curve that reaches 'target' MB/s, i.e.
+# the lightest load with at least the target bandwidth. Falls back to the delay
+# with the highest bandwidth if the target is out of reach.
+def delay_for_target(curve, target):
+    reached = [point for point in curve if point[2] >= target]
+    if reached:
+        return max(reached, key=lambda p: p[0])
+    return max(curve, key=lambda p: p[2])
+
+
+# STREAM iterations that fill 'interval' seconds, from a run of 'ntimes' iterations
+# that took 'seconds'. The setup time of the run is counted as iteration time, so
+# an interval is at most 'interval' plus one setup.
+def stream_ntimes_for_interval(interval, seconds, ntimes):
+    return max(2, min(STREAM_MAX_NTIMES, int(interval * ntimes / seconds)))
+
+
+# A background memory bandwidth load on 'cpus', restarted every interval until stopped
+class BackgroundLoad:
+    def __init__(self, args, cpus, delay, name):
+        self.args = args
+        self.cpus = cpus
+        self.delay = delay
+        self.name = name
+        self.ntimes = args.stream_ntimes or STREAM_NTIMES
+        self.seconds = None
+        self.samples = []
+        self._process = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    # The load command. With 'curve', MLC measures its default list of injection
+    # delays instead of the delay of the load.
+    def command(self, curve=False):
+        args = self.args
+        cpu_list = topology.format_list(self.cpus)
+        if args.background == 'mlc':
+            spec = os.path.join(args.output, 'inputs', f'{self.name}.input')
+            with open(spec, 'w') as f:
+                f.write(f'{cpu_list} {args.traffic} seq {args.buffer_size} dram {args.bg_node}\n')
+            delay = [] if curve else [f'-d{self.delay}']
+            return [args.mlc, '--loaded_latency', *delay, f'-t{args.interval}', f'-o{spec}', '-T']
+        return [args.numactl, f'--physcpubind={cpu_list}', args.stream, '--ntimes', str(self.ntimes),
+                '--numa-nodes', str(args.bg_node), '--array-size', args.stream_array_size]
+
+    def environment(self):
+        return dict(os.environ, OMP_NUM_THREADS=str(len(self.cpus)))
+
+    # Run the load once, in the foreground, and return its output
+    def run_once(self, curve=False):
+        cmd = self.command(curve)
+        print(f"=== {self.name}: {' '.join(cmd)}", flush=True)
+        start = time.monotonic()
+        process = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                                 env=self.environment())
+        self.seconds = time.monotonic() - start
+        self.log(process.stdout)
+        if process.returncode != 0:
+            print(f'ERROR: the {self.args.background} background load failed with exit code {process.returncode}')
+            return None
+        return process.stdout
+
+    def log(self, text):
+        with open(os.path.join(self.args.output, 'background', f'{self.name}.txt'), 'a') as f:
+            f.write(text)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._process is not None and self._process.poll() is None:
+            self._process.terminate()
+        self._thread.join()
+
+    def _run(self):
+        cmd = self.command()
+        while not self._stop.is_set():
+            self._process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                                             env=self.environment())
+            output, _ = self._process.communicate()
+            self.log(output)
+            # An interval cut short by stop() reports no (or a partial) bandwidth
+            if self._stop.is_set():
+                break
+            if self._process.returncode != 0:
+                print(f'ERROR: the {self.args.background} background load failed with exit code {self._process.returncode}')
+                break
+            bandwidth = parse_bandwidth(self.args.background, output)
+            if bandwidth is not None:
+                self.samples.append(bandwidth)
+
+    def bandwidth(self):
+        return statistics.mean(self.samples) if self.samples else None
+
+
+# Run the foreground command once, saving its output. Returns (seconds, exit code, metric).
+def run_foreground(args, name):
+    print(f"=== {name}: {' '.join(args.command)}", flush=True)
+    start = time.monotonic()
+    process = subprocess.run(args.command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    seconds = time.monotonic() - start
+    with open(os.path.join(args.output, 'foreground', f'{name}.txt'), 'w') as f:
+        f.write(process.stdout)
+    if process.returncode != 0:
+        print(f'Warning: the foreground exited with code {process.returncode}')
+    metric = None
+    if args.metric:
+        match = re.search(args.metric, process.stdout, re.MULTILINE)
+        if match:
+            metric = float(match.group(1))
+        else:
+            print(f'Warning: the metric was not found in the output of {name}')
+    return seconds, process.returncode, metric
+
+
+# Relative degradation of a foreground value from the baseline: positive when worse
+def degradation(value, baseline, higher_is_better):
+    if value is None or not baseline:
+        return None
+    return 1 - value / baseline if higher_is_better else value / baseline - 1
+
+
+# Background levels: one without load, then one per thread count or target bandwidth
+def build_levels(args):
+    levels = [{'level': 'none', 'cpus': [], 'delay': None, 'target_gbs': None}]
+    for threads in args.threads or []:
+        levels.append({'level': f'threads_{threads}', 'cpus': args.bg_cpus[:threads], 'delay': 0, 'target_gbs': None})
+    for target in args.target_gbs or []:
+        levels.append({'level': f'target_{target:g}gbs', 'cpus': args.bg_cpus, 'delay': None, 'target_gbs': target})
+    return levels
+
+
+# Pick the MLC injection delay of each target bandwidth level from the loaded
+# latency curve of all background CPUs
+def calibrate_targets(args, levels):
+    targets = [level for level in levels if level['target_gbs'] is not None]
+    if not targets:
+        return
+    output = BackgroundLoad(args, args.bg_cpus, None, 'calibration').run_once(curve=True)
+    curve = parse_mlc_curve(output or '')
+    if not curve:
+        print('Error: no MLC loaded latency curve to calibrate the target bandwidths')
+        sys.exit(1)
+    for level in targets:
+        delay, _, bandwidth = delay_for_target(curve, level['target_gbs'] * 1000)
+        if bandwidth < level['target_gbs'] * 1000:
+            print(f"Warning: {level['target_gbs']:g} GB/s is out of reach, using the peak of {bandwidth / 1000:.1f} GB/s")
+        level['delay'] = delay
+        print(f"{level['level']}: injection delay {delay} ({bandwidth / 1000:.1f} GB/s)")
+
+
+def run_level(args, level):
+    load = None
+    alone = None
+    if level['cpus']:
+        load = BackgroundLoad(args, level['cpus'], level['delay'], level['level'])
+        output = load.run_once()
+        alone = parse_bandwidth(args.background, output) if output else None
+        if args.background == 'stream' and args.stream_ntimes is None and output:
+            load.ntimes = stream_ntimes_for_interval(args.interval, load.seconds, load.ntimes)
+            print(f"{level['level']}: {load.ntimes} STREAM iterations per {args.interval} s interval")
+        load.start()
+        time.sleep(args.settle)
+    rows = []
+    try:
+        for repeat in range(args.repeat):
+            seconds, exit_code, metric = run_foreground(args, f"{level['level']}.{repeat}")
+            rows.append({
+                'level': level['level'],
+                'repeat': repeat,
+                'background': args.background if load else None,
+                'bg_node': args.bg_node if load else None,
+                'bg_cpus': topology.format_list(level['cpus']) if load else None,
+                'bg_threads': len(level['cpus']),
+                'inject_delay': level['delay'] if args.background == 'mlc' else None,
+                'stream_ntimes': load.ntimes if load and args.background == 'stream' else None,
+                'target_gbs': level['target_gbs'],
+                'alone_gbs': alone / 1000 if alone else None,
+                'fg_seconds': seconds,
+                'fg_exit': exit_code,
+                'fg_metric': metric,
+            })
+    finally:
+        if load:
+            load.stop()
+    corun = load.bandwidth() if load else None
+    for row in rows:
+        row['corun_gbs'] = corun / 1000 if corun else None
+    return rows
+
+
+def write_csv(path, columns, rows):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f'Wrote {len(rows)} rows to {path}')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run a foreground benchmark without and with levels of background memory bandwidth load and record its degradation",
+                                     usage='%(prog)s [options] -- command [arguments]')
+    parser.add_argument('-o', '--output', required=True, help='output directory')
+    parser.add_argument('--background', choices=['mlc', 'stream'], default='mlc', help='background load generator (default: %(default)s)')
+    parser.add_argument('--bg-node', type=int, help='NUMA node of the background memory (default: the CXL node, else the first DRAM node)')
+    parser.add_argument('--bg-cpus', type=topology.parse_list, help='CPUs of the background threads, in the order they are used (default: one thread per core of the first socket, from its last core down)')
+    parser.add_argument('--threads', type=topology.parse_list, help='background thread counts, e.g. 1,2,4,8')
+    parser.add_argument('--target-gbs', type=lambda v: [float(x) for x in v.split(',')], help='target background bandwidths in GB/s, e.g. 5,10,20 (mlc only)')
+    parser.add_argument('--traffic', default='R', help='MLC traffic type of the background, e.g. R, W2, W5 (default: %(default)s)')
+    parser.add_argument('--buffer-size', type=int, default=200000, help='MLC buffer size per thread in KiB (default: %(default)s)')
+    parser.add_argument('--interval', type=int, default=10, help='seconds of each background interval; the load is restarted until the foreground exits. MLC runs for exactly this long; STREAM runs the iterations that take about this long alone (default: %(default)s)')
+    parser.add_argument('--settle', type=float, default=5, help='seconds between starting the background and the foreground (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=1, help='foreground runs per level (default: %(default)s)')
+    parser.add_argument('--metric', help=f'regular expression of the foreground metric (first group), or a preset: {", ".join(METRIC_PRESETS)} (default: the wall clock time)')
+    parser.add_argument('--higher-is-better', action=argparse.BooleanOptionalAction, help='direction of a --metric regular expression (default: lower is better, or the direction of the preset)')
+    parser.add_argument('-m', '--mlc', default=shutil.which('mlc'), help='path to the MLC executable')
+    parser.add_argument('--stream', default=DEFAULT_STREAM, help='path to the STREAM executable (default: %(default)s)')
+    parser.add_argument('--stream-array-size', default='100M', help='STREAM array size in elements (default: %(default)s)')
+    parser.add_argument('--stream-ntimes', type=int, help=f'STREAM iterations per background interval, instead of deriving them from --interval (default: {STREAM_NTIMES} in the timed run alone)')
+    parser.add_argument('--numactl', default=shutil.which('numactl'), help='path to numactl (STREAM CPU binding)')
+    parser.add_argument('command', nargs=argparse.REMAINDER, help='foreground command, after --')
+    args = parser.parse_args(argv)
+
+    if args.command[:1] == ['--']:
+        args.command = args.command[1:]
+    if not args.command:
+        parser.error("a foreground command is required after --")
+    if not args.threads and not args.target_gbs:
+        parser.error("at least one of --threads and --target-gbs is required")
+    if args.target_gbs and args.background != 'mlc':
+        parser.error("--target-gbs requires --background mlc")
+    if args.background == 'mlc' and (not args.mlc or not os.access(args.mlc, os.X_OK)):
+        parser.error("mlc command not found. Use -m to specify the path")
+    if args.background == 'stream' and not os.access(args.stream, os.X_OK):
+        parser.error(f"{args.stream} not found. Build it with 'make' in benchmarks/stream or use --stream")
+    if args.background == 'stream' and not args.numactl:
+        parser.error("numactl not found. Use --numactl to specify the path")
+    if args.stream_ntimes is not None and not 2 <= args.stream_ntimes <= STREAM_MAX_NTIMES:
+        parser.error(f"--stream-ntimes must be between 2 and {STREAM_MAX_NTIMES}")
+
+    if args.metric in METRIC_PRESETS:
+        args.metric, higher_is_better = METRIC_PRESETS[args.metric]
+        if args.higher_is_better is None:
+            args.higher_is_better = higher_is_better
+    args.higher_is_better = bool(args.higher_is_better)
+    topo = topology.load_topology()
+    if args.bg_node is None:
+        dram_node, cxl_node = topology.pick_nodes(topo)
+        args.bg_node = cxl_node if cxl_node is not None else dram_node
+        print(f'Using background memory node {args.bg_node}')
+    if args.bg_cpus is None:
+        args.bg_cpus = list(reversed(topology.one_thread_per_core(topo, topology.socket_cpus(topo))))
+    if max(args.threads or [0]) > len(args.bg_cpus):
+        parser.error(f"--threads is more than the {len(args.bg_cpus)} background CPUs")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    for directory in ('inputs', 'background', 'foreground'):
+        os.makedirs(os.path.join(args.output, directory), exist_ok=True)
+
+    levels = build_levels(args)
+    calibrate_targets(args, levels)
+    rows = []
+    for level in levels:
+        rows += run_level(args, level)
+
+    column = 'fg_metric' if args.metric else 'fg_seconds'
+    higher_is_better = args.higher_is_better if args.metric else False
+    baseline = [row[column] for row in rows if row['level'] == 'none' and row[column] is not None]
+    baseline = statistics.mean(baseline) if baseline else None
+    for row in rows:
+        row['degradation'] = degradation(row[column], baseline, higher_is_better)
+    write_csv(os.path.join(args.output, RESULTS_FILE), CORUN_COLUMNS, rows)
+
+    for level in levels:
+        level_rows = [row for row in rows if row['level'] == level['level']]
+        values = [row[column] for row in level_rows if row[column] is not None]
+        changes = [row['degradation'] for row in level_rows if row['degradation'] is not None]
+        load = level_rows[0]['corun_gbs'] or level_rows[0]['alone_gbs']
+        print(f"{level['level']}: background {f'{load:.1f} GB/s' if load else '-'}, "
+              f"{column} {f'{statistics.mean(values):.2f}' if values else '-'}"
+              f"{f', degradation {statistics.mean(changes):+.1%}' if changes else ''}")
+
+
+if __name__ == "__main__":
+    main()
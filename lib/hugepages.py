@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+
+# Reserve and restore huge pages per NUMA node and page size, for the benchmark scripts.
+#
+# /proc/sys/vm/nr_hugepages only sets the number of default size (2 MiB) pages,
+# spread over the nodes by the kernel. A latency test of a CXL node needs its
+# huge pages on that node, so the pages are reserved through
+#   /sys/devices/system/node/node<N>/hugepages/hugepages-<size>kB/nr_hugepages
+# for each node and page size (2 MiB, 1 GiB). The kernel allocates what it can
+# and the count read back is the reservation. When memory is fragmented, the
+# kernel can find fewer free contiguous ranges than requested, especially for
+# 1 GiB pages. The node is then compacted (node<N>/compact, or
+# /proc/sys/vm/compact_memory) and the reservation retried. A reservation only
+# raises the count of a node; a node with enough pages is left as it is. The
+# original counts are restored afterwards, also when the benchmark fails.
+#
+# Usage from Python:
+#   sys.path.insert(0, '<cxlbench>/lib')
+#   import hugepages
+#   with hugepages.HugePageReservation({0: 1000, 2: 1000}, '2M'):
+#       ...  # run the benchmark
+#
+# Usage from the shell, e.g. around a benchmark that is not written in Python:
+#   <cxlbench>/lib/hugepages.py show
+#   <cxlbench>/lib/hugepages.py reserve -n 0,2 -c 1000 -s 2M --save hugepages.json
+#   <cxlbench>/lib/hugepages.py restore hugepages.json
+
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+
+import topology
+
+SYSFS = '/sys'
+PROC = '/proc'
+
+# Huge page sizes in kB by name
+PAGE_SIZES = {
+    '2M': 2048,
+    '1G': 1048576,
+}
+
+
+class HugePageError(RuntimeError):
+    pass
+
+
+# Page size in kB from a name such as 2M, 1G or 2048kB
+def parse_size(value):
+    value = str(value).strip()
+    if value.upper() in PAGE_SIZES:
+        return PAGE_SIZES[value.upper()]
+    match = re.match(r'^(\d+)\s*(?:kB)?$', value, re.IGNORECASE)
+    if match is None:
+        raise ValueError(f'unknown huge page size {value}. Use {", ".join(PAGE_SIZES)} or <N>kB')
+    return int(match.group(1))
+
+
+# Page size name from kB, e.g. 2048 -> 2M
+def format_size(size_kb):
+    for name, kb in PAGE_SIZES.items():
+        if kb == size_kb:
+            return name
+    return f'{size_kb}kB'
+
+
+# Huge page sizes in kB supported by the kernel
+def page_sizes(sysfs=SYSFS):
+    sizes = []
+    for path in glob.glob(os.path.join(sysfs, 'kernel', 'mm', 'hugepages', 'hugepages-*kB')):
+        sizes.append(int(re.search(r'hugepages-(\d+)kB$', path).group(1)))
+    return sorted(sizes)
+
+
+# NUMA nodes with memory, including the CPU-less nodes of CXL memory
+def memory_nodes(sysfs=SYSFS):
+    directory = os.path.join(sysfs, 'devices', 'system', 'node')
+    return topology.parse_list(topology.read_file(os.path.join(directory, 'has_memory'))
+                               or topology.read_file(os.path.join(directory, 'online'), ''))
+
+
+def pages_dir(sysfs, node, size_kb):
+    return os.path.join(topology.node_dir(sysfs, node), 'hugepages', f'hugepages-{size_kb}kB')
+
+
+# Huge page counts of a node and page size: {'nr': ..., 'free': ..., 'surplus': ...}
+def node_pages(node, size_kb, sysfs=SYSFS):
+    directory = pages_dir(sysfs, node, size_kb)
+    counts = {}
+    for name in ('nr', 'free', 'surplus'):
+        value = topology.read_file(os.path.join(directory, f'{name}_hugepages'))
+        if value is None:
+            raise HugePageError(f'no {format_size(size_kb)} huge pages on node {node} ({directory})')
+        counts[name] = int(value)
+    return counts
+
+
+# Set the number of huge pages of a node and return the number the kernel allocated
+def set_node_pages(node, size_kb, count, sysfs=SYSFS):
+    path = os.path.join(pages_dir(sysfs, node, size_kb), 'nr_hugepages')
+    try:
+        with open(path, 'w') as f:
+            f.write(f'{count}\n')
+    except OSError as e:
+        raise HugePageError(f'cannot set {path}: {e}') from e
+    return node_pages(node, size_kb, sysfs)['nr']
+
+
+# Compact the memory of a node so the kernel can find contiguous free ranges.
+# Falls back to compacting every node if the kernel has no per-node compaction.
+def compact(node, sysfs=SYSFS, proc=PROC):
+    for path in (os.path.join(topology.node_dir(sysfs, node), 'compact'), os.path.join(proc, 'sys', 'vm', 'compact_memory')):
+        if os.path.exists(path):
+            try:
+                with open(path, 'w') as f:
+                    f.write('1\n')
+                return True
+            except OSError:
+                continue
+    return False
+
+
+# Raise the huge pages of a node to at least 'count', compacting the node and
+# retrying up to 'retries' times while the kernel allocates fewer. Returns the
+# number of pages of the node.
+def reserve_node(node, size_kb, count, retries=3, sysfs=SYSFS, proc=PROC):
+    reserved = node_pages(node, size_kb, sysfs)['nr']
+    attempt = 0
+    while reserved < count:
+        reserved = set_node_pages(node, size_kb, count, sysfs)
+        if reserved >= count or attempt >= retries:
+            break
+        attempt += 1
+        print(f'Reserved {reserved} of {count} {format_size(size_kb)} huge pages on node {node}, '
+              f'compacting the memory and retrying ({attempt}/{retries})')
+        if not compact(node, sysfs, proc):
+            print('Warning: cannot compact the memory')
+        time.sleep(attempt)
+    return reserved
+
+
+# Huge page reservation of several nodes, restored to the original counts on exit.
+# 'pages' is {node: count}. With 'strict', a reservation that falls short after
+# the retries is restored and raises HugePageError; otherwise it only warns.
+class HugePageReservation:
+    def __init__(self, pages, size='2M', retries=3, strict=True, sysfs=SYSFS, proc=PROC):
+        self.pages = pages
+        self.size_kb = parse_size(size)
+        self.retries = retries
+        self.strict = strict
+        self.sysfs = sysfs
+        self.proc = proc
+        self.original = {}
+        self.reserved = {}
+
+    def reserve(self):
+        # A node that fails must not leave the pages of the nodes before it reserved
+        try:
+            for node, count in sorted(self.pages.items()):
+                self.original[node] = node_pages(node, self.size_kb, self.sysfs)['nr']
+                self.reserved[node] = reserve_node(node, self.size_kb, count, self.retries, self.sysfs, self.proc)
+                print(f'Node {node}: {self.reserved[node]} {format_size(self.size_kb)} huge pages '
+                      f'(requested {count}, was {self.original[node]})')
+        except HugePageError:
+            try:
+                self.restore()
+            except HugePageError as e:
+                print(f'Warning: {e}')
+            raise
+        short = {node: count for node, count in self.pages.items() if self.reserved[node] < count}
+        if short:
+            message = ', '.join(f'node {node}: {self.reserved[node]} of {count}' for node, count in sorted(short.items()))
+            if self.strict:
+                self.restore()
+                raise HugePageError(f'could not reserve the {format_size(self.size_kb)} huge pages ({message})')
+            print(f'Warning: could not reserve the {format_size(self.size_kb)} huge pages ({message})')
+        return self
+
+    # Restore the original huge page counts. Pages still in use by a process are
+    # freed by the kernel when the process exits. Every node is restored even if
+    # one fails; the failures raise HugePageError at the end.
+    def restore(self):
+        failures = []
+        for node, count in sorted(self.original.items()):
+            try:
+                restored = set_node_pages(node, self.size_kb, count, self.sysfs)
+            except HugePageError as e:
+                failures.append(f'node {node}: {e}')
+                continue
+            if restored != count:
+                print(f'Warning: node {node} has {restored} {format_size(self.size_kb)} huge pages, not the original {count}')
+        self.original = {}
+        if failures:
+            raise HugePageError(f"could not restore the {format_size(self.size_kb)} huge pages ({'; '.join(failures)})")
+
+    # State saved by the shell usage between 'reserve' and 'restore'
+    def state(self):
+        return {'size_kb': self.size_kb, 'original': self.original, 'reserved': self.reserved}
+
+    @classmethod
+    def from_state(cls, state, sysfs=SYSFS, proc=PROC):
+        reservation = cls({}, f"{state['size_kb']}kB", sysfs=sysfs, proc=proc)
+        reservation.original = {int(node): count for node, count in state['original'].items()}
+        reservation.reserved = {int(node): count for node, count in state['reserved'].items()}
+        return reservation
+
+    def __enter__(self):
+        return self.reserve()
+
+    def __exit__(self, *exc):
+        self.restore()
+        return False
+
+
+def print_pages(sysfs=SYSFS):
+    nodes = memory_nodes(sysfs)
+    print(f"{'Node':>4} | {'Size':>4} | {'Total':>8} | {'Free':>8} | {'Surplus':>8} | {'MiB':>10}")
+    for node in nodes:
+        for size_kb in page_sizes(sysfs):
+            try:
+                counts = node_pages(node, size_kb, sysfs)
+            except HugePageError:
+                continue
+            print(f"{node:>4} | {format_size(size_kb):>4} | {counts['nr']:>8} | {counts['free']:>8} | "
+                  f"{counts['surplus']:>8} | {counts['nr'] * size_kb // 1024:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show, reserve and restore the huge pages of each NUMA node")
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.add_parser('show', help='print the huge pages of each node and page size (default)')
+    reserve = subparsers.add_parser('reserve', help='raise the huge pages of nodes to at least a count')
+    reserve.add_argument('-n', '--nodes', type=topology.parse_list, help='NUMA nodes, e.g. 0,2 (default: every node with memory)')
+    reserve.add_argument('-c', '--count', type=int, required=True, help='huge pages per node')
+    reserve.add_argument('--min-total', type=int, default=0, help='raise the count per node so all the nodes have at least this many pages in total')
+    reserve.add_argument('-s', '--size', default='2M', help='page size: 2M, 1G or <N>kB (default: %(default)s)')
+    reserve.add_argument('-r', '--retries', type=int, default=3, help='compactions and retries while the kernel allocates fewer pages (default: %(default)s)')
+    reserve.add_argument('--save', help='save the original counts to this JSON file, for restore')
+    reserve.add_argument('--no-strict', action='store_true', help='keep a reservation that falls short instead of restoring it and failing')
+    restore = subparsers.add_parser('restore', help='restore the counts saved by reserve --save')
+    restore.add_argument('state', help='JSON file of reserve --save')
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'reserve':
+            nodes = args.nodes or memory_nodes()
+            count = max(args.count, -(-args.min_total // len(nodes)))
+            reservation = HugePageReservation({node: count for node in nodes}, args.size, args.retries,
+                                              strict=not args.no_strict).reserve()
+            if args.save:
+                with open(args.save, 'w') as f:
+                    json.dump(reservation.state(), f, indent=2)
+        elif args.command == 'restore':
+            with open(args.state) as f:
+                HugePageReservation.from_state(json.load(f)).restore()
+            os.remove(args.state)
+        else:
+            print_pages()
+    except (HugePageError, ValueError) as e:
+        print(f'Error: {e}', file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+
+# CPU and memory topology of the host from sysfs, for the benchmark scripts and tools.
+#
+# Reads every online CPU from /sys/devices/system/cpu: its socket (physical
+# package), its core (the CPUs of a core are its SMT siblings, identified by
+# the first sibling) and its NUMA node. The sockets, cores per socket, threads
+# per core and CPU lists of each node are derived from it, so every script
+# gets the same answers as lscpu without parsing its output.
+#
+# Reads every NUMA node from /sys/devices/system/node: its CPUs, memory size
+# (meminfo), the NUMA distances, and the access attributes the kernel builds
+# from the firmware's HMAT (nodeN/access0 and access1/initiators: read/write
+# latency in ns and bandwidth in MiB/s from the nearest initiator nodes). The
+# CXL memory devices and regions are read from /sys/bus/cxl/devices, and each
+# region is mapped to the NUMA node(s) of its memory blocks or DAX devices. A
+# node is 'dram' if it has CPUs, 'cxl' if a CXL region maps to it, and
+# 'cpuless' otherwise (e.g. CXL memory without the cxl driver, or PMem).
+#
+# The topology is cached as JSON. The cache is reused while the boot, the online
+# CPUs and nodes, and the memory size of each node are unchanged, so hot-plugging
+# CPUs or onlining memory invalidates it. The free memory of a node changes all
+# the time, so it is not cached; show reads it from sysfs when printing.
+#
+# Usage from Python:
+#   sys.path.insert(0, '<cxlbench>/lib')
+#   import topology
+#   topo = topology.load_topology()
+#   dram_node, cxl_node = topology.pick_nodes(topo)
+#   cores = topology.cores_per_socket(topo)
+#
+# Usage from the shell:
+#   <cxlbench>/lib/topology.py show              # node, CXL device and region tables
+#   <cxlbench>/lib/topology.py json              # the topology as JSON
+#   <cxlbench>/lib/topology.py pick cxl          # the default CXL node ID
+#   <cxlbench>/lib/topology.py cores-per-socket  # see --help for the other queries
+#   <cxlbench>/lib/topology.py node-cpus 0 --one-per-core
+
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+
+SYSFS = '/sys'
+CACHE_VERSION = 3
+DEFAULT_CACHE = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'cxlbench', 'topology.json')
+
+ACCESS_ATTRIBUTES = ['read_latency', 'write_latency', 'read_bandwidth', 'write_bandwidth']
+
+
+def read_file(path, default=None):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return default
+
+
+# Parse a list such as "0-3,8" into a list of ints
+def parse_list(value):
+    items = []
+    for part in (value or '').split(','):
+        part = part.strip()
+        if '-' in part:
+            start, end = part.split('-', 1)
+            items.extend(range(int(start), int(end) + 1))
+        elif part:
+            items.append(int(part))
+    return items
+
+
+# Format a list of ints as a compact list such as "0-3,8"
+def format_list(items):
+    ranges = []
+    for item in sorted(set(items)):
+        if ranges and item == ranges[-1][1] + 1:
+            ranges[-1][1] = item
+        else:
+            ranges.append([item, item])
+    return ','.join(str(a) if a == b else f'{a}-{b}' for a, b in ranges)
+
+
+# Format a size in bytes in GiB
+def format_size(size):
+    return f'{size / 2**30:.1f} GiB'
+
+
+def node_dir(sysfs, node):
+    return os.path.join(sysfs, 'devices', 'system', 'node', f'node{node}')
+
+
+# Meminfo of a node in kB: {'MemTotal': ..., 'MemFree': ...}
+def node_meminfo(sysfs, node):
+    meminfo = {}
+    for line in (read_file(os.path.join(node_dir(sysfs, node), 'meminfo'), '')).splitlines():
+        match = re.match(r'^Node \d+ (\S+):\s+(\d+)', line)
+        if match:
+            meminfo[match.group(1)] = int(match.group(2))
+    return meminfo
+
+
+# HMAT access attributes of a node: {'access0': {'initiators': [...], 'read_latency': ns, ...}}
+def node_access(sysfs, node):
+    access = {}
+    for path in sorted(glob.glob(os.path.join(node_dir(sysfs, node), 'access*'))):
+        initiators_dir = os.path.join(path, 'initiators')
+        if not os.path.isdir(initiators_dir):
+            continue
+        attributes = {'initiators': sorted(int(name[len('node'):]) for name in os.listdir(initiators_dir)
+                                           if re.match(r'^node\d+$', name))}
+        for attribute in ACCESS_ATTRIBUTES:
+            value = read_file(os.path.join(initiators_dir, attribute))
+            if value is not None:
+                attributes[attribute] = int(value)
+        access[os.path.basename(path)] = attributes
+    return access
+
+
+def read_nodes(sysfs):
+    online = parse_list(read_file(os.path.join(sysfs, 'devices', 'system', 'node', 'online'), ''))
+    nodes = {}
+    for node in online:
+        meminfo = node_meminfo(sysfs, node)
+        distances = [int(d) for d in read_file(os.path.join(node_dir(sysfs, node), 'distance'), '').split()]
+        nodes[node] = {
+            'cpus': parse_list(read_file(os.path.join(node_dir(sysfs, node), 'cpulist'), '')),
+            'mem_total_kb': meminfo.get('MemTotal', 0),
+            'distances': dict(zip(online, distances)),
+            'access': node_access(sysfs, node),
+        }
+    return nodes
+
+
+# NUMA nodes of the online memory blocks in [start, start + size)
+def memory_block_nodes(sysfs, start, size):
+    memory = os.path.join(sysfs, 'devices', 'system', 'memory')
+    block_size = read_file(os.path.join(memory, 'block_size_bytes'))
+    if block_size is None or size == 0:
+        return []
+    block_size = int(block_size, 16)
+    nodes = set()
+    for block in range(start // block_size, (start + size + block_size - 1) // block_size):
+        for link in glob.glob(os.path.join(memory, f'memory{block}', 'node*')):
+            nodes.add(int(os.path.basename(link)[len('node'):]))
+    return sorted(nodes)
+
+
+# CXL memory devices and regions from /sys/bus/cxl. Empty without the cxl driver.
+def read_cxl(sysfs):
+    devices = os.path.join(sysfs, 'bus', 'cxl', 'devices')
+    memdevs = {}
+    for path in sorted(glob.glob(os.path.join(devices, 'mem*'))):
+        name = os.path.basename(path)
+        memdevs[name] = {
+            'serial': read_file(os.path.join(path, 'serial')),
+            'firmware_version': read_file(os.path.join(path, 'firmware_version')),
+            'numa_node': int(read_file(os.path.join(path, 'numa_node'), '-1')),
+            'ram_size': int(read_file(os.path.join(path, 'ram', 'size'), '0'), 0),
+            'pmem_size': int(read_file(os.path.join(path, 'pmem', 'size'), '0'), 0),
+        }
+
+    regions = {}
+    for path in sorted(glob.glob(os.path.join(devices, 'region*'))):
+        name = os.path.basename(path)
+        size = int(read_file(os.path.join(path, 'size'), '0'), 0)
+        resource = read_file(os.path.join(path, 'resource'))
+        targets = []
+        for target in sorted(glob.glob(os.path.join(path, 'target*'))):
+            if not re.match(r'^target\d+$', os.path.basename(target)) or not read_file(target):
+                continue
+            # Each target is an endpoint decoder; the uport of its endpoint is the memdev
+            decoder = read_file(target)
+            endpoint = os.path.dirname(os.path.realpath(os.path.join(devices, decoder)))
+            uport = os.path.basename(os.path.realpath(os.path.join(endpoint, 'uport')))
+            targets.append(uport if uport.startswith('mem') else decoder)
+        # System RAM regions are onlined as memory blocks; device DAX regions have a target node
+        nodes = memory_block_nodes(sysfs, int(resource, 0), size) if resource and resource != '-1' else []
+        for dax in glob.glob(os.path.join(path, 'dax_region*', 'dax*', 'target_node')):
+            nodes = sorted(set(nodes) | {int(read_file(dax))})
+        regions[name] = {
+            'mode': read_file(os.path.join(path, 'mode')),
+            'size': size,
+            'interleave_ways': int(read_file(os.path.join(path, 'interleave_ways'), '0')),
+            'interleave_granularity': int(read_file(os.path.join(path, 'interleave_granularity'), '0')),
+            'targets': targets,
+            'nodes': nodes,
+        }
+    return {'memdevs': memdevs, 'regions': regions}
+
+
+# Online CPUs: {cpu: {'socket': ..., 'core': first SMT sibling, 'siblings': [...], 'node': ...}}
+def read_cpus(sysfs, nodes):
+    cpu_dir = os.path.join(sysfs, 'devices', 'system', 'cpu')
+    cpu_nodes = {cpu: node for node, info in nodes.items() for cpu in info['cpus']}
+    cpus = {}
+    for cpu in parse_list(read_file(os.path.join(cpu_dir, 'online'), '')):
+        topology_dir = os.path.join(cpu_dir, f'cpu{cpu}', 'topology')
+        siblings = parse_list(read_file(os.path.join(topology_dir, 'thread_siblings_list'), str(cpu)))
+        cpus[cpu] = {
+            'socket': int(read_file(os.path.join(topology_dir, 'physical_package_id'), '0')),
+            'core': min(siblings),
+            'siblings': siblings,
+            'node': cpu_nodes.get(cpu),
+        }
+    return cpus
+
+
+# Read the topology from sysfs
+def read_topology(sysfs=SYSFS):
+    nodes = read_nodes(sysfs)
+    cpus = read_cpus(sysfs, nodes)
+    cxl = read_cxl(sysfs)
+    cxl_nodes = {n for region in cxl['regions'].values() for n in region['nodes']}
+    for node, info in nodes.items():
+        if info['cpus']:
+            info['type'] = 'dram'
+        elif node in cxl_nodes:
+            info['type'] = 'cxl'
+        else:
+            info['type'] = 'cpuless'
+    return {
+        'version': CACHE_VERSION,
+        'fingerprint': fingerprint(sysfs),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'cpus': cpus,
+        'nodes': nodes,
+        'cxl': cxl,
+    }
+
+
+# Identifies the boot, the online CPUs and nodes, and the memory size of each
+# node (which changes when memory is onlined or offlined) the topology was read from
+def fingerprint(sysfs=SYSFS):
+    online_nodes = read_file(os.path.join(sysfs, 'devices', 'system', 'node', 'online'), '')
+    mem_totals = [str(node_meminfo(sysfs, node).get('MemTotal', 0)) for node in parse_list(online_nodes)]
+    return '/'.join([
+        read_file('/proc/sys/kernel/random/boot_id', ''),
+        read_file(os.path.join(sysfs, 'devices', 'system', 'cpu', 'online'), ''),
+        online_nodes,
+        ','.join(mem_totals),
+    ])
+
+
+# JSON keys are strings; restore the integer CPU and node IDs
+def _int_keys(topology):
+    topology['cpus'] = {int(cpu): info for cpu, info in topology['cpus'].items()}
+    topology['nodes'] = {int(node): dict(info, distances={int(k): v for k, v in info['distances'].items()})
+                         for node, info in topology['nodes'].items()}
+    return topology
+
+
+# Load the topology from the cache, or read it from sysfs and cache it.
+# A cache that is unreadable or from another boot or memory layout is replaced.
+def load_topology(cache=DEFAULT_CACHE, refresh=False, sysfs=SYSFS):
+    if cache and not refresh:
+        try:
+            with open(cache) as f:
+                topology = json.load(f)
+            if topology.get('version') == CACHE_VERSION and topology.get('fingerprint') == fingerprint(sysfs):
+                return _int_keys(topology)
+        except (OSError, ValueError, KeyError):
+            pass
+    topology = read_topology(sysfs)
+    if cache:
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(cache)), exist_ok=True)
+            with open(f'{cache}.tmp', 'w') as f:
+                json.dump(topology, f, indent=2)
+            os.replace(f'{cache}.tmp', cache)
+        except OSError as e:
+            print(f'Warning: could not write the topology cache {cache}: {e}', file=sys.stderr)
+    return topology
+
+
+# NUMA nodes of a type ('dram', 'cxl' or 'cpuless') that have memory
+def nodes_of_type(topology, node_type):
+    return [node for node, info in sorted(topology['nodes'].items()) if info['type'] == node_type and info['mem_total_kb']]
+
+
+# The default (DRAM node, CXL node) of a benchmark: the first DRAM node with
+# memory, and the nearest CXL node to it (a CPU-less node if the CXL regions
+# are not known). Either is None if there is no such node.
+def pick_nodes(topology, socket=None):
+    dram_nodes = nodes_of_type(topology, 'dram')
+    if socket is not None:
+        dram_nodes = [n for n in dram_nodes if n == socket] or dram_nodes
+    dram_node = dram_nodes[0] if dram_nodes else None
+    candidates = nodes_of_type(topology, 'cxl') or nodes_of_type(topology, 'cpuless')
+    if dram_node is not None:
+        distances = topology['nodes'][dram_node]['distances']
+        candidates = sorted(candidates, key=lambda n: (distances.get(n, sys.maxsize), n))
+    return dram_node, candidates[0] if candidates else None
+
+
+# Access attributes of a memory node from an initiator node, preferring the CPU
+# initiators (access1): {'read_latency': ns, ..., 'read_bandwidth': MiB/s, ...}
+# or None if the firmware does not report them for this pair
+def access_attributes(topology, memory_node, initiator=None):
+    access = topology['nodes'][memory_node]['access']
+    for access_class in ('access1', 'access0'):
+        attributes = access.get(access_class)
+        if attributes and (initiator is None or initiator in attributes['initiators']):
+            return attributes
+    return None
+
+
+# Socket IDs
+def sockets(topology):
+    return sorted({info['socket'] for info in topology['cpus'].values()})
+
+
+# CPUs of a socket, or of every socket
+def socket_cpus(topology, socket=None):
+    return sorted(cpu for cpu, info in topology['cpus'].items() if socket is None or info['socket'] == socket)
+
+
+# CPUs of a NUMA node (empty for a CPU-less node)
+def node_cpus(topology, node):
+    return sorted(topology['nodes'][node]['cpus']) if node in topology['nodes'] else []
+
+
+# Keep only the first SMT thread of each core of a CPU list
+def one_thread_per_core(topology, cpus):
+    return [cpu for cpu in sorted(cpus) if topology['cpus'][cpu]['core'] == cpu]
+
+
+# Number of cores of a socket, or of the first socket (as lscpu's "Core(s) per socket")
+def cores_per_socket(topology, socket=None):
+    socket = sockets(topology)[0] if socket is None else socket
+    return len({topology['cpus'][cpu]['core'] for cpu in socket_cpus(topology, socket)})
+
+
+# Number of SMT threads per core (as lscpu's "Thread(s) per core")
+def threads_per_core(topology):
+    return max((len(info['siblings']) for info in topology['cpus'].values()), default=1)
+
+
+# NUMA nodes without CPUs (memory-only nodes, e.g. CXL or PMem)
+def cpuless_nodes(topology):
+    return [node for node, info in sorted(topology['nodes'].items()) if not info['cpus']]
+
+
+# The node table reads the free memory of each node live; the cache only has the sizes
+def print_topology(topology, sysfs=SYSFS):
+    nodes = topology['nodes']
+    print(f"{'Node':>4} | {'Type':<7} | {'CPUs':<16} | {'MemTotal':>10} | {'MemFree':>10} | "
+          f"{'Rd/Wr Latency (ns)':>18} | {'Rd/Wr Bandwidth (MiB/s)':>23} | Distances")
+    print('-' * 130)
+    for node, info in sorted(nodes.items()):
+        attributes = access_attributes(topology, node) or {}
+        latency = f"{attributes.get('read_latency', '-')}/{attributes.get('write_latency', '-')}"
+        bandwidth = f"{attributes.get('read_bandwidth', '-')}/{attributes.get('write_bandwidth', '-')}"
+        distances = ' '.join(str(d) for _, d in sorted(info['distances'].items()))
+        mem_free_kb = node_meminfo(sysfs, node).get('MemFree', 0)
+        print(f"{node:>4} | {info['type']:<7} | {format_list(info['cpus']) or '-':<16} | "
+              f"{info['mem_total_kb'] // 1024:>7} MiB | {mem_free_kb // 1024:>6} MiB | "
+              f"{latency:>18} | {bandwidth:>23} | {distances}")
+
+    memdevs = topology['cxl']['memdevs']
+    regions = topology['cxl']['regions']
+    if not memdevs and not regions:
+        print('\nNo CXL devices found in /sys/bus/cxl')
+        return
+    print(f"\n{'Memdev':<8} | {'Serial':<18} | {'Firmware':<12} | {'Node':>4} | {'RAM':>10} | {'PMem':>10}")
+    print('-' * 76)
+    for name, memdev in memdevs.items():
+        print(f"{name:<8} | {memdev['serial'] or '-':<18} | {memdev['firmware_version'] or '-':<12} | "
+              f"{memdev['numa_node']:>4} | {format_size(memdev['ram_size']):>10} | {format_size(memdev['pmem_size']):>10}")
+    print(f"\n{'Region':<10} | {'Mode':<6} | {'Size':>10} | {'Ways':>4} | {'Granularity':>11} | {'Nodes':<6} | Targets")
+    print('-' * 80)
+    for name, region in regions.items():
+        print(f"{name:<10} | {region['mode'] or '-':<6} | {format_size(region['size']):>10} | {region['interleave_ways']:>4} | "
+              f"{region['interleave_granularity']:>11} | {format_list(region['nodes']) or '-':<6} | {' '.join(region['targets'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the memory topology of this host from sysfs (NUMA nodes, HMAT access attributes, CXL devices and regions)")
+    parser.add_argument('--cache', default=DEFAULT_CACHE, help='topology cache file (default: %(default)s)')
+    parser.add_argument('--no-cache', action='store_true', help='read sysfs without using or writing the cache')
+    parser.add_argument('--refresh', action='store_true', help='read sysfs again and update the cache')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.add_parser('show', help='print the node, CXL device and region tables (default)')
+    subparsers.add_parser('json', help='print the topology as JSON')
+    pick = subparsers.add_parser('pick', help='print the default DRAM or CXL node ID of a benchmark')
+    pick.add_argument('type', choices=['dram', 'cxl'])
+    pick.add_argument('-s', '--socket', type=int, help='prefer the DRAM node of this socket')
+    subparsers.add_parser('sockets', help='print the number of CPU sockets')
+    subparsers.add_parser('nodes', help='print the number of NUMA nodes')
+    subparsers.add_parser('cpuless-nodes', help='print the NUMA nodes without CPUs')
+    cores = subparsers.add_parser('cores-per-socket', help='print the number of cores per socket')
+    cores.add_argument('-s', '--socket', type=int, help='socket (default: the first socket)')
+    subparsers.add_parser('threads-per-core', help='print the number of SMT threads per core')
+    for name, target in (('node-cpus', 'NUMA node'), ('socket-cpus', 'socket')):
+        cpus = subparsers.add_parser(name, help=f'print the CPUs of a {target}')
+        cpus.add_argument('id', type=int, help=target)
+        cpus.add_argument('--one-per-core', action='store_true', help='only the first SMT thread of each core')
+        cpus.add_argument('--format', choices=['range', 'list'], default='range', help='"0-3,8" (default) or "0,1,2,3,8"')
+    first = subparsers.add_parser('first-cpu', help='print the first CPU of a NUMA node')
+    first.add_argument('id', type=int, help='NUMA node')
+    args = parser.parse_args()
+
+    topology = load_topology(None if args.no_cache else args.cache, args.refresh)
+    if args.command == 'json':
+        json.dump(topology, sys.stdout, indent=2)
+        print()
+    elif args.command == 'pick':
+        dram_node, cxl_node = pick_nodes(topology, args.socket)
+        node = dram_node if args.type == 'dram' else cxl_node
+        if node is None:
+            print(f'No {args.type.upper()} node found', file=sys.stderr)
+            sys.exit(1)
+        print(node)
+    elif args.command == 'sockets':
+        print(len(sockets(topology)))
+    elif args.command == 'nodes':
+        print(len(topology['nodes']))
+    elif args.command == 'cpuless-nodes':
+        print(format_list(cpuless_nodes(topology)))
+    elif args.command == 'cores-per-socket':
+        print(cores_per_socket(topology, args.socket))
+    elif args.command == 'threads-per-core':
+        print(threads_per_core(topology))
+    elif args.command in ('node-cpus', 'socket-cpus', 'first-cpu'):
+        cpus = node_cpus(topology, args.id) if args.command != 'socket-cpus' else socket_cpus(topology, args.id)
+        if not cpus:
+            print(f"No CPUs on {'socket' if args.command == 'socket-cpus' else 'NUMA node'} {args.id}", file=sys.stderr)
+            sys.exit(1)
+        if args.command == 'first-cpu':
+            print(cpus[0])
+            return
+        if args.one_per_core:
+            cpus = one_thread_per_core(topology, cpus)
+        print(format_list(cpus) if args.format == 'range' else ','.join(map(str, cpus)))
+    else:
+        print_topology(topology)
+
+
+if __name__ == "__main__":
+    main()